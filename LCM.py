@@ -1,21 +1,26 @@
 #cubo lorcana app su streamlit
+#pandas e plotly si importano solo nelle pagine che li usano (Rules e Backup partono senza)
 
 import streamlit as st
-import re
-import streamlit.components.v1 as components
+from streamlit.errors import StreamlitAPIException
 import json 
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from cubeManager import CubeManager
+import logging
+from cubeManager import CubeManager, BROWSE_END, ADDED, REMOVED, DEFAULT_CUBE_ID
+import cardgrid
+import gallery
+import thumbs
+import debugpanel
 from datetime import datetime
 
+log = logging.getLogger("lcm")
+
 #conf. pagina
 st.set_page_config(page_title="Lorcana Cube Manager",
                    page_icon="🏰",
                    layout="wide", 
                    initial_sidebar_state="expanded"
 )
+debugpanel.begin(st.session_state.get("page"))  # pannello perf: misura da qui a finish()
 st.title("🏰 Lorcana Cube Manager")
 
 # CSS personalizzato
@@ -36,45 +41,78 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# SIDEBAR
+# disegnata subito, prima del db e dei grafici: il menu compare appena si apre la pagina
+PAGES = ["🏠 Dashboard", "➕ Cube management", "📊 Other stats", "🏆 Report a tournament", "📈 Tournament stats", "💾 Backup/Restore", "📜 Rules"]
+st.sidebar.title("📋 Menu")
+page = st.sidebar.radio(
+    "Select a section:",
+    PAGES,
+    key="page"
+)
+st.sidebar.markdown("---")
+cube_slot = st.sidebar.empty()  # scelta del cubo, riempita quando il db è pronto
+cube_count_slot = st.sidebar.empty()
+
+# Footer
+st.sidebar.markdown("---")
+st.sidebar.info("Lorcana Cube Manager v1.0\nCreated by camposssssss")
+st.sidebar.info("'No no no no no no kid. Giving up is for rookies - 🎬 Hercules'")
+st.sidebar.checkbox("🐞 Perf debug", key=debugpanel.TOGGLE_KEY,
+                    help="Timings, widgets, cache and SQL statements of the last rerun")
+debug_slot = st.sidebar.empty()  # riempito da debugpanel.finish() a fine script
+
 # Inizializzazione sessione
-#@st.cache_resource
+# un solo CubeManager per processo, condiviso da tutte le sessioni:
+# ogni thread legge con la sua connessione, le scritture passano una alla volta.
+# Se il db manca o non si apre solleva un'eccezione: cache_resource non la salva,
+# quindi il rerun dopo 'python main.py' riprova invece di restare rotto fino al riavvio
+@st.cache_resource
 def init_manager():
     import os
     
-    # Debug: verifica se il database esiste
+    # verifica se il database esiste
     if not os.path.exists('lorcana_cards.db'):
-        st.error("❌ File lorcana_cards.db non trovato!")
-        st.info("💡 Esegui 'python main.py' per creare il database")
-        return None
+        raise FileNotFoundError("lorcana_cards.db")
     
     manager = CubeManager()
     
-    # Debug: stampa il risultato della connessione
-    connection_result = manager.connect()
-    #st.write(f"🔍 DEBUG - Connessione riuscita: {connection_result}")
-    #st.write(f"🔍 DEBUG - manager.conn: {manager.conn}")
+    if not manager.connect():
+        raise RuntimeError("Connessione al database non riuscita")
+    return manager
     
-    if connection_result:
-        #print(f"✅ Manager cached - conn: {manager.conn}")
-        return manager
-    else:
-        #st.error("❌ Impossibile connettersi al database")
-        return None
-    
-# Inizializza il manager
-manager = init_manager()
-cards_per_row = 8  # Default cards per row
+# miniature servite da streamlit (static/thumbs), una cache per processo;
+# senza server.enableStaticServing si usano gli URL originali
+@st.cache_resource
+def init_images():
+    return thumbs.StaticThumbnails(base_url_path=st.get_option("server.baseUrlPath"),
+                                   enabled=st.get_option("server.enableStaticServing"))
+
+def card_image_html(card, css_class="card-image"):
+    """Miniatura della carta; il clic apre l'immagine grande in una nuova scheda"""
+    thumb = images.thumb_url(card['image'], card['name'])
+    img = f'<img src="{thumb}" class="{css_class}" alt="{card["name"]}" loading="lazy">'
+    if not card['image']:
+        return img
+    return f'<a href="{card["image"]}" target="_blank" rel="noopener">{img}</a>'
 
-# AGGIUNGI QUESTO CONTROLLO
-if manager is None:
+# Inizializza il manager
+try:
+    manager = init_manager()
+except FileNotFoundError:
+    st.error("❌ File lorcana_cards.db non trovato!")
+    st.info("💡 Esegui 'python main.py' per creare il database")
+    st.stop()
+except RuntimeError:
     st.error("❌ ERRORE CRITICO: Impossibile inizializzare il database")
     st.stop()  # Ferma l'esecuzione dell'app
-
-# Ora è sicuro usare manager
-cube_count = manager.get_cube_count()
+images = init_images()
+cards_per_row = 8  # Default cards per row
 
 # Funzione per convertire stats in DataFrame
+@debugpanel.timed("dataframe")
 def stats_to_df(stats):
+    import pandas as pd
     if not stats:
         return pd.DataFrame()
     data = []
@@ -93,26 +131,176 @@ def stats_to_df(stats):
             })
     return pd.DataFrame(data)
 
+# Grafici della Dashboard: statistiche, raggruppamento multicolor e figure plotly
+# si calcolano una volta per versione del cubo; in cache resta il JSON delle figure
+@manager.cached
+@debugpanel.timed("charts")
+def dashboard_figures(cube_id):
+    """JSON dei grafici della Dashboard: {"inks", "types", "cost"} (None se non ci sono dati)"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    cube_stats = manager.compute_all_stats(cube_id=cube_id)
+    figures = {"inks": None, "types": None, "cost": None}
+
+    color_stats = cube_stats.color
+    if color_stats:
+        df_colors = stats_to_df(color_stats)
+        # ✅ Mappa dei colori Lorcana
+        lorcana_colors = {
+            'Amber': '#f0b101',      # Giallo/Ambra
+            'Amethyst': '#7f387a',   # Viola
+            'Emerald': '#288933',    # Verde
+            'Ruby': '#d00731',       # Rosso
+            'Sapphire': '#0087bf',   # Blu
+            'Steel': '#9da7b1',      # Grigio
+            'Multicolor': '#2a2a47'  # Nero/Grigio scuro per dual color
+        }
+        
+        def classify_color(nome):
+            nome_str = str(nome) if nome else 'Unknown'
+            if '/' in nome_str or ',' in nome_str:
+                return 'Multicolor'
+            return nome_str
+
+        df_colors['Nome'] = df_colors['Nome'].apply(classify_color)
+        df_colors = df_colors.groupby('Nome', as_index=False).sum()
+
+        df_colors['Sort_Order'] = df_colors['Nome'].apply(lambda x: 1 if x == 'Multicolor' else 0)
+        df_colors = df_colors.sort_values(['Sort_Order', 'Nome']).drop('Sort_Order', axis=1)
+
+        fig = px.pie(
+            df_colors, 
+            values='Conteggio', 
+            names='Nome',
+            color='Nome',
+            color_discrete_map=lorcana_colors  # ✅ Usa la mappa personalizzata
+        )
+
+        fig.update_traces(
+            textposition='inside',
+            textinfo='percent+label',
+            textfont_size=12,
+            pull=[0.05]*len(df_colors)
+        )
+        
+        fig.update_layout(
+            height=350,  # Altezza fissa
+            margin=dict(l=10, r=10, t=32, b=10),  # Margini
+            showlegend=True
+        )
+        figures["inks"] = fig.to_json()
+
+    type_stats = cube_stats.type
+    if type_stats:
+        df_types = stats_to_df(type_stats)
+        fig = px.bar(df_types, x='Nome', y='Conteggio', 
+                    color='Nome', text='Conteggio')
+        fig.update_traces(textposition='outside')
+        figures["types"] = fig.to_json()
+
+    # Curva di mana
+    cost_stats = cube_stats.cost
+    if cost_stats:
+        df_cost = stats_to_df(cost_stats)
+        df_cost = df_cost.sort_values('Nome')
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=df_cost['Nome'],
+            y=df_cost['Conteggio'],
+            marker_color='lightblue',
+            text=df_cost['Conteggio'],
+            textposition='outside'
+        ))
+        fig.update_layout(
+            xaxis_title="Costo di Mana",
+            yaxis_title="Numero di Carte",
+            showlegend=False,
+            height=400
+        )
+        figures["cost"] = fig.to_json()
+    return figures
+
+# Paginazione keyset con manager.browse(): in session_state restano solo
+# il numero di pagina e la chiave da cui ripartire, ogni pagina è una query piccola
+def browse_page(state_key, filters, cards_per_page):
+    """Carica la pagina corrente (si torna alla prima quando cambiano i filtri)"""
+    nav = st.session_state.get(state_key)
+    if nav is None or nav["filters"] != filters or nav["cube_id"] != cube_id:
+        nav = {"filters": filters, "cube_id": cube_id, "page": 0, "after": None, "before": None,
+               "limit": cards_per_page}
+        st.session_state[state_key] = nav
+    result = manager.browse(filters, after_key=nav["after"], before_key=nav["before"], limit=nav["limit"],
+                            cube_id=cube_id)
+    if not result["cards"] and nav["page"] > 0:
+        # la pagina si è svuotata (es. carte appena tolte dal cubo): ripartiamo dalla prima
+        st.session_state.pop(state_key)
+        return browse_page(state_key, filters, cards_per_page)
+    return nav, result
+
+
+def browse_go(state_key, result, where, cards_per_page):
+    """Sposta la navigazione: 'first', 'prev', 'next' o 'last'"""
+    nav = st.session_state[state_key]
+    total_pages = (result["total"] - 1) // cards_per_page + 1
+    if where == "first":
+        nav.update(page=0, after=None, before=None, limit=cards_per_page)
+    elif where == "prev":
+        nav.update(page=nav["page"] - 1, after=None, before=result["prev_key"], limit=cards_per_page)
+    elif where == "next":
+        nav.update(page=nav["page"] + 1, after=result["next_key"], before=None, limit=cards_per_page)
+    elif where == "last":
+        # l'ultima pagina ha solo le carte che avanzano, così le pagine restano allineate
+        nav.update(page=total_pages - 1, after=None, before=BROWSE_END,
+                   limit=result["total"] - (total_pages - 1) * cards_per_page)
+    rerun_fragment()
+
+
+def rerun_fragment():
+    """Riesegue solo il fragment che ha ricevuto il clic (tutto lo script se non siamo in un fragment)"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def select_cube(new_cube_id):
+    """Passa a un altro cubo (es. appena creato): la sidebar lo mostra dal prossimo rerun"""
+    st.session_state.select_cube = new_cube_id
+    st.rerun()
+
+
+def cube_label(cube):
+    return f"{cubes[cube]['name']} ({cubes[cube]['cards']})"
+
+
+def update_cube_count(outcomes):
+    """Aggiorna il conteggio della sidebar dagli esiti di add/remove_cube_many, senza rileggerlo dal db"""
+    st.session_state.cube_count += sum(outcome == ADDED for outcome in outcomes.values())
+    st.session_state.cube_count -= sum(outcome == REMOVED for outcome in outcomes.values())
+    cube_count_slot.metric("🎴 total cards in cube", st.session_state.cube_count)
+
 # HEADER
 #st.markdown('<h1 class="main-header">🎴 Lorcana Cube Manager</h1>', unsafe_allow_html=True)
 
-# SIDEBAR
-st.sidebar.title("📋 Menu")
-page = st.sidebar.radio(
-    "Select a section:",
-    ["🏠 Dashboard", "➕ Cube management", "📊 Other stats", "🏆 Report a tournament", "📈 Tournament stats", "💾 Backup/Restore", "📜 Rules"]
-)
+# Cubo su cui lavorano tutte le pagine, scelto nella sidebar (il primo, se quello scelto non c'è più)
+cubes = {cube["cube_id"]: cube for cube in manager.list_cubes()}
+if "select_cube" in st.session_state:
+    st.session_state.cube_id = st.session_state.pop("select_cube")
+if st.session_state.get("cube_id") not in cubes:
+    st.session_state.cube_id = next(iter(cubes))
+cube_id = cube_slot.selectbox("🧊 Cube", list(cubes), format_func=lambda cube: cubes[cube]["name"], key="cube_id")
+cube_name = cubes[cube_id]["name"]
 
 # Mostra conteggio cubo sempre visibile
-cube_count = manager.get_cube_count()
-st.sidebar.markdown("---")
-st.sidebar.metric("🎴 total cards in cube", cube_count)
+# (letto una volta per esecuzione completa, i fragment lo aggiornano con update_cube_count)
+cube_count = st.session_state.cube_count = manager.get_cube_count(cube_id=cube_id)
+cube_count_slot.metric("🎴 total cards in cube", cube_count)
 
 # ============================================================================
 # PAGINA: DASHBOARD
 # ============================================================================
 if page == "🏠 Dashboard":
-    st.header("📊 Cube overview")
+    st.header(f"📊 {cube_name} overview")
     
     if cube_count == 0:
         st.warning("⚠️ Cube is empty! Add some cards to see stats.")
@@ -123,10 +311,10 @@ if page == "🏠 Dashboard":
         with col1:
             st.metric("🎴 Total cards", cube_count)
         
-        # Calcola stats rapide
-        type_stats = manager.stats_type()
-        total_card = manager.get_cube_count()
-        inkable_stats = manager.stats_inkable()
+        # Tutte le statistiche in un solo passaggio sul cubo
+        cube_stats = manager.compute_all_stats(cube_id=cube_id)
+        total_card = cube_stats.total
+        inkable_stats = cube_stats.inkable
         
         
         with col2:
@@ -163,199 +351,34 @@ if page == "🏠 Dashboard":
             else:
                 st.metric("❌🖋️ Uninkable", "0 (0.0%)")
         
-        # Grafici principali in colonne
+        # Grafici principali in colonne (JSON già pronto per questa versione del cubo)
+        import plotly.io as pio
+        pio = debugpanel.traced(pio, "charts")
+        figures = dashboard_figures(cube_id)
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("🎨 Total inks")
-            color_stats = manager.stats_color()
-            if color_stats:
-                df_colors = stats_to_df(color_stats)
-                # ✅ Mappa dei colori Lorcana
-                lorcana_colors = {
-                    'Amber': '#f0b101',      # Giallo/Ambra
-                    'Amethyst': '#7f387a',   # Viola
-                    'Emerald': '#288933',    # Verde
-                    'Ruby': '#d00731',       # Rosso
-                    'Sapphire': '#0087bf',   # Blu
-                    'Steel': '#9da7b1',      # Grigio
-                    'Multicolor': '#2a2a47'  # Nero/Grigio scuro per dual color
-                }
-                
-                def classify_color(nome):
-                    nome_str = str(nome) if nome else 'Unknown'
-                    if '/' in nome_str or ',' in nome_str:
-                        return 'Multicolor'
-                    return nome_str
-        
-                df_colors['Nome'] = df_colors['Nome'].apply(classify_color)
-                df_colors = df_colors.groupby('Nome', as_index=False).sum()
-
-                df_colors['Sort_Order'] = df_colors['Nome'].apply(lambda x: 1 if x == 'Multicolor' else 0)
-                df_colors = df_colors.sort_values(['Sort_Order', 'Nome']).drop('Sort_Order', axis=1)
-        
-        # Crea la lista dei colori in base ai dati
-                color_map = {}
-                for nome in df_colors['Nome']:  # ✅ Usa 'Nome' non 'Name'
-                    nome_str = str(nome) if nome else 'Nessuno'
-                
-                    # Controlla se è multicolor
-                    if '/' in nome_str or ',' in nome_str:
-                        color_map[nome_str] = '#2C3E50'
-                    else:
-                        color_map[nome_str] = lorcana_colors.get(nome_str, '#808080')
-                fig = px.pie(
-                    df_colors, 
-                    values='Conteggio', 
-                    names='Nome',
-                    color='Nome',
-                    color_discrete_map=lorcana_colors  # ✅ Usa la mappa personalizzata
-                )
-        
-                fig.update_traces(
-                    textposition='inside',
-                    textinfo='percent+label',
-                    textfont_size=12,
-                    pull=[0.05]*len(df_colors)
-                )
-                
-                fig.update_layout(
-                    height=350,  # Altezza fissa
-                    margin=dict(l=10, r=10, t=32, b=10),  # Margini
-                    showlegend=True
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+            if figures["inks"]:
+                st.plotly_chart(pio.from_json(figures["inks"]), use_container_width=True)
         
         with col2:
             st.subheader("🃏 Total types")
-            if type_stats:
-                df_types = stats_to_df(type_stats)
-                fig = px.bar(df_types, x='Nome', y='Conteggio', 
-                            color='Nome', text='Conteggio')
-                fig.update_traces(textposition='outside')
-                st.plotly_chart(fig, use_container_width=True)
+            if figures["types"]:
+                st.plotly_chart(pio.from_json(figures["types"]), use_container_width=True)
         
         # Curva di mana
         st.subheader("💎 Mana curve")
-        cost_stats = manager.stats_cost()
-        if cost_stats:
-            df_cost = stats_to_df(cost_stats)
-            df_cost = df_cost.sort_values('Nome')
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=df_cost['Nome'],
-                y=df_cost['Conteggio'],
-                marker_color='lightblue',
-                text=df_cost['Conteggio'],
-                textposition='outside'
-            ))
-            fig.update_layout(
-                xaxis_title="Costo di Mana",
-                yaxis_title="Numero di Carte",
-                showlegend=False,
-                height=400
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if figures["cost"]:
+            st.plotly_chart(pio.from_json(figures["cost"]), use_container_width=True)
 
-        #Galleria cubo attuale
+        #Galleria cubo attuale: un solo componente, ordinamento e filtri nel browser
         st.markdown("---")
         st.subheader("⚜️ Cube gallery")
-
-        col_filter2, col_filter3 = st.columns(2)
-
-        with col_filter2:
-            sort_by = st.selectbox(
-                "Sort by:",
-                ["name", "cost", "color", "type",],
-                index=0
-            )
-
-        with col_filter3:
-            filter_color = st.selectbox(
-                "Filter by ink:",
-                ["All", "Amber", "Amethyst", "Emerald", "Ruby", "Sapphire", "Steel", "Multicolor"],
-            )
-
-        cube_cards = manager.get_cube_cards()
-
-    cube_cards = manager.get_cube_cards() if manager else []
-    
-    # Applica filtro colore se selezionato
-    if filter_color != "All":
-        cube_cards = [card for card in cube_cards if filter_color.lower() in str(card['color']).lower()]
-        
-    # Ordina le carte
-    if sort_by == "name":
-        cube_cards.sort(key=lambda x: x['name'])
-    elif sort_by == "cost":
-        cube_cards.sort(key=lambda x: (x['cost'] if x['cost'] is not None else 999, x['name']))
-    elif sort_by == "color":
-        cube_cards.sort(key=lambda x: (x['color'], x['name']))
-    elif sort_by == "type":
-        cube_cards.sort(key=lambda x: (x['type'], x['name']))
-    
-        # CSS per le card
-    st.markdown("""
-        <style>
-            .card-container {
-                position: relative;
-                border-radius: 10px;
-                overflow: hidden;
-                transition: transform 0.2s;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.3);
-                margin-bottom: 15px;
-            }
-            .card-container:hover {
-                transform: scale(1.05);
-                box-shadow: 0 4px 15px rgba(255,107,107,0.5);
-                z-index: 10;
-            }
-            .card-img {
-                width: 100%;
-                height: auto;
-                display: block;
-                border-radius: 10px;
-            }
-            .card-name {
-                position: absolute;
-                bottom: 0;
-                left: 0;
-                right: 0;
-                background: rgba(0,0,0,0.8);
-                color: white;
-                padding: 5px;
-                font-size: 0.8em;
-                text-align: center;
-                opacity: 0;
-                transition: opacity 0.2s;
-            }
-            .card-container:hover .card-name {
-                opacity: 1;
-            }
-            /* Riduci il gap tra le colonne */
-            [data-testid="column"] {
-                padding: 0 5px !important;
-            }
-            </style>
-    """, unsafe_allow_html=True)
-        
-    # Crea la griglia
-    cols = st.columns(cards_per_row, gap="small")
-    
-    for idx, card in enumerate(cube_cards):
-        col_idx = idx % cards_per_row
-        
-        with cols[col_idx]:
-            Image = card['Image'] if card['Image'] else f"https://via.placeholder.com/300x420?text={card['name']}"
-            
-            # Mostra la carta
-            st.markdown(f"""
-                <div class="card-container">
-                    <img src="{Image}" class="card-img" alt="{card['name']}">
-                    <div class="card-name">{card['name']}</div>
-                </div>
-            """, unsafe_allow_html=True)
+        cube_cards = manager.get_cube_cards(cube_id=cube_id)
+        with debugpanel.section("grid"):
+            gallery.render_cube_gallery(cube_cards, columns=cards_per_row,
+                                        thumb_url=images.thumb_url)
 # ============================================================================
 # PAGINA: GESTIONE CUBO
 # ============================================================================
@@ -369,265 +392,204 @@ if page == "🏠 Dashboard":
 
 
 elif page == "➕ Cube management":
-    st.header("Add or remove cards from your cube")
-    
-    # =======================
-    # FILTRI (sempre visibili in alto)
-    # =======================
-    with st.container():
-        st.subheader("🔎 Filter cards")
+    st.header(f"Add or remove cards from {cube_name}")
 
-        col1, col2, col3, col4, col5 = st.columns([2, 1.5, 1.5, 1.5, 1.5])
+    # cubi: nuovi, rinomina, eliminazione
+    with st.expander("🧊 Manage cubes"):
+        col1, col2 = st.columns(2)
         with col1:
-            filter_name = st.text_input("Search by name, ID, effect or keyword...", 
-                                       value="", 
-                                       key="filter_name_input",
-                                       placeholder="Type name, effect or ID",
-                                       label_visibility="collapsed")
+            new_name = st.text_input("New cube name", key="new_cube_name")
+            copy_current = st.checkbox(f"Start from a copy of {cube_name}", key="new_cube_copy")
+            if st.button("➕ Create cube", use_container_width=True):
+                card_ids = manager.get_cube_id_list(cube_id=cube_id) if copy_current else ()
+                new_cube_id = manager.create_cube(new_name, card_ids)
+                if new_cube_id is None:
+                    st.error("❌ Cube name is empty or already used")
+                else:
+                    select_cube(new_cube_id)
         with col2:
-            all_colors = ["Amber", "Amethyst", "Emerald", "Ruby", "Sapphire", "Steel"]
-            selected_colors = st.multiselect("Choose 1 or more ink(s)", 
-                                            all_colors, 
-                                            key="filter_colors",
-                                            placeholder="Select inks...",
-                                            label_visibility="collapsed")
-        with col3:
-            all_types = ["Character", "Action", "Action - Song", "Item", "Location"]
-            selected_types = st.multiselect("Choose 1 or more type(s)", 
-                                           all_types, 
-                                           key="filter_types",
-                                           placeholder="Select types...",
-                                           label_visibility="collapsed")
-        with col4:
-            inkable_filter = st.selectbox("Inkable status",
-                                         ["All cards", "Inkable only", "Uninkable only"],
-                                         key="inkable_filter",
-                                         label_visibility="collapsed")
-        with col5:
-            cube_filter = st.selectbox("Cube status",
-                                      ["All cards", "In cube only", "Not in cube"],
-                                      key="cube_filter",
-                                      label_visibility="collapsed")
-
-    # =======================
-    # ✅ CARICA SOLO SE NECESSARIO (con cache)
-    # =======================
-    @st.cache_data(ttl=10)  # Cache per 10 secondi
-    def load_filtered_cards(name_filter, color_filter, type_filter, ink_status, cube_status):
-        """Carica e filtra le carte - con cache per velocizzare"""
-        all_rows = manager.search_cards("")
-        all_cards = []
-
-        for r in all_rows:
-            row = dict(r)
-            
-            in_cube_value = row.get("in_cube")
-            # Converti None a 0, altrimenti usa il valore
-            in_cube_normalized = 1 if in_cube_value == 1 else 0
-            
-            all_cards.append({
-                "unique_id": row.get("unique_id") or "",
-                "name": row.get("name") or "",
-                "image": row.get("Image") or "",
-                "color": row.get("color") or "",
-                "type": row.get("type") or "",
-                "cost": row.get("cost") or "",
-                "in_cube": in_cube_normalized,
-                "inkable": row.get("inkable", 0),
-                "body_text": str(row.get("body_text") or ""),
-                "classifications": str(row.get("classifications") or ""),
-            })
-
-        # Applica filtri
-        filtered = all_cards
-
-        # Filtro per stato cubo
-        if cube_status == "In cube only":
-            filtered = [c for c in filtered if c['in_cube'] == 1]
-        elif cube_status == "Not in cube":
-            filtered = [c for c in filtered if c['in_cube'] == 0]
-        # Se "All cards", non filtra nulla
-
-        # Filtro inkable o no
-        if ink_status == "Inkable only":
-            filtered = [c for c in filtered if c['inkable'] == 1]
-        elif ink_status == "Uninkable only":
-            filtered = [c for c in filtered if c['inkable'] == 0]
-        # Se "All", non filtra nulla
-
-        # Filtro per nome, ID, effetto o classificazione
-        if name_filter and name_filter.strip():
-            term = name_filter.lower()
-            
-            def matches_search(card):
-                name_match = term in (card.get('name') or "").lower()
-                id_match = term in (card.get('unique_id') or "").lower()
-                effect_match = term in (card.get('body_text') or "").lower()
-                class_match = term in (card.get('classifications') or "").lower()
-                return name_match or id_match or effect_match or class_match
-            
-            filtered = [c for c in filtered if matches_search(c)]
-
-        if color_filter:
-            sel = [s.lower() for s in color_filter]
-
-            def card_has_color(card):
-                raw = card.get('color') or ""
-                parts = [p.strip().lower() for p in re.split(r'[,/]', raw) if p.strip()]
-                return any(s in parts for s in sel)
-
-            filtered = [c for c in filtered if card_has_color(c)]
-
-        if type_filter:
-            sel_types = [t.lower() for t in type_filter]
-            filtered = [c for c in filtered if (c.get('type') or "").lower() in sel_types]
+            new_cube_name = st.text_input("Rename current cube", value=cube_name, key=f"rename_cube_{cube_id}")
+            if st.button("✏️ Rename", use_container_width=True):
+                if manager.rename_cube(cube_id, new_cube_name):
+                    st.rerun()
+                else:
+                    st.error("❌ Cube name is empty or already used")
+            confirm = st.checkbox(f"Yes, delete {cube_name}", key=f"delete_cube_{cube_id}",
+                                  disabled=cube_id == DEFAULT_CUBE_ID,
+                                  help="The main cube and cubes with tournaments can't be deleted")
+            if st.button("🗑️ Delete current cube", use_container_width=True, disabled=not confirm):
+                if manager.delete_cube(cube_id):
+                    select_cube(DEFAULT_CUBE_ID)
+                else:
+                    st.error("❌ This cube has tournaments registered and can't be deleted")
 
-        return filtered
+    # unione, intersezione e differenza fra cubi: una query sqlite su cube_cards
+    with st.expander("🔀 Compare cubes"):
+        if len(cubes) < 2:
+            st.info("Create a second cube to compare them")
+        else:
+            col1, col2, col3 = st.columns([1, 2, 2])
+            with col1:
+                operation = st.selectbox("Operation", ["Union", "Intersection", "Difference"], key="cube_set_op")
+            with col2:
+                first = st.selectbox("Cube", list(cubes), format_func=cube_label, key="cube_set_first")
+            with col3:
+                others = st.multiselect("Minus" if operation == "Difference" else "With",
+                                        [cube for cube in cubes if cube != first],
+                                        format_func=cube_label, key="cube_set_others")
+            if others:
+                if operation == "Union":
+                    set_cards = manager.cube_union([first, *others])
+                elif operation == "Intersection":
+                    set_cards = manager.cube_intersection([first, *others])
+                else:
+                    set_cards = manager.cube_difference(first, others)
+                st.metric(f"🎴 {operation}", len(set_cards))
+                if set_cards:
+                    with debugpanel.section("grid"):
+                        gallery.render_cube_gallery(set_cards, columns=cards_per_row, thumb_url=images.thumb_url)
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        set_name = st.text_input("Save as a new cube", key="cube_set_name",
+                                                 placeholder="New cube name", label_visibility="collapsed")
+                    with col2:
+                        if st.button("💾 Save as new cube", use_container_width=True):
+                            new_cube_id = manager.create_cube(set_name, [card["unique_id"] for card in set_cards])
+                            if new_cube_id is None:
+                                st.error("❌ Cube name is empty or already used")
+                            else:
+                                select_cube(new_cube_id)
+
+    # filtri, paginazione e griglia in un fragment: un clic riesegue solo questa parte
+    @st.fragment
+    @debugpanel.profiled("cube_browser", debug_slot)
+    def cube_browser():
+        # =======================
+        # FILTRI (sempre visibili in alto)
+        # =======================
+        with st.container():
+            st.subheader("🔎 Filter cards")
 
-    # Carica carte filtrate
-    filtered_cards = load_filtered_cards(filter_name, tuple(selected_colors), tuple(selected_types), inkable_filter, cube_filter)
-    
-    total_cards = len(filtered_cards)
-    
-    st.markdown("---")
-    st.write(f"**Found {total_cards} cards**")
+            col1, col2, col3, col4, col5 = st.columns([2, 1.5, 1.5, 1.5, 1.5])
+            with col1:
+                filter_name = st.text_input("Search by name, ID, effect or keyword...", 
+                                           value="", 
+                                           key="filter_name_input",
+                                           placeholder="Type name, effect or ID",
+                                           label_visibility="collapsed")
+            with col2:
+                all_colors = ["Amber", "Amethyst", "Emerald", "Ruby", "Sapphire", "Steel"]
+                selected_colors = st.multiselect("Choose 1 or more ink(s)", 
+                                                all_colors, 
+                                                key="filter_colors",
+                                                placeholder="Select inks...",
+                                                label_visibility="collapsed")
+            with col3:
+                all_types = ["Character", "Action", "Action - Song", "Item", "Location"]
+                selected_types = st.multiselect("Choose 1 or more type(s)", 
+                                               all_types, 
+                                               key="filter_types",
+                                               placeholder="Select types...",
+                                               label_visibility="collapsed")
+            with col4:
+                inkable_filter = st.selectbox("Inkable status",
+                                             ["All cards", "Inkable only", "Uninkable only"],
+                                             key="inkable_filter",
+                                             label_visibility="collapsed")
+            with col5:
+                cube_filter = st.selectbox("Cube status",
+                                          ["All cards", "In cube only", "Not in cube"],
+                                          key="cube_filter",
+                                          label_visibility="collapsed")
 
-    # =======================
-    # PAGINAZIONE (48 carte fisse per pagina)
-    # =======================
-    if total_cards == 0:
-        st.warning("No cards found with these filters")
-    else:
+        # =======================
+        # ✅ CARICA SOLO LA PAGINA CORRENTE (filtri e paginazione in SQL)
+        # =======================
         cards_per_page = 48  # Fisso a 48 carte per pagina
+        filters = {
+            "text": filter_name,
+            "colors": tuple(selected_colors),
+            "types": tuple(selected_types),
+            "inkable": {"Inkable only": 1, "Uninkable only": 0}.get(inkable_filter),
+            "in_cube": {"In cube only": 1, "Not in cube": 0}.get(cube_filter),
+        }
+        nav, result = browse_page("cube_browse", filters, cards_per_page)
         
-        # Inizializza pagina corrente in session_state
-        if 'current_page' not in st.session_state:
-            st.session_state.current_page = 0
-
-        total_pages = (total_cards - 1) // cards_per_page + 1
-        
-        # Controlli paginazione
-        col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
-        
-        with col1:
-            if st.button("⏮️ First", disabled=(st.session_state.current_page == 0)):
-                st.session_state.current_page = 0
-                st.rerun()
-        
-        with col2:
-            if st.button("◀️ Prev", disabled=(st.session_state.current_page == 0)):
-                st.session_state.current_page -= 1
-                st.rerun()
-        
-        with col3:
-            st.markdown(f"<h4 style='text-align: center;'>Page {st.session_state.current_page + 1} / {total_pages}</h4>", 
-                       unsafe_allow_html=True)
-        
-        with col4:
-            if st.button("Next ▶️", disabled=(st.session_state.current_page >= total_pages - 1)):
-                st.session_state.current_page += 1
-                st.rerun()
+        total_cards = result["total"]
         
-        with col5:
-            if st.button("Last ⏭️", disabled=(st.session_state.current_page >= total_pages - 1)):
-                st.session_state.current_page = total_pages - 1
-                st.rerun()
+        st.markdown("---")
+        st.write(f"**Found {total_cards} cards**")
 
         # =======================
-        # MOSTRA SOLO LA PAGINA CORRENTE
+        # PAGINAZIONE (48 carte fisse per pagina)
         # =======================
-        start_idx = st.session_state.current_page * cards_per_page
-        end_idx = min(start_idx + cards_per_page, total_cards)
-        current_page_cards = filtered_cards[start_idx:end_idx]
-
-        # CSS personalizzato
-        st.markdown("""
-            <style>
-            .card-image {
-                width: 100%;
-                border-radius: 8px;
-                transition: transform 0.2s;
-                display: block;
-                position: relative;
-            }
-            .card-image:hover {
-                transform: scale(1.05);
-            }
-            div[data-testid="column"] {
-                padding: 2px !important;
-            }
-            /* Nascondi il margine dell'elemento markdown */
-            div[data-testid="stMarkdownContainer"] {
-                margin-bottom: 0 !important;
-            }
-            /* Stile per il bottone "In Cube" (verde e disabilitato) */
-            button[kind="primary"]:disabled {
-                background-color: #228B22 !important;
-                color: white !important;
-                opacity: 1 !important;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-
-        # Griglia - solo carte della pagina corrente
-        cards_per_row = 8
-        
-        for i in range(0, len(current_page_cards), cards_per_row):
-            cols = st.columns(cards_per_row, gap="small")
+        if total_cards == 0:
+            st.warning("No cards found with these filters")
+        else:
+            total_pages = (total_cards - 1) // cards_per_page + 1
+            is_first = nav["page"] == 0
+            is_last = nav["page"] >= total_pages - 1
             
-            for idx, card in enumerate(current_page_cards[i:i+cards_per_row]):
-                with cols[idx]:
-                    img = card['image'] or f"https://via.placeholder.com/300x420?text={card['name']}"
-                    in_cube = card['in_cube'] == 1
-                    
-                    # Mostra solo l'immagine
-                    st.markdown(f'<img src="{img}" class="card-image" alt="{card["name"]}">', 
-                               unsafe_allow_html=True)
-                    
-                    # Bottoni Add/Remove
-                    col_btn1, col_btn2 = st.columns(2)
-                    
-                    with col_btn1:
-                        # Usa un bottone disabilitato invece di success
-                        if in_cube:
-                            st.button("✓", key=f"incube_{card['unique_id']}", 
-                                     disabled=True, use_container_width=True, 
-                                     type="primary")
-                        else:
-                            if st.button("➕", key=f"add_{card['unique_id']}", use_container_width=True):
-                                if manager.add_cube(card['unique_id']):
-                                    st.cache_data.clear()
-                                    st.rerun()
-                    
-                    with col_btn2:
-                        if st.button("➖", key=f"rem_{card['unique_id']}", use_container_width=True):
-                            if manager.remove_cube(card['unique_id']):
-                                st.cache_data.clear()
-                                st.rerun()
-        
-        # Ripeti controlli paginazione in basso
-        st.markdown("---")
-        col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
-        
-        with col1:
-            if st.button("⏮️ First", key="first_bottom", disabled=(st.session_state.current_page == 0)):
-                st.session_state.current_page = 0
-                st.rerun()
-        
-        with col2:
-            if st.button("◀️ Prev", key="prev_bottom", disabled=(st.session_state.current_page == 0)):
-                st.session_state.current_page -= 1
-                st.rerun()
-        
-        with col3:
-            if st.button("▶️ Next", key="next_bottom", disabled=(st.session_state.current_page >= total_pages - 1)):
-                st.session_state.current_page += 1
-                st.rerun()
-        
-        with col4:
-            if st.button("⏭️ Last", key="last_bottom", disabled=(st.session_state.current_page >= total_pages - 1)):
-                st.session_state.current_page = total_pages - 1
-                st.rerun()
+            # Controlli paginazione
+            col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+            
+            with col1:
+                if st.button("⏮️ First", disabled=is_first):
+                    browse_go("cube_browse", result, "first", cards_per_page)
+            
+            with col2:
+                if st.button("◀️ Prev", disabled=is_first):
+                    browse_go("cube_browse", result, "prev", cards_per_page)
+            
+            with col3:
+                st.markdown(f"<h4 style='text-align: center;'>Page {nav['page'] + 1} / {total_pages}</h4>", 
+                           unsafe_allow_html=True)
+            
+            with col4:
+                if st.button("Next ▶️", disabled=is_last):
+                    browse_go("cube_browse", result, "next", cards_per_page)
+            
+            with col5:
+                if st.button("Last ⏭️", disabled=is_last):
+                    browse_go("cube_browse", result, "last", cards_per_page)
+
+            # =======================
+            # MOSTRA SOLO LA PAGINA CORRENTE
+            # =======================
+            # Griglia - solo carte della pagina corrente, un solo componente:
+            # i ➕/➖ segnati arrivano tutti insieme quando si preme "Apply"
+            with debugpanel.section("grid"):
+                events = cardgrid.card_grid(result["cards"], key="cube_grid", columns=cards_per_row,
+                                            thumb_url=images.thumb_url)
+            if events:
+                outcomes = cardgrid.apply_cube_events(manager, events, cube_id)
+                changed = sum(outcome in (ADDED, REMOVED) for outcome in outcomes.values())
+                log.info("✅ %s carte aggiornate nel cubo (%s richieste)", changed, len(events))
+                if changed:
+                    update_cube_count(outcomes)
+                    rerun_fragment()
+            
+            # Ripeti controlli paginazione in basso
+            st.markdown("---")
+            col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+            
+            with col1:
+                if st.button("⏮️ First", key="first_bottom", disabled=is_first):
+                    browse_go("cube_browse", result, "first", cards_per_page)
+            
+            with col2:
+                if st.button("◀️ Prev", key="prev_bottom", disabled=is_first):
+                    browse_go("cube_browse", result, "prev", cards_per_page)
+            
+            with col3:
+                if st.button("▶️ Next", key="next_bottom", disabled=is_last):
+                    browse_go("cube_browse", result, "next", cards_per_page)
+            
+            with col4:
+                if st.button("⏭️ Last", key="last_bottom", disabled=is_last):
+                    browse_go("cube_browse", result, "last", cards_per_page)
+
+    cube_browser()
 
 
 
@@ -658,6 +620,11 @@ elif page == "➕ Cube management":
 
 elif page == "📊 Other stats":
     st.header("📊 Choose one statistic")
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    px = debugpanel.traced(px, "charts")
+    go = debugpanel.traced(go, "charts")
     
     if cube_count == 0:
         st.warning("⚠️ Cube is empty!")
@@ -667,9 +634,12 @@ elif page == "📊 Other stats":
             ["🎨 Inks", "🃏 Type", "💎 Cost", "🖋️ Inkable", 
              "⚔️ Strength", "🛡️ Willpower", "📜 Lore", "🏷️ Classification", "🔑 Keywords"]
         )
+
+        # Una sola lettura del cubo per qualunque statistica scelta
+        cube_stats = manager.compute_all_stats(cube_id=cube_id)
         
         if stat_choice == "🎨 Inks":
-            stats = manager.stats_color()
+            stats = cube_stats.color
             if stats:
                 df = stats_to_df(stats)
                 # Rinomina colonne
@@ -711,9 +681,16 @@ elif page == "📊 Other stats":
                         yaxis_title="Number of Cards"
                     )
                     st.plotly_chart(fig, use_container_width=True)
-        
+
+                # Carte per singolo inchiostro (le dual-ink contano per entrambi)
+                if cube_stats.ink:
+                    st.markdown("#### 🖌️ Cards playable per ink")
+                    df_ink = stats_to_df(cube_stats.ink)
+                    df_ink = df_ink.rename(columns={'Nome': 'Ink', 'Conteggio': 'Cards', 'Percentuale': '%'})
+                    st.dataframe(df_ink, hide_index=True, use_container_width=True)
+
         elif stat_choice == "🃏 Type":
-            stats = manager.stats_type()
+            stats = cube_stats.type
             if stats:
                 df = stats_to_df(stats)
                 df = df.rename(columns={'Nome': 'Card Type', 'Conteggio': 'Cards', 'Percentuale': '%'})
@@ -728,7 +705,7 @@ elif page == "📊 Other stats":
                     st.plotly_chart(fig, use_container_width=True)
         
         elif stat_choice == "💎 Cost":
-            stats = manager.stats_cost()
+            stats = cube_stats.cost
             if stats:
                 df = stats_to_df(stats)
                 df = df.rename(columns={'Nome': 'Mana Cost', 'Conteggio': 'Cards', 'Percentuale': '%'})
@@ -755,7 +732,7 @@ elif page == "📊 Other stats":
                 st.dataframe(df, hide_index=True, use_container_width=True)
         
         elif stat_choice == "🖋️ Inkable":
-            stats = manager.stats_inkable()
+            stats = cube_stats.inkable
             if stats:
                 df = stats_to_df(stats)
                 df['Nome'] = df['Nome'].replace({'inkable_yes': 'Inkable', 'inkable_no': 'Non-Inkable'})
@@ -772,7 +749,7 @@ elif page == "📊 Other stats":
                     st.plotly_chart(fig, use_container_width=True)
         
         elif stat_choice == "⚔️ Strength":
-            stats = manager.stats_strength()
+            stats = cube_stats.strength
             if stats:
                 df = stats_to_df(stats)
                 df = df.rename(columns={'Nome': 'Strength', 'Conteggio': 'Cards', 'Percentuale': '%'})
@@ -788,7 +765,7 @@ elif page == "📊 Other stats":
                 st.dataframe(df, hide_index=True, use_container_width=True)
         
         elif stat_choice == "🛡️ Willpower":
-            stats = manager.stats_willpower()
+            stats = cube_stats.willpower
             if stats:
                 df = stats_to_df(stats)
                 df = df.rename(columns={'Nome': 'Willpower', 'Conteggio': 'Cards', 'Percentuale': '%'})
@@ -804,7 +781,7 @@ elif page == "📊 Other stats":
                 st.dataframe(df, hide_index=True, use_container_width=True)
         
         elif stat_choice == "📜 Lore":
-            stats = manager.stats_lore()
+            stats = cube_stats.lore
             if stats:
                 df = stats_to_df(stats)
                 df = df.rename(columns={'Nome': 'Lore', 'Conteggio': 'Cards', 'Percentuale': '%'})
@@ -820,7 +797,7 @@ elif page == "📊 Other stats":
                 st.dataframe(df, hide_index=True, use_container_width=True)
         
         elif stat_choice == "🏷️ Classification":
-            stats = manager.stats_classification()
+            stats = cube_stats.classification
             
             if stats:
                 df = stats_to_df(stats)
@@ -843,7 +820,7 @@ elif page == "📊 Other stats":
                 st.dataframe(df, hide_index=True, use_container_width=True)
         
         elif stat_choice == "🔑 Keywords":
-            stats = manager.stats_keyword()
+            stats = cube_stats.keyword
             if stats:
                 df = stats_to_df(stats)
                 df = df.rename(columns={'Nome': 'Keyword', 'Conteggio': 'Cards', 'Percentuale': '%'})
@@ -883,9 +860,6 @@ elif page == "📊 Other stats":
 elif page == "🏆 Report a tournament":
     st.header("🏆 Report a tournament")
     
-    # Setup tabella tornei se non esiste
-    manager.setup_tournaments_table()
-    
     # Form per inserire dati torneo
     st.subheader("📝 Tournament information")
     
@@ -915,207 +889,180 @@ elif page == "🏆 Report a tournament":
     if not winner_name or not selected_colors:
         st.warning("Enter winner name and winning inks")
     else:
-        st.subheader(f"🃏 Build {winner_name}'s deck")
-        
-        # Inizializza session state per il mazzo
-        if 'tournament_deck' not in st.session_state:
-            st.session_state.tournament_deck = []
-
-        #Hidden inkaster toggle
-        if 'include_hidden_inkcaster' not in st.session_state:
-            st.session_state.include_hidden_inkcaster = False
-        
-        st.markdown("#### 🎴 Did you play Hidden Inkcaster in your deck?")
-        col_toggle, col_info = st.columns([1, 3])
-
-        with col_toggle:
-            include_inkcaster = st.checkbox(
-                "Add Hidden Inkcaster",
-                value=st.session_state.include_hidden_inkcaster,
-                key="inkcaster_checkbox"
-            )
-            st.session_state.include_hidden_inkcaster = include_inkcaster
-        
-        with col_info:
-            if include_inkcaster:
-                st.success("✅ Hidden Inkcaster will be added to the deck (doesn't count toward 40 cards)")
-            else:
-                st.info("ℹ️ Hidden Inkcaster can be added to any deck regardless of ink colors")
-        
-        st.markdown("---")
-        
-        # Calcola conteggio carte (Hidden Inkcaster non conta se incluso)
-        HIDDEN_INKCASTER_ID = "URS-098"
-        
-        # Rimuovi Hidden Inkcaster dal conteggio se presente
-        deck_cards_without_inkcaster = [
-            card_id for card_id in st.session_state.tournament_deck 
-            if card_id != HIDDEN_INKCASTER_ID
-        ]
-        
-        # Mostra conteggio carte nel mazzo
-        deck_count = len(st.session_state.tournament_deck)
-
-        # Aggiungi/Rimuovi automaticamente Hidden Inkcaster
-        if include_inkcaster and HIDDEN_INKCASTER_ID not in st.session_state.tournament_deck:
-            st.session_state.tournament_deck.insert(0, HIDDEN_INKCASTER_ID)
-        elif not include_inkcaster and HIDDEN_INKCASTER_ID in st.session_state.tournament_deck:
-            st.session_state.tournament_deck.remove(HIDDEN_INKCASTER_ID)
-        
-        
-        col_info1, col_info2, col_info3 = st.columns(3)
-        with col_info1:
-            st.metric("📦 Cards in deck", deck_count)
-        with col_info2:
-            if deck_count >= 40:
-                st.success("✅ Deck complete (40+)")
-            else:
-                st.warning(f"⚠️ Need {40 - deck_count} more cards")
-        with col_info3:
-            if st.button("🗑️ Clear deck", type="secondary"):
+        # costruzione del mazzo in un fragment: i clic sulla griglia e la paginazione
+        # rieseguono solo questa parte, non tutta la pagina
+        @st.fragment
+        @debugpanel.profiled("deck_builder", debug_slot)
+        def deck_builder():
+            st.subheader(f"🃏 Build {winner_name}'s deck")
+            
+            # Inizializza session state per il mazzo
+            if 'tournament_deck' not in st.session_state:
                 st.session_state.tournament_deck = []
-                st.rerun()
-        
-        # Carica carte del cubo con i colori selezionati
-        @st.cache_data(ttl=10)
-        def load_cube_cards_filtered(colors_tuple):
-            """Carica carte del cubo filtrate per colori"""
-            all_rows = manager.search_cards("", in_cube=True)
-            filtered_cards = []
+
+            #Hidden inkaster toggle
+            if 'include_hidden_inkcaster' not in st.session_state:
+                st.session_state.include_hidden_inkcaster = False
             
-            colors_lower = [c.lower() for c in colors_tuple]
+            st.markdown("#### 🎴 Did you play Hidden Inkcaster in your deck?")
+            col_toggle, col_info = st.columns([1, 3])
+
+            with col_toggle:
+                include_inkcaster = st.checkbox(
+                    "Add Hidden Inkcaster",
+                    value=st.session_state.include_hidden_inkcaster,
+                    key="inkcaster_checkbox"
+                )
+                st.session_state.include_hidden_inkcaster = include_inkcaster
             
-            for r in all_rows:
-                row = dict(r)
-                card_colors = str(row.get("color") or "").lower()
-                
-                # Controlla se la carta ha SOLO i colori selezionati
-                card_color_list = [c.strip() for c in card_colors.replace('/', ',').split(',')]
-                
-                # La carta deve avere solo colori della tripla selezionata
-                if all(cc in colors_lower for cc in card_color_list if cc):
-                    filtered_cards.append({
-                        "unique_id": row.get("unique_id") or "",
-                        "name": row.get("name") or "",
-                        "image": row.get("Image") or "",
-                        "color": row.get("color") or "",
-                        "type": row.get("type") or "",
-                        "cost": row.get("cost") or "",
-                    })
+            with col_info:
+                if include_inkcaster:
+                    st.success("✅ Hidden Inkcaster will be added to the deck (doesn't count toward 40 cards)")
+                else:
+                    st.info("ℹ️ Hidden Inkcaster can be added to any deck regardless of ink colors")
             
-            return filtered_cards
-        
-        available_cards = load_cube_cards_filtered(tuple(selected_colors))
-        
-        st.write(f"**Available cards: {len(available_cards)}**")
-        
-        # Paginazione
-        cards_per_page = 48
-        
-        if 'tournament_page' not in st.session_state:
-            st.session_state.tournament_page = 0
-        
-        total_pages = (len(available_cards) - 1) // cards_per_page + 1 if available_cards else 0
-        
-        if total_pages > 0:
-            # Controlli paginazione
-            col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+            st.markdown("---")
             
-            with col1:
-                if st.button("⏮️", key="first_t", disabled=(st.session_state.tournament_page == 0)):
-                    st.session_state.tournament_page = 0
-                    st.rerun()
+            # Calcola conteggio carte (Hidden Inkcaster non conta se incluso)
+            HIDDEN_INKCASTER_ID = "URS-098"
             
-            with col2:
-                if st.button("◀️", key="prev_t", disabled=(st.session_state.tournament_page == 0)):
-                    st.session_state.tournament_page -= 1
-                    st.rerun()
+            # Rimuovi Hidden Inkcaster dal conteggio se presente
+            deck_cards_without_inkcaster = [
+                card_id for card_id in st.session_state.tournament_deck 
+                if card_id != HIDDEN_INKCASTER_ID
+            ]
             
-            with col3:
-                st.markdown(f"<h4 style='text-align: center;'>Page {st.session_state.tournament_page + 1} / {total_pages}</h4>", 
-                           unsafe_allow_html=True)
+            # Mostra conteggio carte nel mazzo
+            deck_count = len(st.session_state.tournament_deck)
+
+            # Aggiungi/Rimuovi automaticamente Hidden Inkcaster
+            if include_inkcaster and HIDDEN_INKCASTER_ID not in st.session_state.tournament_deck:
+                st.session_state.tournament_deck.insert(0, HIDDEN_INKCASTER_ID)
+            elif not include_inkcaster and HIDDEN_INKCASTER_ID in st.session_state.tournament_deck:
+                st.session_state.tournament_deck.remove(HIDDEN_INKCASTER_ID)
             
-            with col4:
-                if st.button("▶️", key="next_t", disabled=(st.session_state.tournament_page >= total_pages - 1)):
-                    st.session_state.tournament_page += 1
-                    st.rerun()
             
-            with col5:
-                if st.button("⏭️", key="last_t", disabled=(st.session_state.tournament_page >= total_pages - 1)):
-                    st.session_state.tournament_page = total_pages - 1
-                    st.rerun()
+            col_info1, col_info2, col_info3 = st.columns(3)
+            with col_info1:
+                st.metric("📦 Cards in deck", deck_count)
+            with col_info2:
+                if deck_count >= 40:
+                    st.success("✅ Deck complete (40+)")
+                else:
+                    st.warning(f"⚠️ Need {40 - deck_count} more cards")
+            with col_info3:
+                if st.button("🗑️ Clear deck", type="secondary"):
+                    st.session_state.tournament_deck = []
+                    rerun_fragment()
             
-            # Mostra carte della pagina corrente
-            start_idx = st.session_state.tournament_page * cards_per_page
-            end_idx = min(start_idx + cards_per_page, len(available_cards))
-            current_cards = available_cards[start_idx:end_idx]
+            # Carica carte del cubo con i colori selezionati
+            # La carta deve avere solo colori della tripla selezionata (filtro ink_mask in SQL)
+            cards_per_page = 48
+            deck_filters = {"colors": tuple(selected_colors), "within": True, "in_cube": 1}
+            nav, result = browse_page("tournament_browse", deck_filters, cards_per_page)
             
-            # CSS
-            st.markdown("""
-                <style>
-                .card-image {
-                    width: 100%;
-                    border-radius: 8px;
-                    transition: transform 0.2s;
-                    display: block;
-                }
-                .card-image:hover {
-                    transform: scale(1.05);
-                }
-                </style>
-            """, unsafe_allow_html=True)
+            st.write(f"**Available cards: {result['total']}**")
             
-            # Griglia carte
-            cards_per_row = 8
+            # Paginazione
+            total_pages = (result["total"] - 1) // cards_per_page + 1 if result["total"] else 0
             
-            for i in range(0, len(current_cards), cards_per_row):
-                cols = st.columns(cards_per_row, gap="small")
+            if total_pages > 0:
+                is_first = nav["page"] == 0
+                is_last = nav["page"] >= total_pages - 1
                 
-                for idx, card in enumerate(current_cards[i:i+cards_per_row]):
-                    with cols[idx]:
-                        img = card['image'] or f"https://via.placeholder.com/300x420?text={card['name']}"
-                        
-                        st.markdown(f'<img src="{img}" class="card-image" alt="{card["name"]}">', 
-                                   unsafe_allow_html=True)
-                        
-                        # Controlla se già nel mazzo
-                        in_deck = card['unique_id'] in st.session_state.tournament_deck
+                # Controlli paginazione
+                col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+                
+                with col1:
+                    if st.button("⏮️", key="first_t", disabled=is_first):
+                        browse_go("tournament_browse", result, "first", cards_per_page)
+                
+                with col2:
+                    if st.button("◀️", key="prev_t", disabled=is_first):
+                        browse_go("tournament_browse", result, "prev", cards_per_page)
+                
+                with col3:
+                    st.markdown(f"<h4 style='text-align: center;'>Page {nav['page'] + 1} / {total_pages}</h4>", 
+                               unsafe_allow_html=True)
+                
+                with col4:
+                    if st.button("▶️", key="next_t", disabled=is_last):
+                        browse_go("tournament_browse", result, "next", cards_per_page)
+                
+                with col5:
+                    if st.button("⏭️", key="last_t", disabled=is_last):
+                        browse_go("tournament_browse", result, "last", cards_per_page)
+                
+                # Mostra carte della pagina corrente
+                current_cards = result["cards"]
+                
+                # CSS
+                st.markdown("""
+                    <style>
+                    .card-image {
+                        width: 100%;
+                        border-radius: 8px;
+                        transition: transform 0.2s;
+                        display: block;
+                    }
+                    .card-image:hover {
+                        transform: scale(1.05);
+                    }
+                    </style>
+                """, unsafe_allow_html=True)
+                
+                # Griglia carte
+                cards_per_row = 8
+                
+                with debugpanel.section("grid"):
+                    for i in range(0, len(current_cards), cards_per_row):
+                        cols = st.columns(cards_per_row, gap="small")
+                    
+                        for idx, card in enumerate(current_cards[i:i+cards_per_row]):
+                            with cols[idx]:
+                                st.markdown(card_image_html(card), unsafe_allow_html=True)
+                            
+                                # Controlla se già nel mazzo
+                                in_deck = card['unique_id'] in st.session_state.tournament_deck
+                            
+                                if in_deck:
+                                    # Mostra quante copie
+                                    count = st.session_state.tournament_deck.count(card['unique_id'])
+                                    if st.button(f"✓ ({count})", key=f"td_{card['unique_id']}_{idx}", 
+                                               disabled=True, type="primary", use_container_width=True):
+                                        pass
+                                else:
+                                    if st.button("➕", key=f"tadd_{card['unique_id']}_{idx}", use_container_width=True):
+                                        st.session_state.tournament_deck.append(card['unique_id'])
+                                        rerun_fragment()
+            
+            # Bottone salva torneo
+            st.markdown("---")
+            
+            if deck_count >= 40:
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col2:
+                    if st.button("💾 Save Tournament", type="primary", use_container_width=True):
+                        colors_str = "/".join(selected_colors)
+                        success = manager.add_tournament(
+                            winner_name, 
+                            colors_str, 
+                            tournament_date.isoformat(),
+                            st.session_state.tournament_deck,
+                            cube_id=cube_id
+                        )
                         
-                        if in_deck:
-                            # Mostra quante copie
-                            count = st.session_state.tournament_deck.count(card['unique_id'])
-                            if st.button(f"✓ ({count})", key=f"td_{card['unique_id']}_{idx}", 
-                                       disabled=True, type="primary", use_container_width=True):
-                                pass
+                        if success:
+                            st.success(f"🎉 Tournament saved! Winner: {winner_name}")
+                            st.session_state.tournament_deck = []
+                            st.session_state.pop("tournament_browse", None)
+                            st.balloons()
                         else:
-                            if st.button("➕", key=f"tadd_{card['unique_id']}_{idx}", use_container_width=True):
-                                st.session_state.tournament_deck.append(card['unique_id'])
-                                st.rerun()
-        
-        # Bottone salva torneo
-        st.markdown("---")
-        
-        if deck_count >= 40:
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                if st.button("💾 Save Tournament", type="primary", use_container_width=True):
-                    colors_str = "/".join(selected_colors)
-                    success = manager.add_tournament(
-                        winner_name, 
-                        colors_str, 
-                        tournament_date.isoformat(),
-                        st.session_state.tournament_deck
-                    )
-                    
-                    if success:
-                        st.success(f"🎉 Tournament saved! Winner: {winner_name}")
-                        st.session_state.tournament_deck = []
-                        st.session_state.tournament_page = 0
-                        st.balloons()
-                    else:
-                        st.error("❌ Error saving tournament")
-        else:
-            st.info("ℹ️ Add at least 40 cards to save the tournament")
+                            st.error("❌ Error saving tournament")
+            else:
+                st.info("ℹ️ Add at least 40 cards to save the tournament")
+
+        deck_builder()
 
 
 
@@ -1137,9 +1084,13 @@ elif page == "🏆 Report a tournament":
 
 elif page == "📈 Tournament stats":
     st.header("📈 Tournament Statistics")
+    import pandas as pd
+    import plotly.express as px
+    pd = debugpanel.traced(pd, "dataframe")
+    px = debugpanel.traced(px, "charts")
     
     # Verifica se ci sono tornei
-    all_tournaments = manager.get_all_tournaments()
+    all_tournaments = manager.get_all_tournaments(cube_id=cube_id)
     
     if not all_tournaments:
         st.warning("⚠️ No tournaments registered yet!")
@@ -1161,7 +1112,7 @@ elif page == "📈 Tournament stats":
         with tab1:
             st.subheader("🃏 Most winning cards")
             
-            card_stats = manager.get_card_winrate()
+            card_stats = manager.get_card_winrate(cube_id=cube_id)
             
             if card_stats:
                 # Converti in DataFrame
@@ -1211,7 +1162,7 @@ elif page == "📈 Tournament stats":
         with tab2:
             st.subheader("🎨 Most winning color combinations")
             
-            color_stats = manager.get_color_winrate()
+            color_stats = manager.get_color_winrate(cube_id=cube_id)
             
             if color_stats:
                 df_colors = pd.DataFrame(color_stats, columns=['Color Combo', 'Wins'])
@@ -1258,7 +1209,7 @@ elif page == "📈 Tournament stats":
         with tab3:
             st.subheader("👑 Top players")
             
-            winner_stats = manager.get_winner_stats()
+            winner_stats = manager.get_winner_stats(cube_id=cube_id)
             
             if winner_stats:
                 df_winners = pd.DataFrame(winner_stats, columns=['Player', 'Wins', 'Colors Used'])
@@ -1386,15 +1337,13 @@ elif page == "📈 Tournament stats":
 elif page == "💾 Backup/Restore":
     st.header("💾 Backup & Restore Cube")
     
-    cube_count = manager.get_cube_count()
-    
-    st.info(f"📦 Current cube: **{cube_count} cards**")
+    st.info(f"📦 Current cube: **{cube_name}** ({cube_count} cards)")
     
     # =======================
     # EXPORT
     # =======================
     st.subheader("📤 Export Cube")
-    st.write("Save your current cube to a JSON file")
+    st.write(f"Save {cube_name} to a JSON file")
     
     col1, col2 = st.columns([2, 1])
     
@@ -1411,7 +1360,7 @@ elif page == "💾 Backup/Restore":
             if cube_count == 0:
                 st.warning("⚠️ Cube is empty!")
             else:
-                result = manager.export_cube_to_json(export_filename)
+                result = manager.export_cube_to_json(export_filename, cube_id=cube_id)
                 if result:
                     st.success(f"✅ Cube exported to `{result}`")
                     
@@ -1430,7 +1379,7 @@ elif page == "💾 Backup/Restore":
     
     # Mostra lista ID (per debug/controllo)
     with st.expander("🔍 View card IDs in cube"):
-        card_ids = manager.get_cube_id_list()
+        card_ids = manager.get_cube_id_list(cube_id=cube_id)
         st.code("\n".join(card_ids), language="text")
         
         # Download lista semplice
@@ -1448,7 +1397,7 @@ elif page == "💾 Backup/Restore":
     # IMPORT
     # =======================
     st.subheader("📥 Import Cube")
-    st.write("Restore a cube from a backup file")
+    st.write(f"Restore a backup file into {cube_name}")
     
     uploaded_file = st.file_uploader(
         "Choose backup file (JSON)",
@@ -1462,6 +1411,8 @@ elif page == "💾 Backup/Restore":
         
         st.success(f"✅ File loaded: {backup_data.get('total_cards', 0)} cards")
         st.info(f"📅 Backup date: {backup_data.get('export_date', 'Unknown')}")
+        if backup_data.get("cube_name"):
+            st.info(f"🧊 Backup of: {backup_data['cube_name']}")
         
         col1, col2 = st.columns(2)
         
@@ -1482,13 +1433,11 @@ elif page == "💾 Backup/Restore":
                     json.dump(backup_data, f)
                 
                 # Importa
-                success = manager.import_cube_from_json(temp_filename, clear_existing=clear_cube)
+                success = manager.import_cube_from_json(temp_filename, clear_existing=clear_cube, cube_id=cube_id)
                 
                 if success:
                     st.success("✅ Cube imported successfully!")
                     st.balloons()
-                    # Pulisci cache
-                    st.cache_data.clear()
                     
                     # Rimuovi file temporaneo
                     import os
@@ -1566,7 +1515,5 @@ elif page == "📜 Rules":
     
     
 # Footer
-st.sidebar.markdown("---")
-st.sidebar.info("Lorcana Cube Manager v1.0\nCreated by camposssssss")
 st.markdown("---")
-st.sidebar.info("'No no no no no no kid. Giving up is for rookies - 🎬 Hercules'")
\ No newline at end of file
+debugpanel.finish(debug_slot, manager)
\ No newline at end of file
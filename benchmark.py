@@ -0,0 +1,226 @@
+#benchmark: tempi dei metodi pubblici di CubeManager al crescere del catalogo
+#per ogni dimensione crea (o riusa) un db sintetico con synthetic.py, ne lavora su una copia,
+#chiama ogni metodo più volte senza query cache e salva mediana e minimo in JSON;
+#con --baseline confronta con un run precedente ed esce con codice 1 se un metodo
+#è più lento della soglia (da usare come controllo prima del merge)
+#
+#uso:
+#   python benchmark.py                                     2k, 20k e 200k carte + 10k tornei
+#   python benchmark.py --sizes 2000 20000 --json bench.json
+#   python benchmark.py --json new.json --baseline bench.json --threshold 0.25
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import synthetic
+from cubeManager import AUDIT_CALLS, CubeManager
+from schema import DEFAULT_CUBE_ID
+
+
+DEFAULT_SIZES = (2000, 20000, 200000)
+DEFAULT_TOURNAMENTS = 10000
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25  # mediana più lenta del 25% = regressione
+NOISE_FLOOR_MS = 1.0  # differenze più piccole sono rumore, non regressioni
+WORKDIR = os.path.join(tempfile.gettempdir(), "lcm_benchmark")
+
+# le chiamate di explain_queries più quelle che lì non servono;
+# set_cube rimette il cubo com'è ({cube}) invece di ridurlo a una carta,
+# create_cube dalla seconda volta troverebbe il nome già preso
+BENCH_CALLS = tuple((method, args) for method, args, _ in AUDIT_CALLS
+                    if method not in ("set_cube", "create_cube")) + (
+    ("set_cube", ("{cube}",)),
+    ("data_version", ()),
+    ("setup_tournaments_table", ()),
+    ("stats_all", ()),
+    ("export_cube_to_json", ("{file}",)),
+    ("import_cube_from_json", ("{file}", True)),
+)
+
+# le modifiche al cubo si misurano sul percorso che scrive davvero: prima di ogni chiamata
+# (anche quella di riscaldamento, fuori dal tempo) si rimette il cubo nello stato di partenza,
+# altrimenti dalla seconda volta add/remove trovano la carta già dentro/fuori e non scrivono niente
+PREPARE = {
+    "add_cube": ("remove_cube_many", (["{card}"],)),
+    "add_cube_many": ("remove_cube_many", (["{card}"],)),
+    "remove_cube": ("add_cube_many", (["{card}"],)),
+    "remove_cube_many": ("add_cube_many", (["{card}"],)),
+    # set_cube e l'import con replace rimettono il cubo com'era: prima gli si toglie una carta
+    "set_cube": ("remove_cube_many", ("{cube_card}",)),
+    "import_cube_from_json": ("remove_cube_many", ("{cube_card}",)),
+}
+
+# metodi pubblici non misurati: connessione, menù interattivo, diagnostica
+# e creazione/rinomina/cancellazione dei cubi (ripetute non rifanno lo stesso lavoro)
+SKIPPED = {"connect", "close", "menu", "cached", "cache_stats", "explain_queries",
+           "create_cube", "rename_cube", "delete_cube"}
+
+
+def call_labels(calls):
+    """Nome stabile di ogni chiamata: il metodo, con #2, #3... quando si ripete"""
+    seen, labels = {}, []
+    for method, _ in calls:
+        seen[method] = seen.get(method, 0) + 1
+        labels.append(method if seen[method] == 1 else f"{method}#{seen[method]}")
+    return labels
+
+
+def uncovered_methods():
+    """Metodi pubblici di CubeManager che il benchmark non chiama"""
+    public = {name for name in dir(CubeManager)
+              if not name.startswith("_") and callable(getattr(CubeManager, name))}
+    return sorted(public - SKIPPED - {method for method, _ in BENCH_CALLS})
+
+
+def database_for(size, tournaments, seed, sample):
+    """Db sintetico in WORKDIR, generato solo se non c'è già"""
+    os.makedirs(WORKDIR, exist_ok=True)
+    path = os.path.join(WORKDIR, f"synthetic_{size}_{tournaments}_{seed}_{synthetic.DEFAULT_CUBES}cubes.db")
+    if os.path.exists(path):
+        return path, 0.0
+    print(f"🧪 Generazione db sintetico: {size} carte, {tournaments} tornei...")
+    return path, synthetic.build_database(path, size, tournaments, seed=seed, sample=sample)
+
+
+def bench_size(path, repeat):
+    """Misura BENCH_CALLS su una copia del db, ritorna {etichetta: tempi}"""
+    work = path + ".run"
+    shutil.copyfile(path, work)
+    backup = os.path.join(WORKDIR, "cube_backup.json")
+    manager = CubeManager(work, cache_size=0)  # senza cache ogni chiamata va sul db
+    with redirect_stdout(io.StringIO()):
+        manager.connect()
+    conn = manager.conn
+    cube = [row[0] for row in conn.execute("SELECT card_id FROM cube_cards WHERE cube_id = ?",
+                                           (DEFAULT_CUBE_ID,))]
+    card = conn.execute("SELECT unique_id FROM cards WHERE unique_id NOT IN "
+                        "(SELECT card_id FROM cube_cards WHERE cube_id = ?) LIMIT 1",
+                        (DEFAULT_CUBE_ID,)).fetchone()[0]
+    placeholders = {"{card}": card, "{cube}": cube, "{cube_card}": cube[:1], "{file}": backup}
+
+    def fill(value):
+        if isinstance(value, str) and value in placeholders:
+            return placeholders[value]
+        if isinstance(value, (list, tuple)):
+            return type(value)(fill(v) for v in value)
+        return value
+
+    results = {}
+    for label, (method, args) in zip(call_labels(BENCH_CALLS), BENCH_CALLS):
+        args = tuple(fill(a) for a in args)
+        fn = getattr(manager, method)
+        prepare_method, prepare_args = PREPARE.get(method, (None, ()))
+        prepare = getattr(manager, prepare_method) if prepare_method else lambda *a: None
+        prepare_args = tuple(fill(a) for a in prepare_args)
+        times = []
+        with redirect_stdout(io.StringIO()):
+            prepare(*prepare_args)
+            fn(*args)  # riscaldamento: cache di sqlite e del sistema operativo
+            for _ in range(repeat):
+                prepare(*prepare_args)
+                start = time.perf_counter()
+                fn(*args)
+                times.append((time.perf_counter() - start) * 1000)
+        results[label] = {
+            "method": method,
+            "median_ms": statistics.median(times),
+            "min_ms": min(times),
+            "max_ms": max(times),
+        }
+    with redirect_stdout(io.StringIO()):
+        manager.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(work + suffix):
+            os.remove(work + suffix)
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Ritorna (regressioni, miglioramenti): liste di (dimensione, etichetta, vecchio, nuovo)"""
+    regressions, improvements = [], []
+    for size, data in current["sizes"].items():
+        old_calls = baseline.get("sizes", {}).get(size, {}).get("calls", {})
+        for label, result in data["calls"].items():
+            if label not in old_calls:
+                continue
+            old, new = old_calls[label]["median_ms"], result["median_ms"]
+            if new > old * (1 + threshold) and new - old > NOISE_FLOOR_MS:
+                regressions.append((size, label, old, new))
+            elif old > new * (1 + threshold) and old - new > NOISE_FLOOR_MS:
+                improvements.append((size, label, old, new))
+    return regressions, improvements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dei metodi di CubeManager su db sintetici")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="numero di carte dei db (default: %(default)s)")
+    parser.add_argument("--tournaments", type=int, default=DEFAULT_TOURNAMENTS,
+                        help="tornei in ogni db (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="misure per ogni metodo (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED)
+    parser.add_argument("--json", help="salva i risultati in questo file")
+    parser.add_argument("--baseline", help="risultati di un run precedente da confrontare")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="rallentamento relativo oltre cui è una regressione (default: %(default)s)")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "tournaments": args.tournaments,
+            "seed": args.seed,
+        },
+        "sizes": {},
+    }
+    missing = uncovered_methods()
+    if missing:
+        print(f"⚠️ Metodi pubblici non misurati: {', '.join(missing)}")
+
+    sample = synthetic.load_sample()
+    for size in args.sizes:
+        path, build_s = database_for(size, args.tournaments, args.seed, sample)
+        print("\n" + "=" * 70)
+        print(f"📊 {size} carte, {args.tournaments} tornei" + (f" (db creato in {build_s:.1f}s)" if build_s else ""))
+        print("=" * 70)
+        calls = bench_size(path, args.repeat)
+        report["sizes"][str(size)] = {"build_s": build_s, "calls": calls}
+        for label, result in calls.items():
+            print(f"  {label:28} {result['median_ms']:10.2f} ms   (min {result['min_ms']:.2f})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Risultati salvati in {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, improvements = compare(report, baseline, args.threshold)
+        print("\n" + "=" * 70)
+        print(f"🔍 CONFRONTO CON {args.baseline} (soglia +{args.threshold:.0%})")
+        print("=" * 70)
+        for size, label, old, new in improvements:
+            print(f"  ✅ {size:>7} {label:28} {old:10.2f} -> {new:10.2f} ms")
+        for size, label, old, new in regressions:
+            print(f"  ❌ {size:>7} {label:28} {old:10.2f} -> {new:10.2f} ms")
+        if regressions:
+            print(f"\n❌ Regressioni: {len(regressions)}")
+            sys.exit(1)
+        print("\n✅ Nessuna regressione")
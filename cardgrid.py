@@ -0,0 +1,64 @@
+#cardgrid: griglia di carte della gestione cubo come un solo componente streamlit
+#i clic su ➕/➖ restano nel browser finché non si preme "Apply", poi arrivano tutti insieme
+#come lista di (unique_id, azione) e diventano una chiamata batch e un solo rerun
+
+import functools
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from gallery import COMPONENTS_DIR
+
+
+ADD = "add"
+REMOVE = "remove"
+
+@functools.cache
+def _card_grid():
+    # dichiarato alla prima griglia e non all'import: le altre pagine non lo pagano
+    return components.declare_component("card_grid", path=os.path.join(COMPONENTS_DIR, "card_grid"))
+
+
+def compact_cards(cards, thumb_url=None):
+    """Carte di browse() -> liste [unique_id, nome, miniatura, in_cube, immagine]"""
+    compact = []
+    for card in cards:
+        image = card["image"] or ""
+        name = card["name"] or ""
+        compact.append([
+            card["unique_id"],
+            name,
+            thumb_url(image, name) if thumb_url else image,
+            int(card["in_cube"] or 0),
+            image,
+        ])
+    return compact
+
+
+def card_grid(cards, key, columns=8, thumb_url=None):
+    """Mostra una pagina di carte; ritorna gli eventi [(unique_id, azione)] di un batch nuovo, altrimenti []
+
+    Il valore del componente resta in session_state fra un rerun e l'altro:
+    l'id del batch serve a non applicare due volte gli stessi eventi.
+    """
+    value = _card_grid()(cards=compact_cards(cards, thumb_url), columns=columns, key=key, default=None)
+    applied_key = f"{key}_applied"
+    if not value or value.get("batch") == st.session_state.get(applied_key):
+        return []
+    st.session_state[applied_key] = value.get("batch")
+    return [(uid, action) for uid, action in value.get("events", []) if action in (ADD, REMOVE)]
+
+
+def apply_cube_events(manager, events, cube_id):
+    """Eventi della griglia -> add_cube_many / remove_cube_many sul cubo cube_id (per ogni carta vale
+    l'ultima azione). Ritorna gli esiti {id: esito} delle due chiamate"""
+    final = dict(events)
+    outcomes = {}
+    adds = [uid for uid, action in final.items() if action == ADD]
+    removes = [uid for uid, action in final.items() if action == REMOVE]
+    if adds:
+        outcomes.update(manager.add_cube_many(adds, cube_id=cube_id))
+    if removes:
+        outcomes.update(manager.remove_cube_many(removes, cube_id=cube_id))
+    return outcomes
@@ -2,262 +2,974 @@
 
 import sqlite3
 import json
+import io
+import functools
+import inspect
+import logging
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import dataclass, field
 from datetime import datetime
 
+import perf
+import schema
+from dbpool import ConnectionPool, DEFAULT_BUSY_TIMEOUT
+from querycache import QueryCache, DEFAULT_CACHE_SIZE, freeze
+from schema import DEFAULT_CUBE_ID, KEYWORDS
+
+
+# messaggi a livelli: l'app non configura il logging e vede solo warning ed errori,
+# il menù da console mostra anche le statistiche (INFO); i conteggi delle ricerche sono DEBUG
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class CubeStats:
+    """Fotografia di tutte le statistiche del cubo: le carte del cubo vengono lette una volta sola,
+    inchiostri e classificazioni arrivano dalle stesse query sulle tabelle normalizzate dei metodi stats_*().
+
+    Ogni distribuzione ha lo stesso formato del relativo metodo stats_*():
+    {valore: {'count': n, 'percentage': p}} (lore: {valore: n}).
+    """
+    total: int = 0
+    characters: int = 0
+    color: dict = field(default_factory=dict)
+    ink: dict = field(default_factory=dict)
+    type: dict = field(default_factory=dict)
+    cost: dict = field(default_factory=dict)
+    inkable: dict = field(default_factory=dict)
+    strength: dict = field(default_factory=dict)
+    willpower: dict = field(default_factory=dict)
+    lore: dict = field(default_factory=dict)
+    classification: dict = field(default_factory=dict)
+    keyword: dict = field(default_factory=dict)
+
+    def print_report(self):
+        """Stampa tutte le distribuzioni in console"""
+        for color, s in self.color.items():
+            print(f"🎨 {color:<15}: {s['count']:>3} | {s['percentage']:>5.2f}%")
+        for ink, s in self.ink.items():
+            print(f"🖌️ {ink:<15}: {s['count']:>3} | {s['percentage']:>5.2f}%")
+        for type, s in self.type.items():
+            print(f"🃏 {type:<15}: {s['count']:>3} | {s['percentage']:>5.2f}%")
+        for cost, s in self.cost.items():
+            print(f"💰 {cost:<5}: {s['count']:>3} | {s['percentage']:5.2f}%")
+        for key, label in (('inkable_yes', '🖋️ Inkable'), ('inkable_no', '❌ Non Inkable')):
+            s = self.inkable.get(key, {'count': 0, 'percentage': 0})
+            print(f"{label}: {s['count']} | {s['percentage']:5.2f}%")
+        for strength, s in self.strength.items():
+            print(f"⚔️ {strength:<5}: {s['count']:>3} | {s['percentage']:>5.2f}%")
+        for willpower, s in self.willpower.items():
+            print(f"🛡️ {willpower:<5}: {s['count']:>3} | {s['percentage']:>5.2f}")
+        for lore, count in self.lore.items():
+            print(f"📜 {lore:<5}: {count:>3}")
+        print(f"\n🏷️  CLASSIFICAZIONI ({self.characters} Character):")
+        for classification, s in self.classification.items():
+            bar = "█" * int(s['percentage'] / 3)
+            print(f"🔖 {classification:<15}: {s['count']:>3} | {s['percentage']:>5.2f}% {bar}")
+        print(f"\n🔑 PAROLE CHIAVE ({self.characters} Character):")
+        for keyword, s in self.keyword.items():
+            bar = "█" * int(s['percentage'] / 3)
+            print(f"🔑 {keyword:<15}: {s['count']:>3} | {s['percentage']:>5.2f}% {bar}")
+
+
+def _with_percentage(counts, total, sort_key=None):
+    #{valore: n} -> {valore: {'count': n, 'percentage': p}}
+    keys = sorted(counts, key=sort_key) if sort_key else counts
+    return {k: {'count': counts[k], 'percentage': (counts[k] / total) * 100 if total else 0} for k in keys}
+
+
+def _count_bits(mask, counters):
+    #incrementa counters[i] per ogni bit i acceso in mask
+    mask = mask or 0
+    bit = 0
+    while mask:
+        if mask & 1:
+            counters[bit] += 1
+        mask >>= 1
+        bit += 1
+
+
+def _card_dicts(rows):
+    #righe (unique_id, name, type, color, cost, Image) -> lista di dizionari per facilità d'uso
+    return [{
+        'unique_id': row[0],
+        'name': row[1],
+        'type': row[2],
+        'color': row[3],
+        'cost': row[4],
+        'Image': row[5]
+    } for row in rows]
+
+
+def _none_first(value):
+    #ordinamento come ORDER BY di sqlite: NULL prima, poi numeri, poi testo
+    if value is None:
+        return (0, 0, "")
+    if isinstance(value, (int, float)):
+        return (1, value, "")
+    return (2, 0, str(value))
+
+
+def _in_cube_sql(column="unique_id", negate=False):
+    #condizione "la carta è nel cubo ?": la subquery è un intervallo della chiave (cube_id, card_id)
+    return f"{column} {'NOT ' if negate else ''}IN (SELECT card_id FROM cube_cards WHERE cube_id = ?)"
+
+
+# operazioni fra cubi (cube_union / cube_intersection / cube_difference) -> compound SELECT di sqlite
+CUBE_SET_OPS = {"union": "UNION", "intersection": "INTERSECT", "difference": "EXCEPT"}
+
+# esiti per carta delle modifiche al cubo (add_cube_many / remove_cube_many / set_cube)
+ADDED = "added"
+REMOVED = "removed"
+ALREADY_PRESENT = "already present"
+NOT_IN_CUBE = "not in cube"
+UNKNOWN = "unknown"
+
+# tabella temporanea (solo sulla connessione di scrittura) con gli id di una modifica massiva
+CREATE_CUBE_BATCH_SQL = "CREATE TEMP TABLE IF NOT EXISTS cube_batch (unique_id TEXT PRIMARY KEY) WITHOUT ROWID"
+TEMP_TABLES = ("cube_batch",)
+
+
+# ordinamenti di browse(): espressioni della chiave keyset (l'ultima rende la chiave unica)
+BROWSE_SORTS = {
+    "set": ("card_key",),  # ordine del catalogo (set e numero)
+    "name": ("name", "unique_id"),
+    "cost": ("COALESCE(cost, -1)", "name", "unique_id"),
+}
+BROWSE_PAGE_SIZE = 48
+BROWSE_END = ()  # before_key per chiedere l'ultima pagina
+
+
+# chiamate usate da explain_queries(): (metodo, argomenti, full scan atteso)
+# {card} viene sostituito con una carta esistente; i metodi dei cubi lavorano su DEFAULT_CUBE_ID
+AUDIT_CALLS = (
+    ("search_cards", ("mickey",), False),
+    ("search_cards", ("",), True),  # carica tutto il catalogo: lo scan è voluto
+    ("search_by_effect", ("evasive",), False),
+    ("search_text", ("ward",), False),
+    ("search_by_inks", (["Amber", "Steel"],), False),
+    ("search_by_traits", (["Pirate"], ["Amber"]), False),
+    ("get_cube_count", (), False),
+    ("get_cube_cards", (), False),
+    ("get_cube_id_list", (), False),
+    ("list_cubes", (), True),  # pochi cubi: lo scan è voluto
+    ("cube_union", ([DEFAULT_CUBE_ID, DEFAULT_CUBE_ID + 1],), False),
+    ("cube_intersection", ([DEFAULT_CUBE_ID, DEFAULT_CUBE_ID + 1],), False),
+    ("cube_difference", (DEFAULT_CUBE_ID, [DEFAULT_CUBE_ID + 1]), False),
+    ("create_cube", ("audit", ["{card}"]), False),
+    ("get_type_count", ("character",), False),
+    ("stats_color", (), False),
+    ("stats_ink", (), False),
+    ("stats_type", (), False),
+    ("stats_cost", (), False),
+    ("stats_inkable", (), False),
+    ("stats_strength", (), False),
+    ("stats_willpower", (), False),
+    ("stats_lore", (), False),
+    ("stats_classification", (), False),
+    ("stats_keyword", (), False),
+    ("stats_text_quotes", ("draw",), False),
+    ("compute_all_stats", (), False),
+    ("browse", (), True),  # nessun filtro: scorre in ordine di card_key e si ferma dopo LIMIT
+    ("browse", ({"in_cube": 1},), False),
+    ("browse", ({"text": "mickey"}, "name"), False),
+    ("browse", ({"colors": ["Amber", "Steel"], "within": True, "in_cube": 1}, "cost"), False),
+    ("browse", ({"types": ["Character"], "inkable": 1}, "name", ("Mickey Mouse", "{card}")), False),
+    ("browse_count", ({"colors": ["Ruby"], "in_cube": 0},), False),
+    ("add_cube", ("{card}",), False),
+    ("remove_cube", ("{card}",), False),
+    ("add_cube_many", (["{card}"],), False),
+    ("remove_cube_many", (["{card}"],), False),
+    ("set_cube", (["{card}"],), False),
+    ("add_tournament", ("audit", "Amber/Steel", "2000-01-01", ["{card}"]), False),
+    ("get_all_tournaments", (), False),
+    ("get_tournament_deck", (1,), False),
+    ("get_card_winrate", (), False),
+    ("get_color_winrate", (), False),
+    ("get_winner_stats", (), False),
+)
+
+
+def explain_plan(conn, sql, params=()):
+    """Ritorna le righe 'detail' di EXPLAIN QUERY PLAN per uno statement"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def is_full_scan(plan):
+    #"SCAN cards" senza indice = lettura di tutta la tabella
+    #(fanno eccezione le virtual table FTS, le subquery già materializzate e le tabelle temporanee
+    #con gli id di una modifica massiva, che sono proprio l'insieme da scorrere)
+    subqueries = {line.split()[-1] for line in plan if line.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+    return any(line.startswith("SCAN ") and " USING " not in line and "VIRTUAL TABLE" not in line
+               and line.split()[1] not in subqueries and line.split()[1] not in TEMP_TABLES
+               for line in plan)
+
+
+# argomenti che dicono da quali cubi dipende una lettura (vedi _cube_scope)
+CUBE_ARGUMENTS = ("cube_id", "cube_ids", "other_ids")
+
+
+def _cube_scope(signature, args, kwargs):
+    #cubi letti da una chiamata, presi da cube_id / cube_ids / other_ids (default compresi);
+    #None se la funzione non ne ha: allora vale la versione globale
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    cube_ids = []
+    for name in CUBE_ARGUMENTS:
+        value = bound.arguments.get(name)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            cube_ids.extend(value)
+        elif value is not None:
+            cube_ids.append(value)
+    return tuple(cube_ids) or None
+
+
+def _cached(method):
+    #metodo di sola lettura: il risultato resta in memoria finché non cambia la versione dei cubi
+    #che legge (o quella globale, se non legge un cubo in particolare)
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.conn or not self.cache.enabled:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, freeze(args), freeze(kwargs))
+        version = self.data_version(_cube_scope(signature, (self, *args), kwargs))
+        return self.cache.get_or_compute(version, key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
 
 class CubeManager:
-    def __init__(self, db_path='lorcana_cards.db'):
+    def __init__(self, db_path='lorcana_cards.db', busy_timeout=DEFAULT_BUSY_TIMEOUT,
+                 cache_size=DEFAULT_CACHE_SIZE):
         self.db_path = db_path #salva il percorso
-        self.conn = None #connette a None
+        self.busy_timeout = busy_timeout #secondi di attesa se il db è occupato
+        self.pool = None #connessioni: una di lettura per thread + una di scrittura
+        self._fixed_conn = None #connessione unica impostata a mano (es. copia in memoria)
         self.cursor = None #cursor a None
+        self.has_fts = False #indice full-text disponibile
+        self.cache = QueryCache(cache_size) #risultati delle letture, validi finché non cambia la versione
+        self.perf = perf.Instrumentation() #tempi di metodi e statement SQL, registro delle query lente
+
+    @property
+    def conn(self):
+        """Connessione di lettura del thread corrente (None se non connesso)"""
+        if self._fixed_conn is not None:
+            return self._fixed_conn
+        return self.pool.reader() if self.pool else None
+
+    @conn.setter
+    def conn(self, value):
+        self._fixed_conn = value
+
+    @contextmanager
+    def _writing(self):
+        #tutte le scritture passano da qui: una alla volta, commit o rollback automatico
+        if self._fixed_conn is not None:
+            try:
+                yield self._fixed_conn
+                self._fixed_conn.commit()
+            except Exception:
+                self._fixed_conn.rollback()
+                raise
+        else:
+            with self.pool.writer() as conn:
+                yield conn
     
+    def data_version(self, cube_ids=None):
+        """Versione dei dati salvata nel db. Senza cube_ids quella globale, che cambia a ogni modifica
+        di qualunque cubo, dei tornei o delle carte; con cube_ids quella dei soli cubi indicati
+        (che l'ingest fa crescere tutte), così modificare un cubo non invalida la cache degli altri"""
+        if not cube_ids:
+            return schema.cube_version(self.conn)
+        return schema.cube_versions(self.conn, cube_ids)
+
+    def cached(self, fn):
+        """Decoratore per funzioni dell'app che leggono dal db: stessa cache dei metodi di lettura.
+        La chiave è il nome della funzione più gli argomenti; come per i metodi, un argomento
+        cube_id (o cube_ids) lega il risultato alla versione di quel cubo."""
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.conn or not self.cache.enabled:
+                return fn(*args, **kwargs)
+            key = (fn.__qualname__, freeze(args), freeze(kwargs))
+            version = self.data_version(_cube_scope(signature, args, kwargs))
+            return self.cache.get_or_compute(version, key, lambda: fn(*args, **kwargs))
+        return wrapper
+
+    def cache_stats(self):
+        """hits, misses, evictions e dimensione della cache delle query"""
+        return self.cache.stats()
+
     def connect(self): #connette al db
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row #permette di accedere alle colonne per nome
-            print("✅ Connessione al database avvenuta con successo")
+            self.pool = ConnectionPool(self.db_path, busy_timeout=self.busy_timeout, instrumentation=self.perf)
+            with self._writing() as conn:
+                features = schema.ensure_schema(conn) #crea/aggiorna tabelle e indice full-text
+            self.has_fts = features["fts"]
+            log.info("✅ Connessione al database avvenuta con successo")
             return True
         except sqlite3.Error as e:
-            print(f"❌ Errore di connessione al database: {e}") 
+            log.error("❌ Errore di connessione al database: %s", e)
+            if self.pool:
+                self.pool.close()
+            self.pool = None
             return False
         
     def close(self): #chiude la connessione
-        if self.conn:
-            self.conn.close()
-            print("✅ Connessione al database chiusa")
+        if self._fixed_conn is not None:
+            self._fixed_conn.close()
+            self._fixed_conn = None
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+            log.info("✅ Connessione al database chiusa")
+
+    #funzione search_text() [ricerca full-text con ranking e prefissi]
+    @_cached
+    def search_text(self, text, in_cube=False, columns=None, cube_id=DEFAULT_CUBE_ID):
+        """Cerca carte con l'indice full-text, ordinate per rilevanza (bm25).
+
+        columns limita la ricerca ad alcune colonne di schema.FTS_COLUMNS (default: tutte);
+        con in_cube solo fra le carte del cubo cube_id. Senza FTS5 ripiega su LIKE.
+        """
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return []
+
+        columns = columns or schema.FTS_COLUMNS
+        cursor = self.conn.cursor()
+
+        if not self.has_fts:
+            pattern = f"%{(text or '').lower()}%"
+            where = " OR ".join(f"LOWER({col}) LIKE ?" for col in columns)
+            sql = f"SELECT * FROM cards WHERE ({where})"
+            params = [pattern] * len(columns)
+            if in_cube:
+                sql += f" AND {_in_cube_sql()}"
+                params.append(cube_id)
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+        match = schema.fts_query(text)
+        if match is None:
+            return []
+        match = f"{{{' '.join(columns)}}} : ({match})"
+
+        sql = """
+        SELECT c.* FROM cards_fts
+        JOIN cards c ON c.card_key = cards_fts.rowid
+        WHERE cards_fts MATCH ?
+        """
+        params = [match]
+        if in_cube:
+            sql += f" AND {_in_cube_sql('c.unique_id')}"
+            params.append(cube_id)
+        sql += " ORDER BY cards_fts.rank"
+
+        cursor.execute(sql, params)
+        return cursor.fetchall()
 
     #funzione search_cards()
 
-    def search_cards(self, query, in_cube=False):
+    @_cached
+    def search_cards(self, query, in_cube=False, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return []
         
         try:
-            cursor = self.conn.cursor()
-            search_pattern = f"%{query.lower()}%"
-        
-            if in_cube:
-                sql = "SELECT * FROM cards WHERE LOWER(name) LIKE ? AND in_cube = 1"
+            if query and query.strip():
+                results = self.search_text(query, in_cube=in_cube, columns=("name",), cube_id=cube_id)
             else:
-                sql = "SELECT * FROM cards WHERE LOWER(name) LIKE ?"
-        
-            cursor.execute(sql, (search_pattern,))  # ✅ Tupla, non lista
-            results = cursor.fetchall()
-            print(f"✅ Trovate {len(results)} carte")
+                # nessun testo: tutte le carte (o tutto il cubo)
+                cursor = self.conn.cursor()
+                if in_cube:
+                    cursor.execute(f"SELECT * FROM cards WHERE {_in_cube_sql()}", (cube_id,))
+                else:
+                    cursor.execute("SELECT * FROM cards")
+                results = cursor.fetchall()
+            log.debug("✅ Trovate %s carte", len(results))
             return results
         
         except Exception as e:
-            print(f"❌ Errore in search_cards: {e}")
+            log.error("❌ Errore in search_cards: %s", e)
             return []
         
     #function search_by_effect()
-    def search_by_effect(self, text, in_cube=False):
+    @_cached
+    def search_by_effect(self, text, in_cube=False, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ search_by_effect: Connessione al database non disponibile")
+            log.error("❌ search_by_effect: Connessione al database non disponibile")
             return []
-        
+
+        results = self.search_text(text, in_cube=in_cube, columns=("body_text", "abilities"),
+                                   cube_id=cube_id)
+    
+        log.debug("✅ Trovate %s carte con l'effetto '%s'", len(results), text)
+        return results
+
+    #funzione search_by_inks() [filtro colori con ink_mask]
+    @_cached
+    def search_by_inks(self, colors, within=False, in_cube=False, cube_id=DEFAULT_CUBE_ID):
+        """Carte con almeno uno dei colori (within=False) o con soli colori fra quelli dati (within=True)"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return []
+
+        mask = schema.ink_mask(list(colors))
         cursor = self.conn.cursor()
+        if within:
+            sql = "SELECT * FROM cards WHERE (ink_mask & ~?) = 0"
+            params = [mask]
+        else:
+            # lista dei valori possibili di ink_mask: così la ricerca usa idx_cards_ink_mask
+            allowed = schema.ink_masks_overlapping(mask)
+            if not allowed:
+                return []
+            sql = f"SELECT * FROM cards WHERE ink_mask IN ({', '.join('?' * len(allowed))})"
+            params = allowed
+        if in_cube:
+            sql += f" AND {_in_cube_sql()}"
+            params = params + [cube_id]
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    #funzione search_by_traits() [es. tutte le carte Pirate e Amber]
+    @_cached
+    def search_by_traits(self, classifications=(), colors=(), in_cube=False, cube_id=DEFAULT_CUBE_ID):
+        """Carte che hanno TUTTE le classificazioni e TUTTI i colori indicati.
 
-        query = """
-        SELECT * FROM cards 
-        WHERE (body_text LIKE ? OR abilities LIKE ?)
+        Ogni condizione è una ricerca sull'indice (valore, card_id) e i risultati vengono intersecati.
         """
-        
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return []
+        parts = []
+        params = []
+        for classification in classifications:
+            parts.append("SELECT card_id FROM card_classifications WHERE classification = ?")
+            params.append(classification)
+        for color in colors:
+            parts.append("SELECT card_id FROM card_colors WHERE color = ?")
+            params.append(color)
+        if not parts:
+            return []
+
+        sql = f"SELECT * FROM cards WHERE unique_id IN ({' INTERSECT '.join(parts)})"
         if in_cube:
-            query += " AND in_cube = 1"
-        
-        search_pattern = f"%{text}%"
+            sql += f" AND {_in_cube_sql()}"
+            params.append(cube_id)
+        cursor = self.conn.cursor()
+        cursor.execute(sql + " ORDER BY name", params)
+        return cursor.fetchall()
 
-        print(f"🔍 Query: {query}")  # DEBUG
-        print(f"🔍 Pattern: {search_pattern}")  # DEBUG
-        print(f"🔍 In cube: {in_cube}")  # DEBUG
+    #funzione browse() [pagine di carte filtrate in SQL, paginazione keyset]
+    def _browse_where(self, filters, cube_id):
+        #filtri -> (condizioni WHERE, parametri); ogni filtro usa un indice o l'FTS
+        filters = filters or {}
+        where, params = [], []
+        text = (filters.get("text") or "").strip()
+        if text:
+            if self.has_fts:
+                match = schema.fts_query(text)
+                if match is None:
+                    return ["0"], []
+                where.append("card_key IN (SELECT rowid FROM cards_fts WHERE cards_fts MATCH ?)")
+                params.append(match)
+            else:
+                where.append("(" + " OR ".join(f"LOWER({col}) LIKE ?" for col in schema.FTS_COLUMNS) + ")")
+                params += [f"%{text.lower()}%"] * len(schema.FTS_COLUMNS)
+        if filters.get("colors"):
+            # valori possibili di ink_mask elencati: così si usa idx_cards_ink_mask
+            mask = schema.ink_mask(list(filters["colors"]))
+            allowed = (schema.ink_masks_within(mask) if filters.get("within")
+                       else schema.ink_masks_overlapping(mask))
+            where.append(f"ink_mask IN ({', '.join('?' * len(allowed))})")
+            params += allowed
+        if filters.get("types"):
+            types = [t.lower() for t in filters["types"]]
+            where.append(f"LOWER(type) IN ({', '.join('?' * len(types))})")
+            params += types
+        if filters.get("inkable") is not None:
+            where.append("inkable = ?")
+            params.append(int(filters["inkable"]))
+        if filters.get("in_cube") is not None:
+            where.append(_in_cube_sql(negate=not filters["in_cube"]))
+            params.append(cube_id)
+        return where, params
 
-        cursor.execute(query, (search_pattern, search_pattern))
-        results = cursor.fetchall()
-    
-        print(f"✅ Trovate {len(results)} carte con l'effetto '{text}'")
-        return results
+    @_cached
+    def browse_count(self, filters=None, cube_id=DEFAULT_CUBE_ID):
+        """Numero di carte che passano i filtri di browse() (in cache finché il cubo non cambia)"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return 0
+        where, params = self._browse_where(filters, cube_id)
+        sql = "SELECT COUNT(*) FROM cards" + (" WHERE " + " AND ".join(where) if where else "")
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    @_cached
+    def browse(self, filters=None, sort="set", after_key=None, limit=BROWSE_PAGE_SIZE, before_key=None,
+               cube_id=DEFAULT_CUBE_ID):
+        """Una pagina di carte filtrate in SQL, con paginazione keyset.
+
+        filters: dict con text, colors (+ within=True per "solo questi colori"), types, inkable,
+        in_cube (1/0: dentro/fuori dal cubo cube_id, che dà anche il campo in_cube di ogni carta).
+        sort: una chiave di BROWSE_SORTS. after_key: la pagina dopo questa chiave (next_key della
+        pagina precedente); before_key: la pagina prima (prev_key), BROWSE_END per l'ultima pagina.
+        Ritorna un dict con cards, total, prev_key, next_key (None se non ci sono altre pagine).
+        """
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return {"cards": [], "total": 0, "prev_key": None, "next_key": None}
+
+        key_exprs = BROWSE_SORTS[sort]
+        where, params = self._browse_where(filters, cube_id)
+        backwards = before_key is not None
+        bound = before_key if backwards else after_key
+        if bound:
+            placeholders = ", ".join("?" * len(key_exprs))
+            where.append(f"({', '.join(key_exprs)}) {'<' if backwards else '>'} ({placeholders})")
+            params += list(bound)
+        direction = " DESC" if backwards else ""
+        sql = f"""
+        SELECT unique_id, name, Image, color, type, cost, inkable, {_in_cube_sql()} AS in_cube,
+               {', '.join(f'{expr} AS key_{i}' for i, expr in enumerate(key_exprs))}
+        FROM cards
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {', '.join(expr + direction for expr in key_exprs)}
+        LIMIT ?
+        """
+        # una riga in più per sapere se c'è un'altra pagina in quella direzione
+        rows = self.conn.execute(sql, [cube_id] + params + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        keys = [tuple(row[f"key_{i}"] for i in range(len(key_exprs))) for row in rows]
+        cards = [{
+            "unique_id": row["unique_id"] or "",
+            "name": row["name"] or "",
+            "image": row["Image"] or "",
+            "color": row["color"] or "",
+            "type": row["type"] or "",
+            "cost": row["cost"] if row["cost"] is not None else "",
+            "inkable": row["inkable"] or 0,
+            "in_cube": 1 if row["in_cube"] == 1 else 0,
+        } for row in rows]
+        # all'indietro: "more" dice se c'è una pagina prima, e dopo c'è sempre la pagina di partenza
+        # (tranne che per BROWSE_END, che è vuota e quindi falsa)
+        has_prev = more if backwards else bool(after_key)
+        has_next = bool(before_key) if backwards else more
+        return {
+            "cards": cards,
+            "total": self.browse_count(filters, cube_id=cube_id),
+            "prev_key": keys[0] if keys and has_prev else None,
+            "next_key": keys[-1] if keys and has_next else None,
+        }
 
     #funzione add_cube()
-    def add_cube(self, card_id):
+    def add_cube(self, card_id, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return False
-        cursor = self.conn.cursor()
-        # Controlla se la carta esiste
-        cursor.execute("SELECT * FROM cards WHERE unique_id = ?", (card_id,))
-        card = cursor.fetchone()
-        if not card:
-            print(f"❌ Carta con ID {card_id} non trovata")
+        outcome = self.add_cube_many([card_id], cube_id=cube_id).get(card_id)
+        if outcome is None:
+            return False
+        if outcome == UNKNOWN:
+            log.warning("❌ Carta con ID %s non trovata", card_id)
             return False
-        # Controlla se la carta è già nel cubo
-        if card[26] == 1:  # assuming 'in_cube' is the 6th column (index 5)
-            print(f"❌ Carta con ID {card_id} è già nel cubo")
+        if outcome == ALREADY_PRESENT:
+            log.warning("❌ Carta con ID %s è già nel cubo", card_id)
             return False
-        # Aggiungi la carta al cubo
-        cursor.execute("UPDATE cards SET in_cube = 1 WHERE unique_id = ?", (card_id,))
-        self.conn.commit()
-        print(f"✅ Carta con ID {card_id} aggiunta al cubo")
+        log.info("✅ Carta con ID %s aggiunta al cubo", card_id)
         return True
 
     #funzione remove_cube()
-    def remove_cube(self, card_id):
+    def remove_cube(self, card_id, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return False
+        outcome = self.remove_cube_many([card_id], cube_id=cube_id).get(card_id)
+        if outcome is None:
+            return False
+        if outcome == UNKNOWN:
+            log.warning("❌ Carta con ID %s non trovata", card_id)
+            return False
+        if outcome == NOT_IN_CUBE:
+            log.warning("❌ Carta con ID %s non è nel cubo", card_id)
+            return False
+        log.info("✅ Carta con ID %s rimossa dal cubo", card_id)
+        return True
+
+    def _has_cube(self, conn, cube_id):
+        if conn.execute("SELECT 1 FROM cubes WHERE cube_id = ?", (cube_id,)).fetchone():
+            return True
+        log.error("❌ Cubo %s non trovato", cube_id)
+        return False
+
+    def _load_cube_batch(self, conn, card_ids, cube_id):
+        #riempie cube_batch con gli id (senza doppioni) e ritorna {id: 1/0 se è nel cubo, None se sconosciuto}
+        conn.execute(CREATE_CUBE_BATCH_SQL)
+        conn.execute("DELETE FROM cube_batch")
+        conn.executemany("INSERT OR IGNORE INTO cube_batch (unique_id) VALUES (?)",
+                         [(card_id,) for card_id in card_ids])
+        rows = conn.execute("""
+            SELECT cube_batch.unique_id, c.unique_id IS NOT NULL, cc.card_id IS NOT NULL
+            FROM cube_batch
+            LEFT JOIN cards c ON c.unique_id = cube_batch.unique_id
+            LEFT JOIN cube_cards cc ON cc.cube_id = ? AND cc.card_id = cube_batch.unique_id
+        """, (cube_id,)).fetchall()
+        return {uid: (in_cube if found else None) for uid, found, in_cube in rows}
+
+    def _mutate_cube(self, card_ids, in_cube, cube_id):
+        #aggiunge/toglie tutti gli id in una sola transazione, ritorna gli esiti nell'ordine ricevuto
+        card_ids = list(dict.fromkeys(card_ids))
+        if not card_ids:
+            return {}
+        with self._writing() as conn:
+            return self._mutate_cube_in(conn, card_ids, in_cube, cube_id)
+
+    def _mutate_cube_in(self, conn, card_ids, in_cube, cube_id):
+        #come _mutate_cube ma dentro la transazione del chiamante (niente commit qui); card_ids senza doppioni
+        if not card_ids or not self._has_cube(conn, cube_id):
+            return {}
+        done, unchanged = (ADDED, ALREADY_PRESENT) if in_cube else (REMOVED, NOT_IN_CUBE)
+        current = self._load_cube_batch(conn, card_ids, cube_id)
+        if in_cube:
+            changed = conn.execute("""
+                INSERT OR IGNORE INTO cube_cards (cube_id, card_id)
+                SELECT ?, cube_batch.unique_id
+                FROM cube_batch JOIN cards c ON c.unique_id = cube_batch.unique_id
+            """, (cube_id,)).rowcount
+        else:
+            changed = conn.execute("""
+                DELETE FROM cube_cards
+                WHERE cube_id = ? AND card_id IN (SELECT unique_id FROM cube_batch)
+            """, (cube_id,)).rowcount
+        if changed:
+            schema.bump_cube_version(conn, cube_id)
+        outcomes = {}
+        for card_id in card_ids:
+            state = current.get(card_id)
+            if state is None:
+                outcomes[card_id] = UNKNOWN
+            else:
+                outcomes[card_id] = unchanged if state == in_cube else done
+        return outcomes
+
+    def add_cube_many(self, card_ids, cube_id=DEFAULT_CUBE_ID):
+        """Aggiunge più carte al cubo in una sola transazione.
+        Ritorna {id: ADDED | ALREADY_PRESENT | UNKNOWN} ({} se il cubo non esiste)"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return {}
+        return self._mutate_cube(card_ids, 1, cube_id)
+
+    def remove_cube_many(self, card_ids, cube_id=DEFAULT_CUBE_ID):
+        """Rimuove più carte dal cubo in una sola transazione.
+        Ritorna {id: REMOVED | NOT_IN_CUBE | UNKNOWN} ({} se il cubo non esiste)"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return {}
+        return self._mutate_cube(card_ids, 0, cube_id)
+
+    def set_cube(self, card_ids, cube_id=DEFAULT_CUBE_ID):
+        """Rende il cubo uguale esattamente a card_ids, in una sola transazione.
+        Ritorna gli esiti di add_cube_many per card_ids più REMOVED per le carte tolte"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return {}
+        card_ids = list(dict.fromkeys(card_ids))
+        with self._writing() as conn:
+            if not self._has_cube(conn, cube_id):
+                return {}
+            current = self._load_cube_batch(conn, card_ids, cube_id)
+            removed = [row[0] for row in conn.execute("""
+                DELETE FROM cube_cards
+                WHERE cube_id = ? AND card_id NOT IN (SELECT unique_id FROM cube_batch)
+                RETURNING card_id
+            """, (cube_id,))]
+            changed = len(removed) + conn.execute("""
+                INSERT OR IGNORE INTO cube_cards (cube_id, card_id)
+                SELECT ?, cube_batch.unique_id
+                FROM cube_batch JOIN cards c ON c.unique_id = cube_batch.unique_id
+            """, (cube_id,)).rowcount
+            if changed:
+                schema.bump_cube_version(conn, cube_id)
+        outcomes = {}
+        for card_id in card_ids:
+            state = current.get(card_id)
+            outcomes[card_id] = UNKNOWN if state is None else (ALREADY_PRESENT if state == 1 else ADDED)
+        outcomes.update((card_id, REMOVED) for card_id in removed)
+        return outcomes
+
+    #funzioni dei cubi [elenco, creazione, rinomina, eliminazione]
+    @_cached
+    def list_cubes(self):
+        """Tutti i cubi in ordine di creazione: [{'cube_id', 'name', 'created_at', 'cards'}]"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return []
         cursor = self.conn.cursor()
-        # Controlla se la carta esiste
-        cursor.execute("SELECT * FROM cards WHERE unique_id = ?", (card_id,))
-        card = cursor.fetchone()
-        if not card:
-            print(f"❌ Carta con ID {card_id} non trovata")
+        cursor.execute("""
+            SELECT cu.cube_id, cu.name, cu.created_at,
+                   (SELECT COUNT(*) FROM cube_cards cc WHERE cc.cube_id = cu.cube_id) AS cards
+            FROM cubes cu
+            ORDER BY cu.cube_id
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def create_cube(self, name, card_ids=()):
+        """Crea un cubo con le carte card_ids (anche nessuna) in una sola transazione.
+        Ritorna il cube_id, None se il nome è vuoto o già usato"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return None
+        name = (name or "").strip()
+        if not name:
+            log.warning("❌ Il nome del cubo è vuoto")
+            return None
+        try:
+            with self._writing() as conn:
+                cube_id = conn.execute("INSERT INTO cubes (name) VALUES (?)", (name,)).lastrowid
+                schema.bump_cube_version(conn)
+                self._mutate_cube_in(conn, list(dict.fromkeys(card_ids)), 1, cube_id)
+        except sqlite3.IntegrityError:
+            log.warning("❌ Esiste già un cubo di nome %s", name)
+            return None
+        log.info("✅ Cubo %s creato (ID %s)", name, cube_id)
+        return cube_id
+
+    def rename_cube(self, cube_id, name):
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return False
+        name = (name or "").strip()
+        if not name:
+            log.warning("❌ Il nome del cubo è vuoto")
             return False
-        # Controlla se la carta è nel cubo
-        if card[26] == 0:  # assuming 'in_cube' is the 6th column (index 5)
-            print(f"❌ Carta con ID {card_id} non è nel cubo")
+        try:
+            with self._writing() as conn:
+                if not conn.execute("UPDATE cubes SET name = ? WHERE cube_id = ?", (name, cube_id)).rowcount:
+                    log.warning("❌ Cubo %s non trovato", cube_id)
+                    return False
+                schema.bump_cube_version(conn)
+        except sqlite3.IntegrityError:
+            log.warning("❌ Esiste già un cubo di nome %s", name)
             return False
-        # Rimuovi la carta dal cubo
-        cursor.execute("UPDATE cards SET in_cube = 0 WHERE unique_id = ?", (card_id,))
-        self.conn.commit()
-        print(f"✅ Carta con ID {card_id} rimossa dal cubo")
+        log.info("✅ Cubo %s rinominato in %s", cube_id, name)
+        return True
+
+    def delete_cube(self, cube_id):
+        """Elimina un cubo e le sue carte (non il cubo di default, né un cubo con dei tornei registrati)"""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return False
+        if cube_id == DEFAULT_CUBE_ID:
+            log.warning("❌ Il cubo di default non si può eliminare")
+            return False
+        with self._writing() as conn:
+            if conn.execute("SELECT 1 FROM tournaments WHERE cube_id = ? LIMIT 1", (cube_id,)).fetchone():
+                log.warning("❌ Il cubo %s ha dei tornei registrati: non si può eliminare", cube_id)
+                return False
+            # le righe di cube_cards le toglie il trigger cubes_ad
+            if not conn.execute("DELETE FROM cubes WHERE cube_id = ?", (cube_id,)).rowcount:
+                log.warning("❌ Cubo %s non trovato", cube_id)
+                return False
+            schema.bump_cube_version(conn)
+        log.info("✅ Cubo %s eliminato", cube_id)
         return True
 
     #funzione get_cube_count()
-    def get_cube_count(self):
+    @_cached
+    def get_cube_count(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return 0
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM cards WHERE in_cube = 1")
+            cursor.execute("SELECT COUNT(*) FROM cube_cards WHERE cube_id = ?", (cube_id,))
             result = cursor.fetchone()
             return result[0] if result else 0
         
         except Exception as e:
-            print(f"❌ Errore nel conteggio delle carte nel cubo: {e}")
+            log.error("❌ Errore nel conteggio delle carte nel cubo: %s", e)
             return 0
 
        #funzione get_cube_cards()
-    def get_cube_cards(self):
+    @_cached
+    def get_cube_cards(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ get_cube_cardsConnessione al database non disponibile")
+            log.error("❌ get_cube_cards: Connessione al database non disponibile")
             return []
         cursor = self.conn.cursor()
         
-        query = """
+        query = f"""
         SELECT unique_id, name, type, color, cost, Image
         FROM cards 
-        WHERE in_cube = 1 
+        WHERE {_in_cube_sql()}
         ORDER BY name
         """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        # Converti in lista di dizionari per facilità d'uso
-        cards = []
-        for row in rows:
-            cards.append({
-                'unique_id': row[0],
-                'name': row[1],
-                'type': row[2],
-                'color': row[3],
-                'cost': row[4],
-                'Image': row[5]
-            })
-        return cards
+        cursor.execute(query, (cube_id,))
+        return _card_dicts(cursor.fetchall())
+
+    #funzioni cube_union() / cube_intersection() / cube_difference() [operazioni fra cubi in sqlite]
+    def _cube_set(self, op, cube_ids):
+        #carte di UNION / INTERSECT / EXCEPT fra le carte dei cubi, nell'ordine dato (solo EXCEPT ne dipende)
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return []
+        if not cube_ids:
+            return []
+        members = f" {CUBE_SET_OPS[op]} ".join(["SELECT card_id FROM cube_cards WHERE cube_id = ?"] * len(cube_ids))
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT unique_id, name, type, color, cost, Image
+            FROM cards
+            WHERE unique_id IN ({members})
+            ORDER BY name
+        """, list(cube_ids))
+        return _card_dicts(cursor.fetchall())
+
+    @_cached
+    def cube_union(self, cube_ids):
+        """Carte che stanno in almeno uno dei cubi (formato di get_cube_cards)"""
+        return self._cube_set("union", cube_ids)
+
+    @_cached
+    def cube_intersection(self, cube_ids):
+        """Carte che stanno in tutti i cubi"""
+        return self._cube_set("intersection", cube_ids)
+
+    @_cached
+    def cube_difference(self, cube_id, other_ids):
+        """Carte di cube_id che non stanno in nessuno dei cubi other_ids"""
+        return self._cube_set("difference", [cube_id, *other_ids])
 
     #funzione get_type_count()
-    def get_type_count(self, type):
+    @_cached
+    def get_type_count(self, type, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return 0
         cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM cards WHERE in_cube = 1 AND LOWER(type) = LOWER(?)", (type,))
+        cursor.execute(f"SELECT COUNT(*) FROM cards WHERE {_in_cube_sql()} AND LOWER(type) = LOWER(?)",
+                       (cube_id, type))
         count = cursor.fetchone()[0]
         return count
 
     #funzione stats_color() [Amber, Amethyst, Emerald, Ruby, Sapphire, Steel]
-    def stats_color(self):
+    @_cached
+    def stats_color(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        total = self.get_cube_count()
+        total = self.get_cube_count(cube_id=cube_id)
         if total == 0:
-            print("❌ Nessuna carta nel cubo per calcolare le statistiche")
+            log.info("❌ Nessuna carta nel cubo per calcolare le statistiche")
             return {}
-        cursor.execute("SELECT color, COUNT(*) AS count FROM cards WHERE in_cube = 1 GROUP BY color")
+        cursor.execute(f"SELECT color, COUNT(*) AS count FROM cards WHERE {_in_cube_sql()} GROUP BY color",
+                       (cube_id,))
         stats = {}
         for row in cursor.fetchall():
             color = row['color'] or 'Nessuno'
             count = row['count']
             percentage = (count/total)*100
             stats[color] = {'count': count, 'percentage': percentage}
-            print(f"🎨 {color:<15}: {count:>3} | {percentage:>5.2f}%")
+            log.info("🎨 %-15s: %3s | %5.2f%%", color, count, percentage)
         return stats
 
     #funzione stats_type() [character, action, song or location]
-    def stats_type(self):
+    @_cached
+    def stats_type(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        total = self.get_cube_count()
+        total = self.get_cube_count(cube_id=cube_id)
         if total == 0:
-            print("❌ Nessuna carta nel cubo per calcolare le statistiche")
+            log.info("❌ Nessuna carta nel cubo per calcolare le statistiche")
             return {}
-        cursor.execute("SELECT type, COUNT(*) AS count FROM cards WHERE in_cube = 1 GROUP BY type")
+        cursor.execute(f"SELECT type, COUNT(*) AS count FROM cards WHERE {_in_cube_sql()} GROUP BY type",
+                       (cube_id,))
         stats = {}
         for row in cursor.fetchall():
             type = row['type'] or 'Nessuno'
             count = row['count']
             percentage = (count/total)*100
             stats[type] = {'count': count, 'percentage': percentage}
-            print(f"🃏 {type:<15}: {count:>3} | {percentage:>5.2f}%")
+            log.info("🃏 %-15s: %3s | %5.2f%%", type, count, percentage)
+        return stats
+
+    #funzione stats_ink() [carte per singolo inchiostro: le dual-ink contano per entrambi]
+    @_cached
+    def stats_ink(self, cube_id=DEFAULT_CUBE_ID):
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return {}
+        cursor = self.conn.cursor()
+        total = self.get_cube_count(cube_id=cube_id)
+        if total == 0:
+            log.info("❌ Nessuna carta nel cubo per calcolare le statistiche")
+            return {}
+        stats = _with_percentage(self._ink_counts(cube_id), total)
+        for color, s in stats.items():
+            log.info("🖌️ %-15s: %3s | %5.2f%%", color, s['count'], s['percentage'])
         return stats
 
     #funzione cost_stats() 
-    def stats_cost(self):
+    @_cached
+    def stats_cost(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        total = self.get_cube_count()
+        total = self.get_cube_count(cube_id=cube_id)
         if total == 0:
-            print("❌ Nessuna carta nel cubo per calcolare le statistiche")
+            log.info("❌ Nessuna carta nel cubo per calcolare le statistiche")
             return {}
-        cursor.execute("SELECT cost, COUNT(*) AS count FROM cards WHERE in_cube = 1 GROUP BY cost ORDER BY cost")
+        cursor.execute(f"SELECT cost, COUNT(*) AS count FROM cards WHERE {_in_cube_sql()} "
+                       "GROUP BY cost ORDER BY cost", (cube_id,))
         stats = {}
         for row in cursor.fetchall():
             cost = row['cost'] or 'Nessuno'
             count = row['count']
             percentage = (count/total)*100
             stats[cost] = {'count': count, 'percentage': percentage}
-            print(f"💰 {cost:<5}: {count:>3} | {percentage:5.2f}%")
+            log.info("💰 %-5s: %3s | %5.2f%%", cost, count, percentage)
         return stats
 
     #funzione inkable_stats()
-    def stats_inkable(self):
+    @_cached
+    def stats_inkable(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        total = self.get_cube_count()
+        total = self.get_cube_count(cube_id=cube_id)
         if total == 0:
-            print("❌ Nessuna carta nel cubo per calcolare le statistiche")
+            log.info("❌ Nessuna carta nel cubo per calcolare le statistiche")
             return {}
-        cursor.execute("""SELECT 
+        cursor.execute(f"""SELECT 
                     SUM(CASE WHEN inkable = 1 THEN 1 ELSE 0 END) AS inkable_yes,
                     SUM(CASE WHEN inkable = 0 THEN 1 ELSE 0 END) AS inkable_no
-                    FROM cards WHERE in_cube = 1
-                    """)
+                    FROM cards WHERE {_in_cube_sql()}
+                    """, (cube_id,))
         row = cursor.fetchone()
         stats = {}
         inkable_yes = row['inkable_yes'] or 0
         inkable_no = row['inkable_no'] or 0
-        print(f"🖋️ Inkable: {inkable_yes} | {inkable_yes/total*100:5.2f}%")
-        print(f"❌ Non Inkable: {inkable_no} | {inkable_no/total*100:5.2f}%")
+        log.info("🖋️ Inkable: %s | %5.2f%%", inkable_yes, inkable_yes/total*100)
+        log.info("❌ Non Inkable: %s | %5.2f%%", inkable_no, inkable_no/total*100)
         stats = {
             'inkable_yes': {'count': inkable_yes, 'percentage': (inkable_yes/total)*100},
             'inkable_no': {'count': inkable_no, 'percentage': (inkable_no/total)*100}
@@ -265,62 +977,74 @@ class CubeManager:
         return stats
 
     # funzione stats_strength()
-    def stats_strength(self):
+    @_cached
+    def stats_strength(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        tot_char = self.get_type_count('character')
-        cursor.execute("""SELECT strength, COUNT(*) AS count FROM cards
-                        WHERE in_cube = 1 
+        tot_char = self.get_type_count('character', cube_id=cube_id)
+        if tot_char == 0:
+            log.info("❌ Nessun Character nel cubo per calcolare le statistiche")
+            return {}
+        cursor.execute(f"""SELECT strength, COUNT(*) AS count FROM cards
+                        WHERE {_in_cube_sql()} AND LOWER(type) = 'character'
                     GROUP BY strength 
                     ORDER BY strength
-                    """)
+                    """, (cube_id,))
         stats = {}
         for row in cursor.fetchall():
-            strength = row['strength'] or 'Nessuno'
+            strength = 'Nessuno' if row['strength'] is None else row['strength']
             count = row['count']
             percentage = (count/tot_char)*100 
-            print(f"⚔️ {strength:<5}: {count:>3} | {percentage:>5.2f}%")
+            log.info("⚔️ %-5s: %3s | %5.2f%%", strength, count, percentage)
             stats[strength] = {'count': count, 'percentage': percentage}
         return stats    
 
     #stats_willpower()
-    def stats_willpower(self):
+    @_cached
+    def stats_willpower(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        tot_char = self.get_type_count('character')
-        cursor.execute("""SELECT willpower, COUNT(*) AS count FROM cards
-                        WHERE in_cube = 1 
+        tot_char = self.get_type_count('character', cube_id=cube_id)
+        if tot_char == 0:
+            log.info("❌ Nessun Character nel cubo per calcolare le statistiche")
+            return {}
+        cursor.execute(f"""SELECT willpower, COUNT(*) AS count FROM cards
+                        WHERE {_in_cube_sql()} AND LOWER(type) = 'character'
                     GROUP BY willpower 
                     ORDER BY willpower
-                    """)
+                    """, (cube_id,))
         stats = {}
         for row in cursor.fetchall():
-            willpower = row['willpower'] or 'Nessuno'
+            willpower = 'Nessuno' if row['willpower'] is None else row['willpower']
             count = row['count']
             percentage = (count/tot_char)*100
-            print(f"🛡️ {willpower:<5}: {count:>3} | {percentage:>5.2f}")
+            log.info("🛡️ %-5s: %3s | %5.2f", willpower, count, percentage)
             stats[willpower] = {'count': count, 'percentage': percentage}
         return stats
 
     #funzione lore()
-    def stats_lore(self):
+    @_cached
+    def stats_lore(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         cursor = self.conn.cursor()
-        tot_char = self.get_type_count('character')
+        tot_char = self.get_type_count('character', cube_id=cube_id)
+        if tot_char == 0:
+            log.info("❌ Nessun Character nel cubo per calcolare le statistiche")
+            return {}
 
-        print(f"\n🏷️  CLASSIFICAZIONI ({tot_char} Character):")
+        log.info("\n🏷️  CLASSIFICAZIONI (%s Character):", tot_char)
 
-        cursor.execute("""SELECT lore, COUNT(*) AS count FROM cards
-                        WHERE in_cube = 1 AND type = 'Character' OR 'Location'
+        cursor.execute(f"""SELECT lore, COUNT(*) AS count FROM cards
+                        WHERE {_in_cube_sql()} AND LOWER(type) IN ('character', 'location')
                     GROUP BY lore 
                     ORDER BY lore
-                    """)
+                    """, (cube_id,))
         stats = {}
         for row in cursor.fetchall():
             lore = row['lore']
@@ -330,208 +1054,210 @@ class CubeManager:
             
             count = row['count']
             percentage = (count/tot_char)*100
-            print(f"📜 {lore:<5}: {count:>3} | {percentage:>5.2f}")
+            log.info("📜 %-5s: %3s | %5.2f", lore, count, percentage)
             stats[lore] = count
         return stats
 
+    #funzione _mask_counts() [conta i bit accesi di una colonna bitmask con un solo aggregato]
+    def _mask_counts(self, column, names, where, params=()):
+        sums = ", ".join(f"SUM(({column} >> {bit}) & 1)" for bit in range(len(names)))
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {sums} FROM cards WHERE {where}", params)
+        row = cursor.fetchone()
+        return {name: (row[bit] or 0) for bit, name in enumerate(names)}
+
+    #conteggi dalle tabelle normalizzate [le stesse query per stats_ink / stats_classification e compute_all_stats]
+    def _ink_counts(self, cube_id):
+        #{inchiostro: carte del cubo con quell'inchiostro} (le dual-ink contano per entrambi)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""SELECT color, COUNT(*) AS count
+                           FROM card_colors
+                           WHERE {_in_cube_sql('card_id')}
+                           GROUP BY color
+                           ORDER BY color""", (cube_id,))
+        return {row['color']: row['count'] for row in cursor.fetchall()}
+
+    def _classification_counts(self, cube_id):
+        #{classificazione: Character del cubo che la hanno}, anche le classificazioni non in CLASSIFICATIONS
+        cursor = self.conn.cursor()
+        cursor.execute(f"""SELECT cc.classification, COUNT(*) AS count
+                           FROM card_classifications cc
+                           JOIN cards c ON c.unique_id = cc.card_id
+                           WHERE {_in_cube_sql('c.unique_id')} AND LOWER(c.type) = 'character'
+                           GROUP BY cc.classification""", (cube_id,))
+        return {row['classification']: row['count'] for row in cursor.fetchall()}
+
     #fuznione stats_classification_character() [Hero, Villain, Ally, Floodborn, Dreamborn, etc...]
 
-    def stats_classification(self):
+    @_cached
+    def stats_classification(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         
-        cursor = self.conn.cursor()
-        tot_char = self.get_type_count('character')
+        tot_char = self.get_type_count('character', cube_id=cube_id)
 
         if tot_char == 0:
-            print("❌ Nessun Character nel cubo per calcolare le statistiche")
+            log.info("❌ Nessun Character nel cubo per calcolare le statistiche")
             return {}
         
-        cursor.execute("SELECT classifications FROM cards WHERE in_cube = 1 AND LOWER(type) = 'character'")
-        
-        import json
-        stats = {}
-        Class_list = ['Alien', 'Ally', 'Broom', 'Captain', 'Deity', 'Detective', 'Dragon', 'Dreamborn', 'Entangled',
-                    'Fairy', 'Floodborn', 'Hero', 'Hyena', 'Inventor', 'King', 'Knight', 'Madrigal', 'Mentor',
-                        'Musketeer', 'Pirate', 'Prince', 'Princess', 'Puppy', 'Queen', 'Racer', 'Seven Dwarfs',
-                        'Song', 'Sorcerer', 'Storyborn', 'Tigger', 'Titan', 'Villain']
-        
-        # Inizializza contatori a zero
-        for cls in Class_list:
-            stats[cls] = {'count': 0}
-
-        # Loop per contare le classificazioni
-        for row in cursor.fetchall():
-            try:
-                classifications_str = row['classifications']
-
-                if not classifications_str:
-                    continue
-                
-                # ✅ CORREZIONE CRITICA: Gestisci stringa separata da virgole
-                if isinstance(classifications_str, str):
-                    # Le classificazioni sono salvate come "Storyborn, Ally" non come JSON
-                    class_list = [c.strip().strip('"').strip("'") for c in classifications_str.split(',')]
-                elif isinstance(classifications_str, list):
-                    # Se è già una lista, usala direttamente
-                    class_list = classifications_str
-                else:
-                    continue
-
-                # ✅ DEBUG: Stampa per vedere cosa contiene
-                #print(f"🔍 DEBUG - class_list type: {type(class_list)}, content: {class_list}")
-
-                # Ora itera sulla lista (non sulle lettere!)
-                for classification in class_list:
-                    # Pulisci da spazi, virgolette singole e doppie
-                    classification = str(classification).strip().strip('"').strip("'")
-                    
-                    # ✅ DEBUG: Stampa ogni classificazione processata
-                    #print(f"🔍 Processing: '{classification}'")
-                    
-                    if classification in Class_list:
-                        stats[classification]['count'] += 1
-                        #print(f"✅ Trovata in lista: {classification}, count ora: {stats[classification]['count']}")
-                    else:
-                        if classification:  # Solo se non è vuoto
-                            if classification not in stats:
-                                stats[classification] = {'count': 1}
-                            else:
-                                stats[classification]['count'] += 1
-                            print(f"⚠️ Nuova classificazione: {classification}")
-            
-            except Exception as e:
-                print(f"❌ Errore nel parsing delle classificazioni: {e}")
-                pass
-        
-        # Rimuovi classificazioni con count = 0
-        stats = {k: v for k, v in stats.items() if v['count'] > 0}
+        # una sola query aggregata sulla tabella normalizzata (anche le classificazioni non in lista)
+        counts = self._classification_counts(cube_id)
 
-        if not stats:
-            print("❌ Nessuna classificazione trovata nel cubo")
+        if not counts:
+            log.info("❌ Nessuna classificazione trovata nel cubo")
             return {}
 
-        # Calcola percentuali e stampa
-        for classification in sorted(stats.keys(), key=lambda x: stats[x]['count'], reverse=True):
-            count = stats[classification]['count']
-            percentage = (count/tot_char)*100
-            stats[classification]['percentage'] = percentage
-            bar = "█" * int(percentage / 3)
-
-            print(f"🔖 {classification:<15}: {count:>3} | {percentage:>5.2f}% {bar}")
+        stats = _with_percentage(counts, tot_char, lambda k: -counts[k])
+        for classification, s in stats.items():
+            bar = "█" * int(s['percentage'] / 3)
+            log.info("🔖 %-15s: %3s | %5.2f%% %s", classification, s['count'], s['percentage'], bar)
         
         return stats
 
-
-
-
     #funzione stats_keyword() [Challenger, Evasive, Rush, etc...]
-    def stats_keyword(self):
+    @_cached
+    def stats_keyword(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         
-        cursor = self.conn.cursor()
-        tot_char = self.get_type_count('character')
+        tot_char = self.get_type_count('character', cube_id=cube_id)
 
         if tot_char == 0:
-            print("❌ Nessun Character nel cubo")
+            log.info("❌ Nessun Character nel cubo")
             return {}
 
-        print(f"\n🔑 PAROLE CHIAVE ({tot_char} Character):")
+        log.info("\n🔑 PAROLE CHIAVE (%s Character):", tot_char)
 
-        keywords = [
-                'Challenger', 'Evasive', 'Rush', 'Ward', 'Shift', 
-                'Bodyguard', 'Reckless', 'Singer', 'Support', 'Resist'
-        ]
-        
-        stats = {}
+        # una sola query: SUM di ogni bit di keyword_mask
+        counts = self._mask_counts("keyword_mask", KEYWORDS, f"{_in_cube_sql()} AND LOWER(type) = 'character'",
+                                   (cube_id,))
+        counts = {k: v for k, v in counts.items() if v > 0}
+        stats = _with_percentage(counts, tot_char, lambda k: -counts[k])
 
-        # ✅ CORREZIONE: Loop per contare le keyword
-        for keyword in keywords:
-            cursor.execute("""SELECT COUNT(*) AS count FROM cards
-                            WHERE in_cube = 1 AND LOWER(type) = 'character' 
-                            AND LOWER(Abilities) LIKE ?
-                        """, (f"%{keyword.lower()}%",))
-            
-            count = cursor.fetchone()['count']
-            if count > 0:
-                percentage = (count/tot_char)*100
-                stats[keyword] = {'count': count, 'percentage': percentage}
-
-        # ✅ CORREZIONE: Questo loop deve essere FUORI dal loop precedente
-        for keyword in sorted(stats.keys(), key=lambda x: stats[x]['count'], reverse=True):
-            count = stats[keyword]['count']
-            percentage = stats[keyword]['percentage']
-            bar = "█" * int(percentage / 3)
-            print(f"🔑 {keyword:<15}: {count:>3} | {percentage:>5.2f}% {bar}")
+        for keyword, s in stats.items():
+            bar = "█" * int(s['percentage'] / 3)
+            log.info("🔑 %-15s: %3s | %5.2f%% %s", keyword, s['count'], s['percentage'], bar)
 
         if not stats:
-            print("❌ Nessuna parola chiave trovata nel cubo")
+            log.info("❌ Nessuna parola chiave trovata nel cubo")
             
         return stats
             
     #funzione stats_text_quotes() [cerca specifiche parole nell'effetto delle carte]
-    def stats_text_quotes(self, words):
+    def stats_text_quotes(self, words=None, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return {}
         
-        search_text = input("🔍 Inserisci le parole da cercare: ")
+        search_text = words if words is not None else input("🔍 Inserisci le parole da cercare: ")
 
         if not search_text.strip():
-            print("❌ Nessuna parola inserita")
+            log.info("❌ Nessuna parola inserita")
             return {}
         
-        cursor = self.conn.cursor()
-
-        cursor.execute("""SELECT COUNT(*) AS count FROM cards
-                        WHERE in_cube = 1 
-                        AND LOWER(body_text) LIKE ?
-                    """, (f"%{search_text.lower()}%",))
-        results = cursor.fetchall()
+        results = self.search_text(search_text, in_cube=True, columns=("body_text",), cube_id=cube_id)
         if results:
-            print(f"\n📜 Carte trovate: {len(results)}")
+            log.info("\n📜 Carte trovate: %s", len(results))
 
             for i, card in enumerate(results, 1):
-                print(f"{i}. {card['name']}")
-                print(f"   {card['type']} | {card['color']} | Costo: {card['cost']}")
+                log.info("%s. %s", i, card['name'])
+                log.info("   %s | %s | Costo: %s", card['type'], card['color'], card['cost'])
                 
                 body = card['body_text'] or "Nessun testo"
 
                 if len(body) > 100:
                     body = body[:100] + "..."
-                print(f"   Testo: {body}\n")
-                print()
+                log.info("   Testo: %s\n", body)
         else:
-            print("❌ Nessuna carta trovata con quel testo")
+            log.info("❌ Nessuna carta trovata con quel testo")
         return results
 
+    #funzione compute_all_stats() [tutte le statistiche leggendo il cubo una volta sola]
+    @_cached
+    def compute_all_stats(self, cube_id=DEFAULT_CUBE_ID):
+        """Legge una volta le carte del cubo e calcola tutte le distribuzioni. Ritorna un CubeStats.
+        Inchiostri e classificazioni vengono da _ink_counts / _classification_counts, come in stats_ink
+        e stats_classification, così Dashboard e metodi stats_* mostrano gli stessi numeri."""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return CubeStats()
+
+        cursor = self.conn.cursor()
+        cursor.execute(f"""SELECT type, color, cost, inkable, strength, willpower, lore,
+                                  keyword_mask
+                           FROM cards WHERE {_in_cube_sql()}""", (cube_id,))
+
+        total = characters = inkable_yes = 0
+        colors, types, costs, strengths, willpowers, lores = {}, {}, {}, {}, {}, {}
+        keyword_bits = [0] * len(KEYWORDS)
+
+        for row in cursor:
+            total += 1
+            card_type = row['type']
+            colors[row['color'] or 'Nessuno'] = colors.get(row['color'] or 'Nessuno', 0) + 1
+            types[card_type or 'Nessuno'] = types.get(card_type or 'Nessuno', 0) + 1
+            cost = 'Nessuno' if row['cost'] is None else row['cost']
+            costs[cost] = costs.get(cost, 0) + 1
+            if row['inkable'] == 1:
+                inkable_yes += 1
+
+            kind = (card_type or '').lower()
+            if kind in ('character', 'location') and row['lore'] is not None:
+                lores[row['lore']] = lores.get(row['lore'], 0) + 1
+            if kind != 'character':
+                continue
+
+            characters += 1
+            strength = 'Nessuno' if row['strength'] is None else row['strength']
+            strengths[strength] = strengths.get(strength, 0) + 1
+            willpower = 'Nessuno' if row['willpower'] is None else row['willpower']
+            willpowers[willpower] = willpowers.get(willpower, 0) + 1
+
+            _count_bits(row['keyword_mask'], keyword_bits)
+
+        inks = self._ink_counts(cube_id) if total else {}
+        classifications = self._classification_counts(cube_id) if characters else {}
+        keywords = {name: n for name, n in zip(KEYWORDS, keyword_bits) if n}
+
+        inkable_no = total - inkable_yes
+        return CubeStats(
+            total=total,
+            characters=characters,
+            color=_with_percentage(colors, total, _none_first),
+            ink=_with_percentage(inks, total),
+            type=_with_percentage(types, total, _none_first),
+            cost=_with_percentage(costs, total, _none_first),
+            inkable={
+                'inkable_yes': {'count': inkable_yes, 'percentage': (inkable_yes / total) * 100 if total else 0},
+                'inkable_no': {'count': inkable_no, 'percentage': (inkable_no / total) * 100 if total else 0},
+            } if total else {},
+            strength=_with_percentage(strengths, characters, _none_first),
+            willpower=_with_percentage(willpowers, characters, _none_first),
+            lore=dict(sorted(lores.items())) if characters else {},  # come stats_lore: senza Character non c'è
+            classification=_with_percentage(classifications, characters, lambda k: -classifications[k]),
+            keyword=_with_percentage(keywords, characters, lambda k: -keywords[k]),
+        )
+
     #funzione stats_all() [esegue tutte le statistiche]
-    def stats_all(self):
+    def stats_all(self, cube_id=DEFAULT_CUBE_ID):
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
-            return {}
-        total = self.get_cube_count()
-        if total == 0:
-            print("❌ Nessuna carta nel cubo per calcolare le statistiche")
-            return {}  
+            log.error("❌ Connessione al database non disponibile")
+            return None
+        stats = self.compute_all_stats(cube_id=cube_id)
+        if stats.total == 0:
+            log.info("❌ Nessuna carta nel cubo per calcolare le statistiche")
+            return stats
 
         print("\n" + "=" * 30 + " ANALISI CUBO " + "=" * 30)
-        self.stats_color()
-        self.stats_type()
-        self.stats_cost()
-        self.stats_inkable()
-        self.strength()
-        self.willpower()
-        self.lore()
-        self.stats_classification()
-        self.stats_keyword()
+        stats.print_report()
         print("=" * 70 + "\n")
+        return stats
 
     #menù interattivo per scegliere quale funzione eseguire
-    def menu(self):
+    def menu(self, cube_id=DEFAULT_CUBE_ID):
+        logging.basicConfig(level=logging.INFO, format="%(message)s")  # le statistiche vanno a schermo
         while True:
             print("\n" + "=" * 30 + " GESTIONE CUBO " + "=" * 30)
             print("\n1.  🎨 Distribuzione per colore")
@@ -548,96 +1274,132 @@ class CubeManager:
             choice = input("Scegli un'opzione (1-10) o 0: ")
             
             if choice == '1':
-                self.stats_color()
+                self.stats_color(cube_id=cube_id)
             elif choice == '2':
-                self.stats_type()
+                self.stats_type(cube_id=cube_id)
             elif choice == '3':
-                self.stats_cost()
+                self.stats_cost(cube_id=cube_id)
             elif choice == '4':
-                self.strength()
+                self.stats_strength(cube_id=cube_id)
             elif choice == '5':
-                self.willpower()
+                self.stats_willpower(cube_id=cube_id)
             elif choice == '6':
-                self.stats_classification()
+                self.stats_classification(cube_id=cube_id)
             elif choice == '7':
-                self.stats_keyword()
+                self.stats_keyword(cube_id=cube_id)
             elif choice == '8':
-                self.stats_text_quotes()
+                self.stats_text_quotes(cube_id=cube_id)
             elif choice == '9':
-                self.stats_inkable()
+                self.stats_inkable(cube_id=cube_id)
             elif choice == '10':
-                self.stats_all()
+                self.stats_all(cube_id=cube_id)
             elif choice == '0':
                 break
             else:
                 print("❌ Scelta non valida. Riprova.")
 
+    #funzione explain_queries() [piano di esecuzione di tutte le query]
+    def explain_queries(self):
+        """Esegue AUDIT_CALLS su una copia in memoria del db e raccoglie EXPLAIN QUERY PLAN
+        di ogni statement SQL. Ritorna una lista di dict: method, sql, plan, full_scan, expected."""
+        if not self.conn:
+            log.error("❌ Connessione al database non disponibile")
+            return []
+
+        # copia in memoria: le chiamate che scrivono (add_cube, add_tournament) non toccano il db vero
+        mem = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.backup(mem)
+        mem.row_factory = sqlite3.Row
+        probe = CubeManager(":memory:", cache_size=0)  # senza cache ogni chiamata esegue il suo SQL
+        probe.conn = mem
+        probe.has_fts = self.has_fts
+
+        row = mem.execute("SELECT unique_id FROM cards LIMIT 1").fetchone()
+        card = row[0] if row else ""
+
+        def fill(value):
+            if isinstance(value, (list, tuple)):
+                return type(value)(fill(v) for v in value)
+            return card if value == "{card}" else value
+
+        statements = []
+        report = []
+        for method, args, expected in AUDIT_CALLS:
+            args = tuple(fill(a) for a in args)
+            statements.clear()
+            mem.set_trace_callback(statements.append)
+            try:
+                with redirect_stdout(io.StringIO()):
+                    getattr(probe, method)(*args)
+            finally:
+                mem.set_trace_callback(None)
+
+            seen = set()
+            for sql in statements:
+                first_word = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+                if first_word not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") or sql in seen:
+                    continue
+                if "'cards_fts_" in sql:  # query interne del modulo FTS5
+                    continue
+                seen.add(sql)
+                plan = explain_plan(mem, sql)
+                report.append({
+                    "method": method,
+                    "sql": " ".join(sql.split()),
+                    "plan": plan,
+                    "full_scan": is_full_scan(plan),
+                    "expected": expected,
+                })
+        mem.close()
+        return report
+
     def setup_tournaments_table(self):
         """Crea le tabelle per tracciare i tornei"""
         if not self.conn:
             return False
         
-        cursor = self.conn.cursor()
+        with self._writing() as conn:
+            for sql in schema.CREATE_TOURNAMENTS_SQL:
+                conn.execute(sql)
+            schema.ensure_indexes(conn)
         
-        # Tabella tornei
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tournaments (
-                tournament_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                winner_name TEXT NOT NULL,
-                colors TEXT NOT NULL,
-                tournament_date DATE NOT NULL,
-                notes TEXT
-            )
-        ''')
-        
-        # Tabella mazzi vincitori (molti-a-molti con cards)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tournament_decks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tournament_id INTEGER NOT NULL,
-                card_unique_id TEXT NOT NULL,
-                FOREIGN KEY (tournament_id) REFERENCES tournaments(tournament_id),
-                FOREIGN KEY (card_unique_id) REFERENCES cards(unique_id)
-            )
-        ''')
-        
-        self.conn.commit()
-        print("✅ Tabelle tornei create")
+        log.info("✅ Tabelle tornei create")
         return True
 
-    def add_tournament(self, winner_name, colors, date, deck_cards):
-        """Registra un nuovo torneo"""
+    def add_tournament(self, winner_name, colors, date, deck_cards, cube_id=DEFAULT_CUBE_ID):
+        """Registra un nuovo torneo giocato con il cubo cube_id"""
         if not self.conn:
             return False
         
-        cursor = self.conn.cursor()
-        
         try:
-            # Inserisci torneo
-            cursor.execute(
-                "INSERT INTO tournaments (winner_name, colors, tournament_date) VALUES (?, ?, ?)",
-                (winner_name, colors, date)
-            )
-            tournament_id = cursor.lastrowid
-            
-            # Inserisci carte del mazzo
-            for card_id in deck_cards:
+            with self._writing() as conn:
+                cursor = conn.cursor()
+                # Inserisci torneo
                 cursor.execute(
-                    "INSERT INTO tournament_decks (tournament_id, card_unique_id) VALUES (?, ?)",
-                    (tournament_id, card_id)
+                    "INSERT INTO tournaments (winner_name, colors, tournament_date, cube_id) VALUES (?, ?, ?, ?)",
+                    (winner_name, colors, date, cube_id)
                 )
+                tournament_id = cursor.lastrowid
+                
+                # Inserisci carte del mazzo
+                for card_id in deck_cards:
+                    cursor.execute(
+                        "INSERT INTO tournament_decks (tournament_id, card_unique_id) VALUES (?, ?)",
+                        (tournament_id, card_id)
+                    )
+                schema.bump_cube_version(conn, cube_id)
             
-            self.conn.commit()
-            print(f"✅ Torneo registrato: {winner_name} - {colors}")
+            log.info("✅ Torneo registrato: %s - %s", winner_name, colors)
             return True
         
         except Exception as e:
-            print(f"❌ Errore registrazione torneo: {e}")
-            self.conn.rollback()
+            # il rollback lo fa già _writing()
+            log.error("❌ Errore registrazione torneo: %s", e)
             return False
 
-    def get_all_tournaments(self):
-        """Recupera tutti i tornei"""
+    @_cached
+    def get_all_tournaments(self, cube_id=DEFAULT_CUBE_ID):
+        """Recupera tutti i tornei del cubo"""
         if not self.conn:
             return []
         
@@ -645,11 +1407,13 @@ class CubeManager:
         cursor.execute("""
             SELECT tournament_id, winner_name, colors, tournament_date 
             FROM tournaments 
+            WHERE cube_id = ?
             ORDER BY tournament_date DESC
-        """)
+        """, (cube_id,))
         
         return cursor.fetchall()
 
+    @_cached
     def get_tournament_deck(self, tournament_id):
         """Recupera il mazzo di un torneo specifico"""
         if not self.conn:
@@ -665,28 +1429,37 @@ class CubeManager:
         
         return cursor.fetchall()
 
-    def get_card_winrate(self):
-        """Statistiche carte con più vittorie"""
+    @_cached
+    def get_card_winrate(self, cube_id=DEFAULT_CUBE_ID):
+        """Statistiche carte con più vittorie nei tornei del cubo"""
         if not self.conn:
             return []
         
         cursor = self.conn.cursor()
+        # conta prima sui mazzi dei tornei del cubo (indici su cube_id e tournament_id),
+        # poi unisce solo le carte vincenti
         cursor.execute("""
             SELECT 
                 c.name,
                 c.type,
                 c.color,
-                COUNT(td.tournament_id) as wins
-            FROM cards c
-            JOIN tournament_decks td ON c.unique_id = td.card_unique_id
-            GROUP BY c.unique_id
-            ORDER BY wins DESC
+                w.wins
+            FROM (
+                SELECT td.card_unique_id, COUNT(*) as wins
+                FROM tournaments t
+                JOIN tournament_decks td ON td.tournament_id = t.tournament_id
+                WHERE t.cube_id = ?
+                GROUP BY td.card_unique_id
+            ) w
+            JOIN cards c ON c.unique_id = w.card_unique_id
+            ORDER BY w.wins DESC
             LIMIT 50
-        """)
+        """, (cube_id,))
         
         return cursor.fetchall()
 
-    def get_color_winrate(self):
+    @_cached
+    def get_color_winrate(self, cube_id=DEFAULT_CUBE_ID):
         """Statistiche colori con più vittorie"""
         if not self.conn:
             return []
@@ -697,13 +1470,15 @@ class CubeManager:
                 colors,
                 COUNT(*) as wins
             FROM tournaments
+            WHERE cube_id = ?
             GROUP BY colors
             ORDER BY wins DESC
-        """)
+        """, (cube_id,))
         
         return cursor.fetchall()
 
-    def get_winner_stats(self):
+    @_cached
+    def get_winner_stats(self, cube_id=DEFAULT_CUBE_ID):
         """Statistiche vincitori"""
         if not self.conn:
             return []
@@ -715,16 +1490,17 @@ class CubeManager:
                 COUNT(*) as wins,
                 GROUP_CONCAT(DISTINCT colors) as colors_used
             FROM tournaments
+            WHERE cube_id = ?
             GROUP BY winner_name
             ORDER BY wins DESC
-        """)
+        """, (cube_id,))
         
         return cursor.fetchall()
 
-    def export_cube_to_json(self, filename=None):
-        """Esporta il cubo corrente in un file JSON"""
+    def export_cube_to_json(self, filename=None, cube_id=DEFAULT_CUBE_ID):
+        """Esporta il cubo in un file JSON"""
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return False
         
         if not filename:
@@ -733,11 +1509,13 @@ class CubeManager:
         
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT unique_id FROM cards WHERE in_cube = 1")
+            cursor.execute("SELECT card_id FROM cube_cards WHERE cube_id = ?", (cube_id,))
             cards_in_cube = [row[0] for row in cursor.fetchall()]
+            name = cursor.execute("SELECT name FROM cubes WHERE cube_id = ?", (cube_id,)).fetchone()
             
             backup_data = {
                 "export_date": datetime.now().isoformat(),
+                "cube_name": name[0] if name else None,
                 "total_cards": len(cards_in_cube),
                 "card_ids": cards_in_cube
             }
@@ -745,17 +1523,17 @@ class CubeManager:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(backup_data, f, indent=2, ensure_ascii=False)
             
-            print(f"✅ Cubo esportato in {filename} ({len(cards_in_cube)} carte)")
+            log.info("✅ Cubo esportato in %s (%s carte)", filename, len(cards_in_cube))
             return filename
         
         except Exception as e:
-            print(f"❌ Errore export: {e}")
+            log.error("❌ Errore export: %s", e)
             return False
 
-    def import_cube_from_json(self, filename, clear_existing=False):
-        """Importa un cubo da file JSON"""
+    def import_cube_from_json(self, filename, clear_existing=False, cube_id=DEFAULT_CUBE_ID):
+        """Importa un cubo da file JSON nel cubo cube_id"""
         if not self.conn:
-            print("❌ Connessione al database non disponibile")
+            log.error("❌ Connessione al database non disponibile")
             return False
         
         try:
@@ -765,48 +1543,45 @@ class CubeManager:
             card_ids = backup_data.get('card_ids', [])
             
             if not card_ids:
-                print("❌ Nessuna carta nel backup")
+                log.info("❌ Nessuna carta nel backup")
                 return False
             
-            cursor = self.conn.cursor()
-            
-            # Opzionale: pulisci il cubo esistente
+            # una sola transazione per tutto il backup
             if clear_existing:
-                cursor.execute("UPDATE cards SET in_cube = 0")
-                print("🗑️ Cubo esistente pulito")
-            
-            # Importa le carte
-            success_count = 0
-            not_found = []
-            
-            for card_id in card_ids:
-                cursor.execute("SELECT unique_id FROM cards WHERE unique_id = ?", (card_id,))
-                if cursor.fetchone():
-                    cursor.execute("UPDATE cards SET in_cube = 1 WHERE unique_id = ?", (card_id,))
-                    success_count += 1
-                else:
-                    not_found.append(card_id)
+                outcomes = self.set_cube(card_ids, cube_id=cube_id)
+                log.info("🗑️ Cubo esistente pulito")
+            else:
+                outcomes = self.add_cube_many(card_ids, cube_id=cube_id)
+            if not outcomes:
+                return False
             
-            self.conn.commit()
+            not_found = [card_id for card_id in dict.fromkeys(card_ids) if outcomes.get(card_id) == UNKNOWN]
+            success_count = len(set(card_ids)) - len(not_found)
             
-            print(f"✅ Importate {success_count}/{len(card_ids)} carte")
+            log.info("✅ Importate %s/%s carte", success_count, len(card_ids))
             
             if not_found:
-                print(f"⚠️ {len(not_found)} carte non trovate nel database:")
+                log.warning("⚠️ %s carte non trovate nel database:", len(not_found))
                 for card_id in not_found[:10]:  # Mostra solo le prime 10
-                    print(f"  - {card_id}")
+                    log.info("  - %s", card_id)
             
             return True
         
         except Exception as e:
-            print(f"❌ Errore import: {e}")
+            log.error("❌ Errore import: %s", e)
             return False
 
-    def get_cube_id_list(self):
+    @_cached
+    def get_cube_id_list(self, cube_id=DEFAULT_CUBE_ID):
         """Ritorna la lista semplice di ID delle carte nel cubo"""
         if not self.conn:
             return []
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT unique_id FROM cards WHERE in_cube = 1 ORDER BY name")
+        cursor.execute(f"SELECT unique_id FROM cards WHERE {_in_cube_sql()} ORDER BY name", (cube_id,))
         return [row[0] for row in cursor.fetchall()]
+
+
+# ogni metodo pubblico passa da self.perf (tempo, righe, errori); il menù e i metodi
+# di servizio no: sarebbero solo rumore nelle statistiche
+perf.instrument(CubeManager, exclude=("menu", "cached", "cache_stats"))
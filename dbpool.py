@@ -0,0 +1,129 @@
+#dbpool: connessioni sqlite condivise fra le sessioni di streamlit
+#una connessione di sola lettura per thread (riciclata quando il thread termina)
+#e una sola connessione di scrittura, usata da un thread alla volta
+
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import perf
+
+
+DEFAULT_BUSY_TIMEOUT = 5.0  # secondi di attesa prima di "database is locked"
+WAIT_SAMPLES = 1000  # attese di scrittura recenti tenute per i percentili
+
+_pools = weakref.WeakSet()  # pool aperti nel processo, per la diagnostica (vedi live_pools)
+
+
+def live_pools():
+    """Pool ancora in uso nel processo (es. quello dell'app, creato da st.cache_resource)"""
+    return list(_pools)
+
+
+class ConnectionPool:
+    def __init__(self, db_path, busy_timeout=DEFAULT_BUSY_TIMEOUT, instrumentation=None):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.instrumentation = instrumentation  # perf.Instrumentation: ogni statement viene cronometrato
+        self._lock = threading.Lock()  # protegge _readers e _idle
+        self._write_lock = threading.RLock()  # serializza le scritture
+        self._write_depth = 0
+        self._readers = {}  # thread -> connessione
+        self._idle = []  # connessioni di thread terminati, pronte per essere riusate
+        self._writer = None
+        # write_wait_s: attesa del turno fra i thread; lock_wait_s: attesa del lock di sqlite
+        # (altri processi che scrivono lo stesso file), misurata su BEGIN IMMEDIATE
+        self.stats = {"opened": 0, "reused": 0, "writes": 0, "write_wait_s": 0.0,
+                      "lock_wait_s": 0.0, "locked": 0}
+        self.waits = deque(maxlen=WAIT_SAMPLES)  # attesa totale (turno + lock) di ogni scrittura
+        _pools.add(self)
+
+    def _open(self, read_only):
+        factory = perf.TracedConnection if self.instrumentation else sqlite3.Connection
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False,
+                               factory=factory)
+        if self.instrumentation:
+            conn.instrumentation = self.instrumentation
+        conn.row_factory = sqlite3.Row #permette di accedere alle colonne per nome
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        conn.execute("PRAGMA synchronous = NORMAL")  # sicuro con WAL, molto meno fsync
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        self.stats["opened"] += 1
+        return conn
+
+    def open(self):
+        """Apre la connessione di scrittura e attiva il WAL (lettori e scrittore non si bloccano)"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open(read_only=False)
+                self._writer.execute("PRAGMA journal_mode = WAL")
+        return self._writer
+
+    def reader(self):
+        """Connessione di lettura del thread corrente"""
+        thread = threading.current_thread()
+        conn = self._readers.get(thread)
+        if conn is not None:
+            return conn
+        with self._lock:
+            # le connessioni dei thread già terminati tornano disponibili
+            for dead in [t for t in self._readers if not t.is_alive()]:
+                self._idle.append(self._readers.pop(dead))
+            if self._idle:
+                conn = self._idle.pop()
+                conn.rollback()
+                self.stats["reused"] += 1
+            else:
+                conn = self._open(read_only=True)
+            self._readers[thread] = conn
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """Connessione di scrittura, un thread alla volta: commit all'uscita, rollback se c'è un errore.
+
+        Si può annidare nello stesso thread: il commit avviene solo all'uscita più esterna.
+        La transazione parte con BEGIN IMMEDIATE: il lock di sqlite si prende subito
+        (aspettando al massimo busy_timeout) invece che a metà, quando non si può più aspettare.
+        """
+        start = time.perf_counter()
+        with self._write_lock:
+            turn = time.perf_counter()
+            self.stats["write_wait_s"] += turn - start
+            conn = self.open()
+            self._write_depth += 1
+            try:
+                if self._write_depth == 1 and not conn.in_transaction:
+                    try:
+                        conn.execute("BEGIN IMMEDIATE")
+                    except sqlite3.OperationalError:
+                        self.stats["locked"] += 1
+                        raise
+                    finally:
+                        self.stats["lock_wait_s"] += time.perf_counter() - turn
+                        self.waits.append(time.perf_counter() - start)
+                yield conn
+                if self._write_depth == 1:
+                    conn.commit()
+                    self.stats["writes"] += 1
+            except Exception:
+                if self._write_depth == 1:
+                    conn.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+
+    def close(self):
+        with self._lock:
+            for conn in list(self._readers.values()) + self._idle:
+                conn.close()
+            self._readers.clear()
+            self._idle.clear()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
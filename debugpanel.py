@@ -0,0 +1,193 @@
+#debugpanel: pannello "🐞 Perf debug" nella sidebar di LCM.py, attivo solo se lo si accende
+#per l'ultimo rerun (anche di un solo fragment) mostra il tempo dello script, i tempi per
+#sezione (db, dataframe, grafici, griglie; ognuna senza le altre e senza il db), i widget
+#creati, hit/miss della cache e gli statement SQL. I rerun si scaricano come JSON lines e,
+#se c'è la variabile LCM_PERF_LOG, si accodano anche a quel file
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+import perf
+import querycache
+
+
+SECTIONS = ("dataframe", "charts", "grid")
+HISTORY = 200  # rerun tenuti in sessione per l'export
+EXPORT_ENV = "LCM_PERF_LOG"
+TOGGLE_KEY = "perf_debug"
+SLOW_SHOWN = 5
+
+_thread = threading.local()  # profilo del rerun in corso nel thread dello script
+_nothing = contextlib.nullcontext()
+
+
+class RerunProfile:
+    """Tempi e contatori di un rerun: le sezioni sono esclusive (una sezione annidata
+    ferma quella esterna) e il tempo passato sul db non conta in nessuna sezione"""
+
+    def __init__(self, page, fragment=None):
+        self.page = page
+        self.fragment = fragment
+        self.start = time.perf_counter()
+        self.perf_start = perf.thread_counters()
+        self.cache_start = querycache.thread_counters()
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+        self._stack = []  # [nome, inizio, db all'inizio]
+
+    def _flush(self):
+        # somma alla sezione in cima il tempo dall'ultimo inizio, meno quello passato sul db
+        if self._stack:
+            name, start, db_start = self._stack[-1]
+            db = perf.thread_counters()["db_s"] - db_start
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - start - db
+
+    def _resume(self):
+        if self._stack:
+            self._stack[-1][1:] = [time.perf_counter(), perf.thread_counters()["db_s"]]
+
+    @contextlib.contextmanager
+    def section(self, name):
+        self._flush()
+        self._stack.append([name, time.perf_counter(), perf.thread_counters()["db_s"]])
+        try:
+            yield
+        finally:
+            self._flush()
+            self._stack.pop()
+            self._resume()
+
+    def result(self):
+        total = time.perf_counter() - self.start
+        counters = perf.thread_counters()
+        cache = querycache.thread_counters()
+        db = counters["db_s"] - self.perf_start["db_s"]
+        sections = {"db": db, **self.sections}
+        sections["other"] = max(0.0, total - sum(sections.values()))
+        return {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "page": self.page,
+            "fragment": self.fragment,
+            "total_ms": total * 1000,
+            "sections_ms": {name: seconds * 1000 for name, seconds in sections.items()},
+            "widgets": _widget_count(),
+            "cache_hits": cache["hits"] - self.cache_start["hits"],
+            "cache_misses": cache["misses"] - self.cache_start["misses"],
+            "statements": counters["statements"] - self.perf_start["statements"],
+        }
+
+
+def _widget_count():
+    # widget registrati in questo run (API interna di streamlit: None se non c'è)
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    ids = getattr(getattr(ctx, "shared", ctx), "widget_ids_this_run", None)
+    if ids is None:
+        return None
+    return len(ids.snapshot()) if hasattr(ids, "snapshot") else len(ids)
+
+
+def enabled():
+    return bool(st.session_state.get(TOGGLE_KEY))
+
+
+def begin(page):
+    """Inizio del rerun dello script (se il pannello è acceso)"""
+    _thread.profile = RerunProfile(page) if enabled() else None
+
+
+def current():
+    return getattr(_thread, "profile", None)
+
+
+def section(name):
+    """with section("charts"): ... (non fa niente se il pannello è spento)"""
+    profile = current()
+    return profile.section(name) if profile else _nothing
+
+
+def timed(name):
+    """Decoratore: tutta la funzione conta nella sezione name"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class traced:
+    """Modulo (px, pd...) le cui funzioni contano nella sezione name quando il pannello è acceso:
+    px = debugpanel.traced(px, "charts")"""
+
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._module, attr)
+        if not callable(value) or current() is None:
+            return value
+        return timed(self._name)(value)
+
+
+def profiled(name, slot):
+    """Decoratore per i fragment: un rerun del solo fragment ha il suo profilo e il suo pannello"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current() is not None or not enabled():
+                return fn(*args, **kwargs)  # dentro il rerun completo: conta in quello
+            _thread.profile = RerunProfile(st.session_state.get("page"), fragment=name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finish(slot, manager=None)
+        return wrapper
+    return decorator
+
+
+def finish(slot, manager=None):
+    """Fine del rerun: salva il profilo nella cronologia e disegna il pannello in slot"""
+    profile = current()
+    _thread.profile = None
+    if profile is None:
+        return
+    result = profile.result()
+    history = st.session_state.setdefault("perf_history", [])
+    history.append(result)
+    del history[:-HISTORY]
+    path = os.environ.get(EXPORT_ENV)
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    render(slot, result, history, manager)
+
+
+def render(slot, result, history, manager=None):
+    with slot.container():
+        st.markdown(f"**🐞 {result['fragment'] or 'script'} · {result['total_ms']:.0f} ms**")
+        st.markdown("| section | ms |\n|---|---:|\n" +
+                    "\n".join(f"| {name} | {ms:.1f} |" for name, ms in result["sections_ms"].items()))
+        st.caption(f"🧩 widgets: {result['widgets']} · 🗄️ statements: {result['statements']} · "
+                   f"💾 cache: {result['cache_hits']} hit / {result['cache_misses']} miss")
+        if manager is not None:
+            slow = list(manager.perf.slow_log)[-SLOW_SHOWN:]
+            if slow:
+                st.caption("🐢 Slow queries (process)")
+                for entry in reversed(slow):
+                    st.code(f"{entry['ms']:.0f} ms · {entry['method']} · {entry['rows']} rows\n"
+                            f"{entry['sql'][:300]}\n" + "\n".join(entry["plan"]), language=None)
+        if result["fragment"] is None:  # un fragment non può creare widget fuori da sé
+            st.download_button("⬇️ Export JSONL",
+                               "\n".join(json.dumps(r, ensure_ascii=False) for r in history) + "\n",
+                               file_name="lcm_perf.jsonl", mime="application/jsonl",
+                               key="perf_export", on_click="ignore")
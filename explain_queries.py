@@ -0,0 +1,39 @@
+#stampa EXPLAIN QUERY PLAN di ogni query del CubeManager, per accorgersi dei full scan
+#uso: python explain_queries.py [db] [--fail-on-scan]
+
+import argparse
+
+from cubeManager import CubeManager
+
+parser = argparse.ArgumentParser(description="Audit dei piani di esecuzione delle query di CubeManager")
+parser.add_argument("db", nargs="?", default="lorcana_cards.db")
+parser.add_argument("--fail-on-scan", action="store_true",
+                    help="esce con codice 1 se una query fa un full scan non previsto")
+args = parser.parse_args()
+
+manager = CubeManager(args.db)
+if not manager.connect():
+    exit(1)
+report = manager.explain_queries()
+manager.close()
+
+unexpected = 0
+for entry in report:
+    if entry["full_scan"] and not entry["expected"]:
+        mark = "⚠️ FULL SCAN"
+        unexpected += 1
+    elif entry["full_scan"]:
+        mark = "ℹ️ scan previsto"
+    else:
+        mark = "✅"
+    print(f"\n{mark}  {entry['method']}")
+    print(f"   {entry['sql'][:160]}")
+    for line in entry["plan"]:
+        print(f"     └ {line}")
+
+print("\n" + "=" * 70)
+print(f"📋 {len(report)} query analizzate, {unexpected} full scan non previsti")
+print("=" * 70)
+
+if args.fail_on_scan and unexpected:
+    exit(1)
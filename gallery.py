@@ -0,0 +1,48 @@
+#gallery: galleria del cubo nella Dashboard come un solo componente html
+#la griglia è virtualizzata (crea solo le righe visibili) e ordina/filtra nel browser
+
+import json
+import os
+
+import streamlit.components.v1 as components
+
+
+COMPONENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components")
+GALLERY_HTML = os.path.join(COMPONENTS_DIR, "cube_gallery", "index.html")
+
+GALLERY_HEIGHT = 760  # px dell'iframe: le carte scorrono al suo interno
+
+
+def compact_cards(cards, thumb_url=None):
+    """Carte del cubo -> liste [unique_id, nome, miniatura, colore, tipo, costo, immagine] (json più piccolo)
+
+    thumb_url(url, nome) dà l'indirizzo della miniatura (thumbs.StaticThumbnails.thumb_url),
+    senza si usa direttamente l'immagine grande.
+    """
+    compact = []
+    for card in cards:
+        image = card.get("Image") or card.get("image") or ""
+        name = card["name"] or ""
+        compact.append([
+            card["unique_id"],
+            name,
+            thumb_url(image, name) if thumb_url else image,
+            card["color"] or "",
+            card["type"] or "",
+            card["cost"],
+            image,
+        ])
+    return compact
+
+
+def gallery_html(cards, columns=8, thumb_url=None):
+    """HTML del componente con le carte già dentro"""
+    with open(GALLERY_HTML, encoding="utf-8") as f:
+        template = f.read()
+    # "</" spezzato: un nome con </script> non deve chiudere lo script
+    data = json.dumps(compact_cards(cards, thumb_url), ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return template.replace("__CARDS__", data).replace("__COLUMNS__", str(int(columns)))
+
+
+def render_cube_gallery(cards, columns=8, height=GALLERY_HEIGHT, thumb_url=None):
+    components.html(gallery_html(cards, columns, thumb_url), height=height, scrolling=False)
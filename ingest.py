@@ -0,0 +1,377 @@
+#ingest: caricamento del catalogo carte (card.json) nel database sqlite
+
+import gzip
+import hashlib
+import json
+import time
+
+import schema
+
+
+# colonne della tabella cards che vengono dal file, nell'ordine di inserimento
+SOURCE_COLUMNS = (
+    "unique_id", "name", "card_num", "set_name", "set_num", "set_id", "type", "color", "cost",
+    "inkable", "strength", "willpower", "lore", "move_cost", "rarity", "franchise",
+    "classifications", "body_text", "flavor_text", "abilities", "artist", "Image",
+    "gamemode", "date_added", "date_modified", "card_variants",
+)
+
+# ...seguite dalle bitmask calcolate da schema (dipendono dalle liste di schema, non dal file)
+CARD_COLUMNS = SOURCE_COLUMNS + tuple(schema.MASK_COLUMNS)
+
+MASKS_UPDATE_SQL = (
+    f"UPDATE cards SET {', '.join(f'{col} = ?' for col in schema.MASK_COLUMNS)} WHERE unique_id = ?"
+)
+
+# registro della sincronizzazione: ultimo Date_Modified e hash visti per ogni carta
+CREATE_LEDGER_SQL = '''
+    CREATE TABLE IF NOT EXISTS sync_ledger (
+        unique_id TEXT PRIMARY KEY,
+        date_modified TEXT,
+        content_hash TEXT NOT NULL,
+        synced_at TEXT NOT NULL
+    )
+'''
+
+# upsert che aggiorna le righe esistenti senza cancellarle (INSERT OR REPLACE le eliminava,
+# e con loro le righe di cube_cards e dei link)
+UPSERT_SQL = (
+    f"INSERT INTO cards ({', '.join(CARD_COLUMNS)}) VALUES ({', '.join('?' * len(CARD_COLUMNS))}) "
+    f"ON CONFLICT(unique_id) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in CARD_COLUMNS[1:])
+)
+
+LEDGER_UPSERT_SQL = """
+    INSERT OR REPLACE INTO sync_ledger (unique_id, date_modified, content_hash, synced_at)
+    VALUES (?, ?, ?, datetime('now'))
+"""
+
+# PRAGMA usati solo durante la ricostruzione completa (bulk_ingest): journal in memoria,
+# niente fsync, cache grande (~64MB). Un crash a metà può rovinare il file: vanno bene
+# solo perché bulk_ingest si può sempre rifare da card.json
+INGEST_PRAGMAS = (
+    ("journal_mode", "MEMORY"),
+    ("synchronous", "OFF"),
+    ("cache_size", "-64000"),
+    ("temp_store", "MEMORY"),
+)
+
+# PRAGMA della sincronizzazione incrementale, che gira sul db servito dall'app:
+# resta in WAL con synchronous NORMAL come le connessioni di dbpool, solo la cache è più grande
+SYNC_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", "-64000"),
+    ("temp_store", "MEMORY"),
+)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# byte letti per volta dal file bulk in modalità streaming
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def create_cards_table(conn):
+    """Crea la tabella cards con i suoi indici (e il registro di sync) se non esistono"""
+    features = schema.ensure_schema(conn)
+    conn.execute(CREATE_LEDGER_SQL)
+    conn.commit()
+    return features
+
+
+def apply_ingest_pragmas(conn, pragmas=INGEST_PRAGMAS):
+    """Imposta i PRAGMA (di default quelli veloci per il caricamento massivo).
+    Ritorna journal_mode e synchronous di prima, da passare a restore_pragmas"""
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ("journal_mode", "synchronous")}
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return previous
+
+
+def restore_pragmas(conn, previous):
+    """Rimette journal_mode e synchronous com'erano (un db in WAL torna in WAL)"""
+    for name, value in previous.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def _text(value):
+    #campi testuali che l'API a volte manda come lista
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def card_to_row(card):
+    """Converte una carta del JSON (chiavi Title_Case) nella tupla per la tabella cards"""
+    c = {k.lower(): v for k, v in card.items()}
+    card_set = c.get("set") if isinstance(c.get("set"), dict) else {}
+    color = _text(c.get("color"))
+    abilities = _text(c.get("abilities"))
+    classifications = _text(c.get("classifications"))
+    return (
+        c.get("unique_id"),
+        c.get("name"),
+        c.get("card_num"),
+        c.get("set_name", card_set.get("name")),
+        c.get("set_num", card_set.get("set_num")),
+        c.get("set_id", card_set.get("set_id")),
+        c.get("type"),
+        color,
+        c.get("cost"),
+        int(bool(c.get("inkable", False))),
+        c.get("strength"),
+        c.get("willpower"),
+        c.get("lore"),
+        c.get("move_cost"),
+        c.get("rarity"),
+        c.get("franchise"),
+        classifications,
+        c.get("body_text"),
+        c.get("flavor_text"),
+        abilities,
+        c.get("artist"),
+        c.get("image"),
+        _text(c.get("gamemode")),
+        c.get("date_added"),
+        c.get("date_modified"),
+        _text(c.get("card_variants")),
+    ) + schema.card_masks(color, abilities, classifications)
+
+
+def row_hash(row):
+    """Hash dei campi della riga che vengono dal file, per capire se la carta è cambiata.
+    Le bitmask restano fuori: aggiungere una voce a KEYWORDS non deve far sembrare cambiate tutte le carte"""
+    payload = json.dumps(row[:len(SOURCE_COLUMNS)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _ledger_entry(row):
+    # (unique_id, date_modified, hash) per sync_ledger
+    return (row[0], row[CARD_COLUMNS.index("date_modified")], row_hash(row))
+
+
+def _write_links(conn, rows):
+    # colori e classificazioni nelle tabelle normalizzate
+    color, classifications = CARD_COLUMNS.index("color"), CARD_COLUMNS.index("classifications")
+    schema.write_card_links(conn, [(row[0], row[color], row[classifications]) for row in rows])
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_ingest(conn, cards, batch_size=DEFAULT_BATCH_SIZE):
+    """Inserisce tutte le carte con executemany a blocchi in un'unica transazione.
+
+    Le carte già presenti vengono aggiornate restando nei loro cubi.
+    L'indice full-text viene ricostruito una volta alla fine invece che riga per riga.
+    Ritorna (carte inserite, secondi impiegati).
+    """
+    previous = apply_ingest_pragmas(conn)
+    has_fts = create_cards_table(conn)["fts"]
+
+    start = time.perf_counter()
+    total = 0
+    try:
+        conn.execute("BEGIN")
+        if has_fts:
+            schema.drop_fts_triggers(conn)
+        for batch in _batches((card_to_row(card) for card in cards), batch_size):
+            conn.executemany(UPSERT_SQL, batch)
+            _write_links(conn, batch)
+            conn.executemany(LEDGER_UPSERT_SQL, [_ledger_entry(row) for row in batch])
+            total += len(batch)
+            print(f"  ⏳ Processate {total} carte...")
+        if has_fts:
+            print("  🔎 Ricostruzione indice full-text...")
+            schema.rebuild_fts(conn)
+        schema.bump_card_versions(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        restore_pragmas(conn, previous)
+    elapsed = time.perf_counter() - start
+    return total, elapsed
+
+
+def delta_sync(conn, cards, batch_size=DEFAULT_BATCH_SIZE, prune=False):
+    """Sincronizzazione incrementale: scrive solo le carte nuove o modificate.
+
+    Una carta è invariata se Date_Modified e hash coincidono con sync_ledger; se le sue bitmask
+    non sono quelle calcolate ora (es. una nuova voce in KEYWORDS) si aggiornano solo quelle.
+    Le carte sparite dal file vengono riportate (ed eliminate solo con prune=True).
+    Ritorna un dict con 'new', 'changed', 'deleted' (liste di unique_id), 'unchanged' e 'masks'
+    (quante carte invariate e quante con le sole bitmask ricalcolate) ed 'elapsed'.
+    """
+    previous_pragmas = apply_ingest_pragmas(conn, SYNC_PRAGMAS)
+    try:
+        create_cards_table(conn)
+
+        start = time.perf_counter()
+        ledger = {
+            uid: (date_modified, content_hash)
+            for uid, date_modified, content_hash in conn.execute(
+                "SELECT unique_id, date_modified, content_hash FROM sync_ledger")
+        }
+        stored_masks = {
+            row[0]: tuple(row[1:])
+            for row in conn.execute(f"SELECT unique_id, {', '.join(schema.MASK_COLUMNS)} FROM cards")
+        }
+        result = {"new": [], "changed": [], "unchanged": 0, "masks": 0, "deleted": []}
+        seen = set()
+        masks_start = len(SOURCE_COLUMNS)
+
+        def changed_rows():
+            for card in cards:
+                row = card_to_row(card)
+                uid, date_modified, content_hash = _ledger_entry(row)
+                seen.add(uid)
+                previous = ledger.get(uid)
+                if previous is None:
+                    result["new"].append(uid)
+                elif previous != (date_modified, content_hash):
+                    result["changed"].append(uid)
+                else:
+                    result["unchanged"] += 1
+                    masks = row[masks_start:]
+                    if stored_masks.get(uid) != masks:
+                        result["masks"] += 1
+                        yield None, masks + (uid,)
+                    continue
+                yield row, (uid, date_modified, content_hash)
+
+        conn.execute("BEGIN")
+        for batch in _batches(changed_rows(), batch_size):
+            rows = [row for row, _ in batch if row is not None]
+            conn.executemany(UPSERT_SQL, rows)
+            _write_links(conn, rows)
+            conn.executemany(LEDGER_UPSERT_SQL, [entry for row, entry in batch if row is not None])
+            conn.executemany(MASKS_UPDATE_SQL, [entry for row, entry in batch if row is None])
+
+        result["deleted"] = sorted(uid for uid in ledger if uid not in seen)
+        if prune and result["deleted"]:
+            gone = [(uid,) for uid in result["deleted"]]
+            conn.executemany("DELETE FROM cards WHERE unique_id = ?", gone)
+            conn.executemany("DELETE FROM sync_ledger WHERE unique_id = ?", gone)
+        if result["new"] or result["changed"] or result["masks"] or (prune and result["deleted"]):
+            schema.bump_card_versions(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        restore_pragmas(conn, previous_pragmas)
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def report_sync(result, prune=False):
+    """Stampa il riepilogo di delta_sync"""
+    touched = len(result["new"]) + len(result["changed"])
+    print(f"🆕 Nuove: {len(result['new'])}")
+    print(f"✏️ Modificate: {len(result['changed'])}")
+    print(f"⏸️ Invariate: {result['unchanged']}")
+    if result["masks"]:
+        print(f"🔢 Bitmask ricalcolate: {result['masks']}")
+    deleted = result["deleted"]
+    if deleted:
+        action = "eliminate" if prune else "non più presenti nel file (usa --prune per eliminarle)"
+        print(f"🗑️ {len(deleted)} carte {action}:")
+        for uid in deleted[:10]:  # Mostra solo le prime 10
+            print(f"  - {uid}")
+    return touched
+
+
+def open_bulk_file(path):
+    """Apre il file bulk in testo, anche se compresso con gzip (riconosciuto dai magic byte)"""
+    with open(path, "rb") as f:
+        is_gzip = f.read(2) == b"\x1f\x8b"
+    if is_gzip:
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """Decodifica un array JSON top-level un elemento alla volta.
+
+    Tiene in memoria solo il pezzo di file che contiene l'elemento corrente,
+    quindi la memoria resta piatta qualunque sia la dimensione del file.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip(chars=" \t\r\n"):
+        # salta gli spazi, ricaricando il buffer quando serve; ritorna il carattere dopo
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                raise ValueError("Array JSON non terminato")
+            fill()
+
+    if skip(" \t\r\n\ufeff") != "[":
+        raise ValueError("Il file bulk deve contenere un array JSON di carte")
+    pos += 1
+    if skip() == "]":
+        return
+
+    while True:
+        skip()
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # elemento spezzato a metà fra due chunk: leggi ancora
+            if eof:
+                raise
+            fill()
+            continue
+        if not eof and buf[pos] not in '{["' and buf[end:end + 1] not in tuple(", \t\r\n]"):
+            # un numero (o true/false/null) spezzato dal bordo del chunk ("23|456", "1.|5")
+            # si decodifica lo stesso: è finito solo se dopo c'è un separatore
+            fill()
+            continue
+        pos = end
+        yield item
+        # fra due elementi ci vuole esattamente una virgola
+        separator = skip()
+        pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Atteso ',' o ']' nell'array JSON, trovato {separator!r}")
+
+
+def iter_cards(path):
+    """Genera le carte del file bulk (.json o .json.gz) senza caricarlo tutto in memoria"""
+    with open_bulk_file(path) as f:
+        yield from iter_json_array(f)
+
+
+def report_speed(total, elapsed):
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    print(f"⚡ {total} carte in {elapsed:.2f}s ({rate:,.0f} righe/s)")
+    return rate
@@ -0,0 +1,292 @@
+#loadtest: N sessioni contemporanee di LCM.py senza browser, con l'AppTest di streamlit
+#ogni sessione gira in un processo suo (l'AppTest usa un Runtime globale e non regge più
+#sessioni nello stesso processo) e ripete flussi realistici: sfoglia la gestione cubo e
+#aggiunge/toglie carte con ➕/➖, costruisce e salva il mazzo di un torneo, apre le statistiche.
+#i processi scrivono lo stesso db, quindi le attese del lock di sqlite sono quelle vere
+#
+#uso:
+#   python loadtest.py                              8 sessioni, 3 giri, copia di lorcana_cards.db
+#   python loadtest.py --sessions 20 --think 0.5 --json load.json
+#   python loadtest.py --cards 20000 --tournaments 2000     db sintetico (synthetic.py)
+#   python loadtest.py --p95 2.0                    esce con codice 1 se una pagina supera 2s al p95
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from contextlib import redirect_stdout
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(ROOT, "LCM.py")
+DB_FILE = "lorcana_cards.db"  # nome che l'app apre nella cartella corrente
+DEFAULT_SESSIONS = 8
+DEFAULT_ROUNDS = 3
+DEFAULT_THINK = 0.0  # secondi di pausa fra un'azione e l'altra
+DECK_CLICKS = 8  # ➕ cliccati sul mazzo prima di completarlo e salvarlo
+DECK_MIN = 40
+SEARCHES = ["", "", "mickey", "elsa", "draw", "pirate", "evasive"]
+INKS = ["Amber", "Amethyst", "Emerald", "Ruby", "Sapphire", "Steel"]
+PERCENTILES = (50, 90, 95, 99)
+TIMEOUT = 120
+
+
+class Session:
+    """Una sessione dell'app: ogni run() è un rerun, cronometrato ed etichettato con la pagina"""
+
+    def __init__(self, db_path, rng, think):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+        self.db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+        self.rng = rng
+        self.think = think
+        self.page = None
+        self.samples = []  # (pagina, azione, secondi, errori)
+
+    def run(self, action, element=None):
+        if self.think:
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+        start = time.perf_counter()
+        (element or self.at).run()
+        elapsed = time.perf_counter() - start
+        errors = [e.message for e in self.at.exception]
+        self.samples.append((self.page, action, elapsed, errors))
+        return not errors
+
+    def goto(self, page):
+        self.page = page
+        self.at.sidebar.radio(key="page").set_value(page)
+        return self.run("open")
+
+    def button(self, label=None, key=None):
+        for button in self.at.button:
+            if (key is None or button.key == key) and (label is None or button.label == label):
+                return button
+        return None
+
+    def click(self, action, label=None, key=None):
+        button = self.button(label, key)
+        if button is None or button.disabled:
+            return False
+        return self.run(action, button.click())
+
+    # ---- flussi ----
+
+    def browse_cube(self):
+        """Gestione cubo: una ricerca, qualche pagina avanti, ➕ su carte nuove e poi ➖"""
+        from schema import DEFAULT_CUBE_ID
+
+        if not self.goto("➕ Cube management"):
+            return
+        self.at.text_input(key="filter_name_input").input(self.rng.choice(SEARCHES))
+        self.run("search")
+        for _ in range(self.rng.randint(1, 3)):
+            self.click("next page", label="Next ▶️")
+        ids = [row[0] for row in self.db.execute(
+            "SELECT unique_id FROM cards WHERE unique_id NOT IN "
+            "(SELECT card_id FROM cube_cards WHERE cube_id = ?) ORDER BY random() LIMIT ?",
+            (DEFAULT_CUBE_ID, self.rng.randint(1, 4)))]
+        for action in ("add", "remove"):  # il cubo resta com'era: i giri si possono ripetere
+            self.at.session_state["cube_grid"] = {
+                "batch": f"{os.getpid()}-{time.perf_counter_ns()}",
+                "events": [[uid, action] for uid in ids],
+            }
+            self.run(f"grid {action}")
+
+    def build_deck(self):
+        """Report a tournament: vincitore, inchiostri, qualche ➕, mazzo completo e salvataggio"""
+        if not self.goto("🏆 Report a tournament"):
+            return
+        winner = next(t for t in self.at.text_input if t.label == "Winner name")
+        winner.input(f"Load test {os.getpid()}")
+        self.at.multiselect(key="tournament_colors").set_value(self.rng.sample(INKS, 2))
+        if not self.run("deck setup"):
+            return
+        for _ in range(DECK_CLICKS):
+            adds = [b for b in self.at.button if (b.key or "").startswith("tadd_")]
+            if not adds:
+                if not self.click("deck next page", key="next_t"):
+                    break
+                continue
+            self.run("deck add", self.rng.choice(adds).click())
+        deck = list(self.at.session_state["tournament_deck"]) if "tournament_deck" in self.at.session_state else []
+        if not deck:
+            return
+        # il resto del mazzo in una volta (copie delle carte scelte): 40 clic non dicono di più
+        self.at.session_state["tournament_deck"] = (deck * DECK_MIN)[:DECK_MIN]
+        self.run("deck complete")
+        self.click("save tournament", label="💾 Save Tournament")
+
+    def open_stats(self):
+        """Statistiche dei tornei e dashboard"""
+        self.goto("📈 Tournament stats")
+        self.goto("🏠 Dashboard")
+
+
+FLOWS = ("browse_cube", "build_deck", "open_stats")
+
+
+def run_session(index, db_path, workdir, rounds, think, seed, barrier, results):
+    """Processo figlio: una sessione, FLOWS in ordine casuale per rounds giri"""
+    os.chdir(workdir)
+    # le print dell'app e gli avvisi di streamlit a ogni rerun non servono qui:
+    # gli errori arrivano comunque al processo principale
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    rng = random.Random(seed + index)
+    samples, error = [], None
+    try:
+        session = Session(db_path, rng, think)
+        session.page = "🏠 Dashboard"
+        session.at.run()  # avvio a freddo (import, connessione): non è un rerun
+        barrier.wait()
+        for _ in range(rounds):
+            for flow in rng.sample(FLOWS, len(FLOWS)):
+                getattr(session, flow)()
+        samples = session.samples
+    except Exception:
+        error = traceback.format_exc(limit=-3)
+        barrier.abort()  # le altre sessioni non restano ad aspettare questa
+    import dbpool
+
+    pools = [{"stats": dict(pool.stats), "waits": list(pool.waits)} for pool in dbpool.live_pools()]
+    results.put({"session": index, "samples": samples, "pools": pools, "error": error})
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    result = {f"p{p}": values[min(len(values) - 1, int(len(values) * p / 100))] for p in PERCENTILES}
+    result["max"] = values[-1]
+    result["mean"] = statistics.fmean(values)
+    return result
+
+
+def prepare_database(workdir, cards, tournaments, cube_size, seed):
+    """Copia di lorcana_cards.db (o db sintetico) nella cartella di lavoro: quello vero non si tocca.
+    Se il cubo della copia è vuoto ne crea uno a caso, altrimenti non c'è niente da mettere nei mazzi"""
+    import schema
+    import synthetic
+
+    path = os.path.join(workdir, DB_FILE)
+    if cards:
+        synthetic.build_database(path, cards, tournaments, cube_size, seed=seed)
+        return path
+    shutil.copyfile(os.path.join(ROOT, DB_FILE), path)
+    conn = sqlite3.connect(path)
+    with redirect_stdout(io.StringIO()):
+        schema.ensure_schema(conn)  # un db vecchio si aggiorna qui, non nella prima sessione
+    if not conn.execute("SELECT COUNT(*) FROM cube_cards WHERE cube_id = ?", (schema.DEFAULT_CUBE_ID,)).fetchone()[0]:
+        synthetic.fill_cube(conn, cube_size, seed)
+    conn.close()
+    return path
+
+
+def summarize(results, elapsed):
+    samples = [s for r in results for s in r["samples"]]
+    by_page = {}
+    for page, _, seconds, _ in samples:
+        by_page.setdefault(page, []).append(seconds)
+    stats = [p["stats"] for r in results for p in r["pools"]]
+    waits = [w for r in results for p in r["pools"] for w in p["waits"]]
+    errors = [f"{page} / {action}: {e}" for page, action, _, errs in samples for e in errs]
+    return {
+        "elapsed_s": elapsed,
+        "reruns": len(samples),
+        "reruns_per_s": len(samples) / elapsed if elapsed else 0,
+        "pages": {page: dict(percentiles(values), count=len(values)) for page, values in by_page.items()},
+        "actions": {f"{page} / {action}": percentiles([s for p, a, s, _ in samples if (p, a) == (page, action)])
+                    for page, action in sorted({(p, a) for p, a, _, _ in samples})},
+        "db": {
+            "writes": sum(s["writes"] for s in stats),
+            "lock_wait_s": sum(s["lock_wait_s"] for s in stats),
+            "write_wait_s": sum(s["write_wait_s"] for s in stats),
+            "locked": sum(s["locked"] for s in stats),
+            "waits": percentiles(waits),
+        },
+        "errors": errors,
+        "failed_sessions": [f"#{r['session']}: {r['error']}" for r in results if r["error"]],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test di LCM.py con sessioni AppTest contemporanee")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS,
+                        help="sessioni contemporanee (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help="giri di tutti i flussi per sessione (default: %(default)s)")
+    parser.add_argument("--think", type=float, default=DEFAULT_THINK,
+                        help="pausa media in secondi fra le azioni (default: %(default)s)")
+    parser.add_argument("--cards", type=int, help="usa un db sintetico con queste carte")
+    parser.add_argument("--tournaments", type=int, default=0, help="tornei del db sintetico")
+    parser.add_argument("--cube-size", type=int, default=360,
+                        help="carte del cubo se quello del db è vuoto (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--p95", type=float, help="secondi massimi al p95 per ogni pagina")
+    parser.add_argument("--json", help="salva i risultati in questo file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="lcm_load_")
+    try:
+        db_path = prepare_database(workdir, args.cards, args.tournaments, args.cube_size, args.seed)
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(args.sessions)
+        results_queue = ctx.Queue()
+        print(f"🚀 Avvio di {args.sessions} sessioni ({args.rounds} giri, pausa {args.think}s)...")
+        processes = [ctx.Process(target=run_session, args=(i, db_path, workdir, args.rounds, args.think,
+                                                           args.seed, barrier, results_queue))
+                     for i in range(args.sessions)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        results = [results_queue.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(results, elapsed)
+    print("\n" + "=" * 70)
+    print(f"📊 LOAD TEST: {args.sessions} sessioni, {report['reruns']} rerun in {elapsed:.1f}s "
+          f"({report['reruns_per_s']:.1f}/s)")
+    print("=" * 70)
+    print(f"  {'pagina':28} {'n':>5} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    over = 0
+    for page, p in report["pages"].items():
+        slow = args.p95 is not None and p["p95"] > args.p95
+        over += slow
+        print(f"{'❌' if slow else '  '}{page:28} {p['count']:5} " +
+              " ".join(f"{p[k]:8.3f}" for k in ("p50", "p90", "p95", "p99", "max")))
+
+    db = report["db"]
+    print("\n🔒 Lock del database")
+    print(f"   scritture: {db['writes']}, 'database is locked': {db['locked']}")
+    print(f"   attesa lock sqlite: {db['lock_wait_s']:.3f}s, attesa turno fra thread: {db['write_wait_s']:.3f}s")
+    if db["waits"]:
+        print(f"   attesa per scrittura: p50 {db['waits']['p50'] * 1000:.1f} ms, "
+              f"p95 {db['waits']['p95'] * 1000:.1f} ms, max {db['waits']['max'] * 1000:.1f} ms")
+
+    for line in report["failed_sessions"] + report["errors"][:10]:
+        print(f"❌ {line[:300]}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(report, sessions=args.sessions, rounds=args.rounds, think=args.think),
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Risultati salvati in {args.json}")
+
+    failed = over or report["errors"] or report["failed_sessions"]
+    sys.exit(1 if failed else 0)
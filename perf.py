@@ -0,0 +1,266 @@
+#perf: tempi, righe e numero di chiamate di ogni metodo pubblico di CubeManager e di ogni statement SQL
+#le connessioni del pool sono TracedConnection: execute e fetch sono cronometrati per statement;
+#uno statement più lento di slow_ms finisce nel registro delle query lente (gli ultimi
+#SLOW_LOG_SIZE) con il suo EXPLAIN QUERY PLAN
+
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+SLOW_QUERY_MS = 50.0
+SLOW_LOG_SIZE = 100
+MAX_STATEMENTS = 500  # statement diversi tenuti nelle statistiche (gli altri finiscono in OTHER)
+OTHER = "(altri statement)"
+PARAMS_REPR = 200  # caratteri dei parametri salvati nel registro
+
+log = logging.getLogger(__name__)
+
+_PLACEHOLDERS = re.compile(r"\?(\s*,\s*\?)+")
+_thread = threading.local()  # statement e tempo sul db del thread (un rerun di streamlit = un thread)
+
+
+def thread_counters():
+    """Statement eseguiti e secondi passati sul db dal thread corrente, da tutti i manager"""
+    return {"statements": getattr(_thread, "statements", 0), "db_s": getattr(_thread, "db_s", 0.0)}
+
+
+def normalize_sql(sql):
+    """Chiave di uno statement: spazi compattati, liste di ? di lunghezza variabile unite"""
+    return _PLACEHOLDERS.sub("?, ...", " ".join(sql.split()))
+
+
+def _new_stats():
+    return {"calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0, "errors": 0}
+
+
+class Instrumentation:
+    """Statistiche di metodi e statement di un CubeManager, condivise fra i thread"""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_log_size=SLOW_LOG_SIZE):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self.methods = {}  # nome -> calls, total_s, max_s, rows, errors
+        self.queries = {}  # sql normalizzato -> calls, total_s, max_s, rows, errors
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # metodi in corso nel thread (per attribuire le query)
+
+    def current_method(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def call(self, name, fn, *args, **kwargs):
+        """Esegue fn e ne registra tempo, righe del risultato ed eventuale errore sotto name"""
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(name)
+        start = time.perf_counter()
+        error = True
+        try:
+            result = fn(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            rows = len(result) if not error and isinstance(result, (list, tuple, dict)) else 0
+            with self._lock:
+                stats = self.methods.get(name) or self.methods.setdefault(name, _new_stats())
+                stats["calls"] += 1
+                stats["total_s"] += elapsed
+                stats["max_s"] = max(stats["max_s"], elapsed)
+                stats["rows"] += rows
+                stats["errors"] += error
+
+    def start_query(self, conn, sql, params, elapsed, error=False):
+        """Un execute appena finito; ritorna la traccia da aggiornare con i fetch"""
+        key = normalize_sql(sql)
+        trace = {"sql": key, "raw": sql, "params": params, "method": self.current_method(), "conn": conn,
+                 "ms": 0.0, "rows": 0, "slow": False}
+        with self._lock:
+            if key not in self.queries and len(self.queries) >= MAX_STATEMENTS:
+                key = OTHER
+            stats = self.queries.get(key) or self.queries.setdefault(key, _new_stats())
+            stats["calls"] += 1
+            stats["errors"] += error
+            trace["stats"] = stats
+        _thread.statements = getattr(_thread, "statements", 0) + 1
+        self.progress(trace, elapsed, 0)
+        return trace
+
+    def progress(self, trace, elapsed, rows):
+        """Tempo e righe di un fetch (o dell'execute) sommati allo statement"""
+        trace["ms"] += elapsed * 1000
+        trace["rows"] += rows
+        _thread.db_s = getattr(_thread, "db_s", 0.0) + elapsed
+        stats = trace["stats"]
+        with self._lock:
+            stats["total_s"] += elapsed
+            stats["rows"] += rows
+        if not trace["slow"] and trace["ms"] >= self.slow_ms:
+            self._log_slow(trace)
+
+    def finish(self, trace):
+        """Statement finito (cursore esaurito, rieseguito o chiuso): aggiorna il massimo"""
+        stats = trace["stats"]
+        with self._lock:
+            stats["max_s"] = max(stats["max_s"], trace["ms"] / 1000)
+
+    def _log_slow(self, trace):
+        # segnata appena supera la soglia: ms e righe finali arrivano quando il cursore finisce
+        trace["slow"] = True
+        trace["plan"] = explain(trace.pop("conn"), trace.pop("raw"), trace["params"])
+        trace["params"] = repr(trace["params"])[:PARAMS_REPR]
+        trace["time"] = time.time()
+        entry = {k: v for k, v in trace.items() if k != "stats"}
+        trace["entry"] = entry
+        self.slow_log.append(entry)
+        log.debug("🐢 Query lenta in %s (%.1f ms): %s", trace["method"], trace["ms"], trace["sql"])
+
+    def snapshot(self):
+        """Copia di statistiche e registro, ordinati dal più costoso"""
+        with self._lock:
+            methods = {k: dict(v) for k, v in self.methods.items()}
+            queries = {k: dict(v) for k, v in self.queries.items()}
+            slow = [dict(entry) for entry in self.slow_log]
+        by_total = lambda items: dict(sorted(items, key=lambda kv: -kv[1]["total_s"]))
+        return {"methods": by_total(methods.items()), "queries": by_total(queries.items()), "slow": slow}
+
+    def reset(self):
+        with self._lock:
+            self.methods.clear()
+            self.queries.clear()
+            self.slow_log.clear()
+
+
+def explain(conn, sql, params):
+    """Righe 'detail' di EXPLAIN QUERY PLAN, [] per gli statement che non hanno un piano"""
+    if conn is None or sql.split(None, 1)[0].upper() not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+        return []
+    try:
+        cursor = sqlite3.Cursor(conn)  # cursore normale: la EXPLAIN non va nelle statistiche
+        return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()]
+    except (sqlite3.Error, ValueError) as e:
+        return [f"(EXPLAIN non riuscita: {e})"]
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursore che cronometra execute e fetch nell'Instrumentation della sua connessione"""
+
+    _trace = None
+
+    def _run(self, method, sql, params, plan_params):
+        perf = self.connection.instrumentation
+        if perf is None or not perf.enabled:
+            return method(sql, params)
+        self._done()
+        start = time.perf_counter()
+        try:
+            method(sql, params)
+        except Exception:
+            perf.start_query(None, sql, plan_params, time.perf_counter() - start, error=True)
+            raise
+        self._trace = perf.start_query(self.connection, sql, plan_params, time.perf_counter() - start)
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # il piano si chiede solo con il primo gruppo di parametri, se è una lista
+        first = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else None
+        return self._run(super().executemany, sql, seq_of_parameters, first)
+
+    def _timed(self, fetch, count, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        rows = count(result)
+        self.connection.instrumentation.progress(self._trace, time.perf_counter() - start, rows)
+        return result, rows
+
+    def fetchone(self):
+        if self._trace is None:
+            return super().fetchone()
+        row, rows = self._timed(super().fetchone, lambda r: r is not None)
+        if row is None:
+            self._done()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        if self._trace is None:
+            return super().fetchmany(size)
+        result, rows = self._timed(super().fetchmany, len, size)
+        if rows < size:
+            self._done()
+        return result
+
+    def fetchall(self):
+        if self._trace is None:
+            return super().fetchall()
+        result, _ = self._timed(super().fetchall, len)
+        self._done()
+        return result
+
+    def __next__(self):
+        if self._trace is None:
+            return super().__next__()
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.connection.instrumentation.progress(self._trace, time.perf_counter() - start, 0)
+            self._done()
+            raise
+        self.connection.instrumentation.progress(self._trace, time.perf_counter() - start, 1)
+        return row
+
+    def close(self):
+        self._done()
+        super().close()
+
+    def _done(self):
+        trace = self._trace
+        if trace is not None:
+            self._trace = None
+            self.connection.instrumentation.finish(trace)
+            entry = trace.get("entry")
+            if entry is not None:  # la voce del registro prende tempo e righe finali
+                entry.update(ms=trace["ms"], rows=trace["rows"])
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connessione i cui cursori sono TracedCursor (factory di sqlite3.connect)"""
+
+    instrumentation = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def timed(method):
+    """Decoratore per i metodi pubblici di CubeManager: registra la chiamata in self.perf"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.perf.call(method.__name__, method, self, *args, **kwargs)
+    return wrapper
+
+
+def instrument(cls, exclude=()):
+    """Applica timed() a tutti i metodi pubblici di cls, tranne quelli in exclude"""
+    for name, value in list(vars(cls).items()):
+        if not name.startswith("_") and name not in exclude and callable(value):
+            setattr(cls, name, timed(value))
+    return cls
@@ -0,0 +1,125 @@
+#profile_startup: misura l'avvio a freddo di LCM.py pagina per pagina
+#ogni pagina gira in un processo nuovo con l'AppTest di streamlit, così gli import dell'app
+#(pandas, plotly, numpy...) si pagano davvero: si misura il primo run fino alla pagina completa,
+#il tempo passato negli import durante quel run e quali moduli pesanti sono stati caricati
+#
+#uso:
+#   python profile_startup.py                      tutte le pagine, budget di BUDGETS
+#   python profile_startup.py --budget 1.0 --json startup.json   stesso budget per tutte
+#   python profile_startup.py --pages Rules Backup
+#esce con codice 1 se una pagina supera il budget
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LCM.py")
+PAGES = ["🏠 Dashboard", "➕ Cube management", "📊 Other stats", "🏆 Report a tournament",
+         "📈 Tournament stats", "💾 Backup/Restore", "📜 Rules"]
+HEAVY_MODULES = ("pandas", "plotly.express", "numpy", "requests")
+
+# secondi per il primo run di ogni pagina (streamlit escluso): le pagine senza grafici
+# non importano pandas/plotly e devono restare sotto il secondo
+BUDGETS = {
+    "🏠 Dashboard": 2.0,
+    "➕ Cube management": 2.0,
+    "📊 Other stats": 2.0,
+    "🏆 Report a tournament": 1.0,
+    "📈 Tournament stats": 2.0,
+    "💾 Backup/Restore": 1.0,
+    "📜 Rules": 1.0,
+}
+MARKER = "-- profile_startup: app --"  # separa gli import di streamlit da quelli dell'app
+TOP_IMPORTS = 5
+
+
+def run_child(page):
+    """Nel processo figlio: primo run della pagina, stampa il risultato in JSON su stdout"""
+    from streamlit.testing.v1 import AppTest  # streamlit c'è già nel server: non conta
+
+    print(MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state["page"] = page
+    at.run()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "page": page,
+        "first_run_s": elapsed,
+        "errors": [e.message for e in at.exception],
+        "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+    }))
+
+
+def parse_importtime(stderr):
+    """Righe di -X importtime dopo il marcatore -> (secondi totali, moduli più lenti)"""
+    lines = stderr.split(MARKER, 1)[-1].splitlines()
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), name.strip()))
+    modules.sort(reverse=True)
+    return sum(us for us, _ in modules) / 1e6, [(name, us / 1e6) for us, name in modules[:TOP_IMPORTS]]
+
+
+def profile_page(page):
+    proc = subprocess.run([sys.executable, "-X", "importtime", __file__, "--child", page],
+                          capture_output=True, text=True, encoding="utf-8",
+                          cwd=os.path.dirname(APP))
+    if proc.returncode != 0 or not proc.stdout.strip():
+        return {"page": page, "first_run_s": None, "errors": [proc.stderr.strip()[-500:]],
+                "heavy_modules": [], "import_s": None, "top_imports": []}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["import_s"], result["top_imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avvio a freddo di LCM.py per ogni pagina")
+    parser.add_argument("--budget", type=float,
+                        help="secondi massimi per il primo run di ogni pagina (default: BUDGETS)")
+    parser.add_argument("--pages", nargs="*", help="solo le pagine che contengono queste parole")
+    parser.add_argument("--json", help="salva i risultati in questo file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        sys.exit(0)
+
+    pages = [p for p in PAGES if not args.pages or any(w.lower() in p.lower() for w in args.pages)]
+    print("\n" + "=" * 70)
+    print("⏱️ AVVIO A FREDDO DI LCM.py")
+    print("=" * 70)
+
+    results, over = [], 0
+    for page in pages:
+        result = profile_page(page)
+        result["budget_s"] = args.budget or BUDGETS[page]
+        results.append(result)
+        if result["first_run_s"] is None or result["errors"]:
+            over += 1
+            print(f"\n❌ {page}: errore\n   {result['errors'][0][:300]}")
+            continue
+        ok = result["first_run_s"] <= result["budget_s"]
+        over += not ok
+        print(f"\n{'✅' if ok else '❌'} {page}: {result['first_run_s']:.3f}s "
+              f"(import {result['import_s']:.3f}s, budget {result['budget_s']:.2f}s)")
+        print(f"   moduli pesanti: {', '.join(result['heavy_modules']) or 'nessuno'}")
+        for name, seconds in result["top_imports"]:
+            print(f"   {seconds * 1000:8.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"pages": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Risultati salvati in {args.json}")
+
+    print("\n" + "=" * 70)
+    print(f"{'✅ Tutte le pagine nel budget' if not over else f'❌ Pagine fuori budget: {over}'}")
+    sys.exit(1 if over else 0)
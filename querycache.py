@@ -0,0 +1,97 @@
+#querycache: cache in memoria dei risultati delle query, valida finché non cambia la versione dei dati
+#le versioni sono salvate nel db (schema.cube_version, schema.cube_versions per cubo) e crescono
+#a ogni modifica, quindi basta confrontarle per sapere se un risultato è ancora buono
+
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_SIZE = 256  # risultati tenuti in memoria prima di scartare i meno usati
+
+_thread = threading.local()  # hit e miss del thread corrente, su tutte le cache
+
+
+def thread_counters():
+    """hits e misses delle cache chiesti dal thread corrente (un rerun di streamlit = un thread)"""
+    return {"hits": getattr(_thread, "hits", 0), "misses": getattr(_thread, "misses", 0)}
+
+
+def freeze(value):
+    """Rende una lista/dict/set di argomenti utilizzabile come chiave della cache"""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    return value
+
+
+class QueryCache:
+    """Cache LRU thread-safe in cui ogni risultato ha la sua versione.
+
+    Un risultato vale solo per la versione con cui è stato salvato: con una versione diversa
+    è un miss e il nuovo risultato lo sostituisce (quelli vecchi escono con l'LRU). Così una
+    modifica a un cubo non butta i risultati degli altri cubi. I valori sono condivisi fra
+    tutte le sessioni, chi li riceve non deve modificarli.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # chiave -> (versione, valore)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, version, key):
+        """Ritorna (trovato, valore) per la chiave alla versione indicata"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == version:
+                self._data.move_to_end(key)
+                self.hits += 1
+                _thread.hits = getattr(_thread, "hits", 0) + 1
+                return True, entry[1]
+            self.misses += 1
+            _thread.misses = getattr(_thread, "misses", 0) + 1
+            return False, None
+
+    def put(self, version, key, value):
+        # se nel frattempo i dati sono cambiati il risultato resta con la versione vecchia:
+        # alla prossima richiesta è un miss, non un risultato sbagliato
+        with self._lock:
+            if not self.enabled:
+                return
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, version, key, compute):
+        found, value = self.get(version, key)
+        if not found:
+            value = compute()
+            self.put(version, key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,504 @@
+#schema: tabelle, indici full-text e migrazioni di lorcana_cards.db
+#usato sia da ingest (main.py) sia da CubeManager.connect(), così un db vecchio viene aggiornato all'apertura
+
+import logging
+import re
+import sqlite3
+
+
+# le migrazioni girano anche dentro CubeManager.connect(): messaggi a livelli, non print
+# (main.py e il menù da console li mostrano a schermo, l'app solo i warning)
+log = logging.getLogger(__name__)
+
+# versione minima della libreria sqlite: INSERT ... RETURNING e ALTER TABLE ... DROP COLUMN sono della 3.35
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# card_key è la chiave intera della carta (alias del rowid): a differenza del rowid implicito
+# VACUUM non la rinumera, quindi la possono usare cards_fts e l'ordine 'set' di browse()
+CREATE_CARDS_SQL = '''
+    CREATE TABLE IF NOT EXISTS cards (
+        card_key INTEGER PRIMARY KEY,
+        unique_id TEXT UNIQUE,
+        name TEXT,
+        card_num INTEGER,
+        set_name TEXT,
+        set_num INTEGER,
+        set_id TEXT,
+        type TEXT,
+        color TEXT,
+        cost INTEGER,
+        inkable INTEGER,
+        strength INTEGER,
+        willpower INTEGER,
+        lore INTEGER,
+        move_cost INTEGER,
+        rarity TEXT,
+        franchise TEXT,
+        classifications TEXT,
+        body_text TEXT,
+        flavor_text TEXT,
+        abilities TEXT,
+        artist TEXT,
+        Image TEXT,
+        gamemode TEXT,
+        date_added TEXT,
+        date_modified TEXT,
+        card_variants TEXT,
+        ink_mask INTEGER DEFAULT 0,
+        keyword_mask INTEGER DEFAULT 0,
+        class_mask INTEGER DEFAULT 0
+    )
+'''
+
+# colonne bitmask: il bit i è acceso se la carta ha l'i-esimo valore della lista.
+# Le liste si allungano solo in coda, così i bit già salvati non cambiano significato.
+INK_COLORS = ['Amber', 'Amethyst', 'Emerald', 'Ruby', 'Sapphire', 'Steel']
+
+# classificazioni note dei Character [Hero, Villain, Ally, Floodborn, Dreamborn, etc...]
+CLASSIFICATIONS = ['Alien', 'Ally', 'Broom', 'Captain', 'Deity', 'Detective', 'Dragon', 'Dreamborn', 'Entangled',
+                   'Fairy', 'Floodborn', 'Hero', 'Hyena', 'Inventor', 'King', 'Knight', 'Madrigal', 'Mentor',
+                   'Musketeer', 'Pirate', 'Prince', 'Princess', 'Puppy', 'Queen', 'Racer', 'Seven Dwarfs',
+                   'Song', 'Sorcerer', 'Storyborn', 'Tigger', 'Titan', 'Villain',
+                   'Gargoyle', 'Ghost', 'Hunny', 'Illusion', 'Robot', 'Whisper']
+
+# parole chiave cercate nelle abilities [Challenger, Evasive, Rush, etc...]
+KEYWORDS = ['Challenger', 'Evasive', 'Rush', 'Ward', 'Shift',
+            'Bodyguard', 'Reckless', 'Singer', 'Support', 'Resist',
+            'Sing Together', 'Vanish']
+
+MASK_COLUMNS = {
+    "ink_mask": "color",
+    "keyword_mask": "abilities",
+    "class_mask": "classifications",
+}
+
+# tabelle normalizzate: una riga per ogni colore / classificazione di una carta
+CREATE_LINK_TABLES_SQL = (
+    '''
+    CREATE TABLE IF NOT EXISTS card_colors (
+        card_id TEXT NOT NULL,
+        color TEXT NOT NULL,
+        PRIMARY KEY (card_id, color)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS card_classifications (
+        card_id TEXT NOT NULL,
+        classification TEXT NOT NULL,
+        PRIMARY KEY (card_id, classification)
+    ) WITHOUT ROWID
+    ''',
+    # se una carta viene eliminata spariscono anche i suoi legami
+    '''
+    CREATE TRIGGER IF NOT EXISTS cards_links_ad AFTER DELETE ON cards BEGIN
+        DELETE FROM card_colors WHERE card_id = old.unique_id;
+        DELETE FROM card_classifications WHERE card_id = old.unique_id;
+    END
+    ''',
+)
+
+# cubi: il catalogo è uno solo, ogni cubo è un insieme di carte in cube_cards
+# (chiave (cube_id, card_id) per le carte di un cubo, indice (card_id, cube_id) per i cubi di una carta)
+DEFAULT_CUBE_ID = 1  # il cubo dei db creati prima dei cubi multipli: non si può eliminare
+DEFAULT_CUBE_NAME = "Main cube"
+
+CREATE_CUBES_SQL = (
+    '''
+    CREATE TABLE IF NOT EXISTS cubes (
+        cube_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS cube_cards (
+        cube_id INTEGER NOT NULL,
+        card_id TEXT NOT NULL,
+        PRIMARY KEY (cube_id, card_id)
+    ) WITHOUT ROWID
+    ''',
+    # eliminando una carta o un cubo spariscono anche le sue righe in cube_cards
+    '''
+    CREATE TRIGGER IF NOT EXISTS cards_cubes_ad AFTER DELETE ON cards BEGIN
+        DELETE FROM cube_cards WHERE card_id = old.unique_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cubes_ad AFTER DELETE ON cubes BEGIN
+        DELETE FROM cube_cards WHERE cube_id = old.cube_id;
+    END
+    ''',
+)
+
+# indici della vecchia colonna cards.in_cube, eliminati con la colonna (vedi ensure_cubes)
+IN_CUBE_INDEXES = ("idx_cards_in_cube", "idx_cards_cube_name", "idx_cards_type_norm",
+                   "idx_cards_color_norm", "idx_cards_ink_mask")
+
+# tabelle dei tornei (prima create da CubeManager.setup_tournaments_table)
+CREATE_TOURNAMENTS_SQL = (
+    f'''
+    CREATE TABLE IF NOT EXISTS tournaments (
+        tournament_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        winner_name TEXT NOT NULL,
+        colors TEXT NOT NULL,
+        tournament_date DATE NOT NULL,
+        notes TEXT,
+        cube_id INTEGER NOT NULL DEFAULT {DEFAULT_CUBE_ID}
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS tournament_decks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tournament_id INTEGER NOT NULL,
+        card_unique_id TEXT NOT NULL,
+        FOREIGN KEY (tournament_id) REFERENCES tournaments(tournament_id),
+        FOREIGN KEY (card_unique_id) REFERENCES cards(unique_id)
+    )
+    ''',
+)
+
+# versioni dei dati (le usa querycache per sapere se i risultati in memoria sono ancora validi):
+# 'version' cresce a ogni modifica di qualunque cubo, dei tornei o delle carte;
+# ogni cubo ha poi la sua in cubes.version, che cresce quando cambiano le sue carte o i suoi tornei
+# (e per tutti i cubi quando l'ingest cambia le carte)
+CREATE_META_SQL = '''
+    CREATE TABLE IF NOT EXISTS cube_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+'''
+
+# indici gestiti: nome -> definizione (vedi explain_queries.py per controllare che vengano usati)
+INDEXES = {
+    # cubi di una carta (le carte di un cubo usano la primary key (cube_id, card_id))
+    "idx_cube_cards_card": "ON cube_cards(card_id, cube_id)",
+    # filtri per tipo / colore normalizzati
+    "idx_cards_type_lower": "ON cards(LOWER(type))",
+    "idx_cards_color_lower": "ON cards(LOWER(color))",
+    # colonne bitmask (colori, parole chiave, classificazioni)
+    "idx_cards_ink": "ON cards(ink_mask)",
+    "idx_cards_keyword_mask": "ON cards(keyword_mask) WHERE keyword_mask != 0",
+    "idx_cards_class_mask": "ON cards(class_mask) WHERE class_mask != 0",
+    # ordinamenti del browser delle carte (paginazione keyset: l'ultimo campo è sempre unique_id)
+    "idx_cards_name_id": "ON cards(name, unique_id)",
+    "idx_cards_cost_name_id": "ON cards(COALESCE(cost, -1), name, unique_id)",
+    # tabelle normalizzate, nell'altro verso rispetto alla primary key (card_id, valore)
+    "idx_card_colors_color": "ON card_colors(color, card_id)",
+    "idx_card_classifications_class": "ON card_classifications(classification, card_id)",
+    # join dei mazzi dei tornei
+    "idx_tournament_decks_tournament": "ON tournament_decks(tournament_id)",
+    "idx_tournament_decks_card": "ON tournament_decks(card_unique_id)",
+    "idx_tournaments_date": "ON tournaments(tournament_date)",
+    # tornei di un cubo, dal più recente
+    "idx_tournaments_cube": "ON tournaments(cube_id, tournament_date)",
+}
+
+# indice full-text (FTS5, external content su cards: il testo non viene duplicato, i rowid sono card_key)
+FTS_COLUMNS = ("unique_id", "name", "body_text", "abilities", "classifications")
+
+CREATE_FTS_SQL = f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+        {", ".join(FTS_COLUMNS)},
+        content='cards',
+        content_rowid='card_key',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+'''
+
+_fts_cols = ", ".join(FTS_COLUMNS)
+_new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# trigger che tengono cards_fts allineato a cards (l'update scatta solo sulle colonne indicizzate,
+# quindi aggiungere/togliere una carta dal cubo non tocca l'indice)
+FTS_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS cards_fts_ai AFTER INSERT ON cards BEGIN
+            INSERT INTO cards_fts(rowid, {_fts_cols}) VALUES (new.card_key, {_new_cols});
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS cards_fts_ad AFTER DELETE ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {_fts_cols}) VALUES ('delete', old.card_key, {_old_cols});
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS cards_fts_au AFTER UPDATE OF {_fts_cols} ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, {_fts_cols}) VALUES ('delete', old.card_key, {_old_cols});
+            INSERT INTO cards_fts(rowid, {_fts_cols}) VALUES (new.card_key, {_new_cols});
+        END''',
+)
+
+
+def table_exists(conn, name):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def ensure_fts(conn):
+    """Crea cards_fts e i trigger; al primo avvio indicizza le carte già presenti.
+
+    Ritorna False se questa build di sqlite non ha FTS5.
+    """
+    existed = table_exists(conn, "cards_fts")
+    try:
+        conn.execute(CREATE_FTS_SQL)
+    except sqlite3.OperationalError as e:
+        log.warning("⚠️ FTS5 non disponibile, ricerca con LIKE: %s", e)
+        return False
+    for trigger in FTS_TRIGGERS:
+        conn.execute(trigger)
+    if not existed:
+        conn.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+        log.info("✅ Indice full-text cards_fts creato")
+    return True
+
+
+def drop_fts_triggers(conn):
+    """Sospende l'aggiornamento riga per riga dell'indice (per i caricamenti massivi)"""
+    for name in ("cards_fts_ai", "cards_fts_ad", "cards_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_fts(conn):
+    """Ricostruisce cards_fts da zero e ripristina i trigger"""
+    conn.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+    for trigger in FTS_TRIGGERS:
+        conn.execute(trigger)
+
+
+def split_list(text):
+    #"Storyborn, Ally" / "Amber/Steel" -> ['Storyborn', 'Ally']
+    #(i db creati dal vecchio main.py hanno valori tra virgolette e 'NaN' al posto dei vuoti)
+    if text is None or text == "NaN":
+        return []
+    parts = (p.strip().strip('"').strip("'").strip() for p in re.split(r"[,/]", str(text)))
+    return [p for p in parts if p]
+
+
+def ink_mask(color):
+    """Bitmask dei colori di inchiostro: accetta "Amber, Steel" o una lista di colori"""
+    names = color if isinstance(color, (list, tuple)) else split_list(color)
+    mask = 0
+    for name in names:
+        for bit, ink in enumerate(INK_COLORS):
+            if name.lower() == ink.lower():
+                mask |= 1 << bit
+    return mask
+
+
+def keyword_mask(abilities):
+    """Bitmask delle parole chiave presenti nel testo delle abilities (stesso criterio di LIKE '%kw%')"""
+    text = str(abilities or "").lower()
+    mask = 0
+    if text:
+        for bit, keyword in enumerate(KEYWORDS):
+            if keyword.lower() in text:
+                mask |= 1 << bit
+    return mask
+
+
+def class_mask(classifications):
+    """Bitmask delle classificazioni note; quelle sconosciute vengono ignorate"""
+    names = classifications if isinstance(classifications, (list, tuple)) else split_list(classifications)
+    mask = 0
+    for name in names:
+        if name in CLASSIFICATIONS:
+            mask |= 1 << CLASSIFICATIONS.index(name)
+    return mask
+
+
+def mask_names(mask, names):
+    """Nomi corrispondenti ai bit accesi di mask"""
+    return [name for bit, name in enumerate(names) if mask >> bit & 1]
+
+
+def card_masks(color, abilities, classifications):
+    """(ink_mask, keyword_mask, class_mask) di una carta"""
+    return ink_mask(color), keyword_mask(abilities), class_mask(classifications)
+
+
+def ink_masks_overlapping(mask):
+    """Tutti i valori possibili di ink_mask che hanno almeno un colore in comune con mask.
+
+    Servono a scrivere "ink_mask IN (...)" invece di "ink_mask & ? != 0", così sqlite usa l'indice.
+    """
+    return [m for m in range(1, 1 << len(INK_COLORS)) if m & mask]
+
+
+def ink_masks_within(mask):
+    """Tutti i valori possibili di ink_mask con soli colori presi da mask (anche 0, nessun colore)"""
+    return [m for m in range(1 << len(INK_COLORS)) if not m & ~mask]
+
+
+def ensure_card_key(conn):
+    """Nei db creati con unique_id TEXT PRIMARY KEY il rowid di cards è implicito e un VACUUM può
+    rinumerarlo, disallineando cards_fts. Ricrea cards con le stesse colonne più card_key (che
+    conserva i rowid attuali) ed elimina cards_fts, che ensure_fts ricrea su card_key.
+    Trigger e indici su cards spariscono con la vecchia tabella: li ricreano i passi successivi."""
+    columns = conn.execute("PRAGMA table_info(cards)").fetchall()
+    names = [col[1] for col in columns]
+    if "card_key" in names:
+        return
+    definitions = ["card_key INTEGER PRIMARY KEY", "unique_id TEXT UNIQUE"] + [
+        f"{name} {decl_type}" + (f" DEFAULT {default}" if default is not None else "")
+        for _, name, decl_type, _, default, _ in columns if name != "unique_id"]
+    conn.execute(f"CREATE TABLE cards_rekey ({', '.join(definitions)})")
+    conn.execute(f"INSERT INTO cards_rekey (card_key, {', '.join(names)}) SELECT rowid, {', '.join(names)} FROM cards")
+    conn.execute("DROP TABLE IF EXISTS cards_fts")
+    conn.execute("DROP TABLE cards")
+    conn.execute("ALTER TABLE cards_rekey RENAME TO cards")
+    log.info("✅ Tabella cards ricreata con la chiave intera card_key")
+
+
+def ensure_mask_columns(conn):
+    """Aggiunge le colonne bitmask ai db creati prima della loro introduzione e le calcola"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(cards)")}
+    missing = [col for col in MASK_COLUMNS if col not in existing]
+    if not missing:
+        return
+    for col in missing:
+        conn.execute(f"ALTER TABLE cards ADD COLUMN {col} INTEGER DEFAULT 0")
+    rows = conn.execute("SELECT rowid, color, abilities, classifications FROM cards").fetchall()
+    conn.executemany(
+        "UPDATE cards SET ink_mask = ?, keyword_mask = ?, class_mask = ? WHERE rowid = ?",
+        [card_masks(color, abilities, classifications) + (rowid,)
+         for rowid, color, abilities, classifications in rows],
+    )
+    log.info("✅ Colonne bitmask calcolate per %d carte", len(rows))
+
+
+def write_card_links(conn, cards):
+    """Riscrive card_colors e card_classifications per le carte date: [(unique_id, color, classifications)]"""
+    ids = [(uid,) for uid, _, _ in cards]
+    conn.executemany("DELETE FROM card_colors WHERE card_id = ?", ids)
+    conn.executemany("DELETE FROM card_classifications WHERE card_id = ?", ids)
+    conn.executemany(
+        "INSERT OR IGNORE INTO card_colors (card_id, color) VALUES (?, ?)",
+        [(uid, color) for uid, colors, _ in cards for color in split_list(colors)],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO card_classifications (card_id, classification) VALUES (?, ?)",
+        [(uid, c) for uid, _, classifications in cards for c in split_list(classifications)],
+    )
+
+
+def ensure_link_tables(conn):
+    """Crea le tabelle normalizzate; al primo avvio le riempie dalle carte già presenti"""
+    existed = table_exists(conn, "card_colors") and table_exists(conn, "card_classifications")
+    for sql in CREATE_LINK_TABLES_SQL:
+        conn.execute(sql)
+    if not existed:
+        rows = conn.execute("SELECT unique_id, color, classifications FROM cards").fetchall()
+        write_card_links(conn, [tuple(r) for r in rows])
+        log.info("✅ Tabelle card_colors / card_classifications riempite per %d carte", len(rows))
+
+
+def ensure_cubes(conn):
+    """Crea cubes e cube_cards (con il cubo di default). Nei db con la vecchia colonna
+    cards.in_cube ne copia il contenuto nel cubo di default e poi elimina colonna e indici."""
+    existed = table_exists(conn, "cubes")
+    for sql in CREATE_CUBES_SQL:
+        conn.execute(sql)
+    if not existed:
+        conn.execute("INSERT INTO cubes (cube_id, name) VALUES (?, ?)", (DEFAULT_CUBE_ID, DEFAULT_CUBE_NAME))
+    elif "version" not in {row[1] for row in conn.execute("PRAGMA table_info(cubes)")}:
+        conn.execute("ALTER TABLE cubes ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    if "cube_id" not in {row[1] for row in conn.execute("PRAGMA table_info(tournaments)")}:
+        conn.execute(f"ALTER TABLE tournaments ADD COLUMN cube_id INTEGER NOT NULL DEFAULT {DEFAULT_CUBE_ID}")
+    if "in_cube" not in {row[1] for row in conn.execute("PRAGMA table_info(cards)")}:
+        return
+    if not existed:
+        copied = conn.execute(
+            "INSERT OR IGNORE INTO cube_cards (cube_id, card_id) SELECT ?, unique_id FROM cards WHERE in_cube = 1",
+            (DEFAULT_CUBE_ID,),
+        ).rowcount
+        log.info("✅ Cubo '%s' creato con le %d carte di in_cube", DEFAULT_CUBE_NAME, copied)
+    for name in IN_CUBE_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("ALTER TABLE cards DROP COLUMN in_cube")
+
+
+def ensure_indexes(conn):
+    """Crea gli indici di INDEXES che mancano e aggiorna le statistiche del planner"""
+    for name, definition in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} {definition}")
+    conn.execute("PRAGMA optimize")
+
+
+def _meta_value(conn, key):
+    row = conn.execute("SELECT value FROM cube_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def _bump_meta(conn, key):
+    return conn.execute(
+        "INSERT INTO cube_meta (key, value) VALUES (?, 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+        (key,),
+    ).fetchone()[0]
+
+
+def cube_version(conn):
+    """Versione corrente dei dati (0 se non è mai stata modificata)"""
+    return _meta_value(conn, "version")
+
+
+def cube_versions(conn, cube_ids):
+    """Versione dei dati di alcuni cubi, una per cubo (None per un cubo che non esiste).
+    Cambia solo con l'ingest o modificando uno di quei cubi"""
+    ids = list(dict.fromkeys(cube_ids))
+    versions = dict(conn.execute(
+        f"SELECT cube_id, version FROM cubes WHERE cube_id IN ({', '.join('?' * len(ids))})", ids))
+    return tuple(versions.get(cube_id) for cube_id in cube_ids)
+
+
+def bump_cube_version(conn, cube_id=None):
+    """Incrementa la versione dei dati (e quella del cubo cube_id, se c'è): va chiamata
+    nella stessa transazione della modifica. Ritorna la nuova versione globale."""
+    if cube_id is not None:
+        conn.execute("UPDATE cubes SET version = version + 1 WHERE cube_id = ?", (cube_id,))
+    return _bump_meta(conn, "version")
+
+
+def bump_card_versions(conn):
+    """L'ingest ha cambiato le carte: cambiano i dati di tutti i cubi, oltre alla versione globale.
+    Ritorna la nuova versione globale."""
+    conn.execute("UPDATE cubes SET version = version + 1")
+    return _bump_meta(conn, "version")
+
+
+def check_sqlite_version():
+    """Solleva sqlite3.NotSupportedError se la libreria sqlite è più vecchia di MIN_SQLITE_VERSION"""
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = ".".join(map(str, MIN_SQLITE_VERSION))
+        raise sqlite3.NotSupportedError(
+            f"SQLite {sqlite3.sqlite_version} troppo vecchio: serve almeno la {required} "
+            f"(aggiorna Python o la libreria sqlite3)")
+
+
+def ensure_schema(conn):
+    """Crea/aggiorna tutte le tabelle. Ritorna un dict con le funzionalità disponibili.
+    Con una libreria sqlite troppo vecchia solleva sqlite3.NotSupportedError prima di toccare il db."""
+    check_sqlite_version()
+    conn.execute(CREATE_CARDS_SQL)
+    ensure_card_key(conn)
+    ensure_mask_columns(conn)
+    ensure_link_tables(conn)
+    for sql in CREATE_TOURNAMENTS_SQL:
+        conn.execute(sql)
+    ensure_cubes(conn)
+    conn.execute(CREATE_META_SQL)
+    conn.execute("DELETE FROM cube_meta WHERE key = 'catalog'")  # versione del vecchio catalogo in memoria
+    ensure_indexes(conn)
+    has_fts = ensure_fts(conn)
+    conn.commit()
+    return {"fts": has_fts}
+
+
+def fts_query(text):
+    """Trasforma il testo dell'utente in una query FTS5 sicura con ricerca per prefisso.
+
+    "mick mou" -> '"mick"* "mou"*' (tutte le parole, ognuna come prefisso).
+    Ritorna None se il testo non contiene parole.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
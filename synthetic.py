@@ -0,0 +1,150 @@
+#synthetic: carte e tornei finti con lo stesso schema di card.json, per benchmark e load test
+#ogni carta finta parte da una carta vera pescata a caso (tipo, costo, colori, statistiche
+#restano coerenti e con le stesse distribuzioni del file) e ne mescola nome ed effetto
+#con quelli di altre carte dello stesso tipo, così le ricerche di testo restano realistiche
+#
+#uso da riga di comando:
+#   python synthetic.py --cards 20000 --tournaments 10000 --db synthetic.db
+
+import argparse
+import io
+import os
+import random
+import sqlite3
+import time
+from contextlib import redirect_stdout
+
+import ingest
+import schema
+
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card.json")
+SET_SIZE = 204  # carte per set, come nei set veri
+DEFAULT_CUBE_SIZE = 360
+DEFAULT_CUBES = 2  # il secondo serve alle operazioni fra cubi (unione, intersezione...)
+DECK_SIZE = (40, 60)  # carte per mazzo (minimo, massimo)
+MAX_COPIES = 4
+DEFAULT_SEED = 0
+
+
+def load_sample(path=SAMPLE_FILE):
+    """Carte vere da cui copiare schema e distribuzioni"""
+    return list(ingest.iter_cards(path))
+
+
+def generate_cards(count, sample=None, seed=DEFAULT_SEED):
+    """Genera count carte con le chiavi di card.json (Unique_ID, Name, Color, Cost...)"""
+    rng = random.Random(seed)
+    sample = sample or load_sample()
+    by_type = {}
+    for card in sample:
+        by_type.setdefault(card.get("Type"), []).append(card)
+    for i in range(count):
+        base = rng.choice(sample)
+        same_type = by_type[base.get("Type")]
+        text = rng.choice(same_type)
+        title = rng.choice(sample)["Name"].split(" - ")[0]
+        subtitle = rng.choice(same_type)["Name"].split(" - ")[-1]
+        set_num, card_num = divmod(i, SET_SIZE)
+        card = dict(base)
+        card.update({
+            "Unique_ID": f"SYN{set_num:03d}-{card_num + 1:03d}",
+            "Name": f"{title} - {subtitle}" if title != subtitle else title,
+            "Set_ID": f"SYN{set_num:03d}",
+            "Set_Num": set_num + 1,
+            "Set_Name": f"Synthetic {set_num + 1}",
+            "Card_Num": card_num + 1,
+        })
+        for key in ("Body_Text", "Abilities", "Flavor_Text"):
+            card.pop(key, None)
+            if key in text:
+                card[key] = text[key]
+        yield card
+
+
+def generate_tournaments(conn, count, seed=DEFAULT_SEED, cube_id=schema.DEFAULT_CUBE_ID):
+    """Inserisce count tornei con mazzi presi dal cubo (1-2 inchiostri, fino a 4 copie per carta)"""
+    rng = random.Random(seed)
+    cube = {}
+    for uid, mask in conn.execute(
+            "SELECT c.unique_id, c.ink_mask FROM cube_cards cc JOIN cards c ON c.unique_id = cc.card_id "
+            "WHERE cc.cube_id = ?", (cube_id,)):
+        cube.setdefault(mask or 0, []).append(uid)
+    players = [f"Player {n}" for n in range(1, 201)]
+    ink_sets = [(a,) for a in schema.INK_COLORS] + [
+        (a, b) for i, a in enumerate(schema.INK_COLORS) for b in schema.INK_COLORS[i + 1:]]
+    conn.execute("BEGIN")
+    for sql in schema.CREATE_TOURNAMENTS_SQL:
+        conn.execute(sql)
+    for n in range(count):
+        inks = rng.choice(ink_sets)
+        allowed = schema.ink_mask(list(inks))
+        pool = [uid for mask, ids in cube.items() if mask and mask & ~allowed == 0 for uid in ids]
+        if not pool:
+            continue
+        deck = [uid for uid in rng.sample(pool, min(len(pool), DECK_SIZE[1] // 2))
+                for _ in range(rng.randint(1, MAX_COPIES))][:rng.randint(*DECK_SIZE)]
+        date = f"{2023 + n % 3}-{n % 12 + 1:02d}-{n % 28 + 1:02d}"
+        tournament_id = conn.execute(
+            "INSERT INTO tournaments (winner_name, colors, tournament_date, cube_id) VALUES (?, ?, ?, ?)",
+            (rng.choice(players), "/".join(inks), date, cube_id)).lastrowid
+        conn.executemany("INSERT INTO tournament_decks (tournament_id, card_unique_id) VALUES (?, ?)",
+                         [(tournament_id, uid) for uid in deck])
+    schema.ensure_indexes(conn)
+    schema.bump_cube_version(conn, cube_id)
+    conn.commit()
+
+
+def fill_cube(conn, size=DEFAULT_CUBE_SIZE, seed=DEFAULT_SEED, cube_id=schema.DEFAULT_CUBE_ID):
+    """Mette nel cubo cube_id size carte a caso (le altre ne escono)"""
+    rng = random.Random(seed)
+    ids = [row[0] for row in conn.execute("SELECT unique_id FROM cards")]
+    conn.execute("DELETE FROM cube_cards WHERE cube_id = ?", (cube_id,))
+    conn.executemany("INSERT INTO cube_cards (cube_id, card_id) VALUES (?, ?)",
+                     [(cube_id, uid) for uid in rng.sample(ids, min(size, len(ids)))])
+    schema.bump_cube_version(conn, cube_id)
+    conn.commit()
+
+
+def add_cubes(conn, count, size=DEFAULT_CUBE_SIZE, seed=DEFAULT_SEED):
+    """Crea count cubi in più ("Synthetic cube 2"...), ognuno con size carte a caso"""
+    for n in range(2, count + 2):
+        cube_id = conn.execute("INSERT INTO cubes (name) VALUES (?)", (f"Synthetic cube {n}",)).lastrowid
+        fill_cube(conn, size, seed + n, cube_id)
+
+
+def build_database(path, cards, tournaments=0, cube_size=DEFAULT_CUBE_SIZE, seed=DEFAULT_SEED, sample=None,
+                   cubes=DEFAULT_CUBES):
+    """Crea (da zero) un db con carte sintetiche, cubes cubi di cube_size carte e i tornei
+    (tutti nel primo cubo). Ritorna i secondi impiegati"""
+    start = time.perf_counter()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    with redirect_stdout(io.StringIO()):  # l'ingest stampa l'avanzamento di ogni blocco
+        ingest.bulk_ingest(conn, generate_cards(cards, sample, seed))
+    fill_cube(conn, cube_size, seed)
+    add_cubes(conn, cubes - 1, cube_size, seed)
+    if tournaments:
+        generate_tournaments(conn, tournaments, seed)
+    conn.execute("ANALYZE")
+    conn.close()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crea un database di carte e tornei sintetici")
+    parser.add_argument("--cards", type=int, default=20000, help="carte da generare (default: %(default)s)")
+    parser.add_argument("--tournaments", type=int, default=0, help="tornei da generare (default: %(default)s)")
+    parser.add_argument("--cube-size", type=int, default=DEFAULT_CUBE_SIZE,
+                        help="carte in ogni cubo (default: %(default)s)")
+    parser.add_argument("--cubes", type=int, default=DEFAULT_CUBES, help="cubi da creare (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--db", default="synthetic.db", help="database da creare (default: %(default)s)")
+    args = parser.parse_args()
+
+    print(f"🧪 Generazione di {args.cards} carte e {args.tournaments} tornei in {args.db}...")
+    elapsed = build_database(args.db, args.cards, args.tournaments, args.cube_size, args.seed,
+                             cubes=args.cubes)
+    print(f"✅ Database creato in {elapsed:.1f}s")
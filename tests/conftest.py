@@ -0,0 +1,42 @@
+#fixture condivise dei test: i moduli dell'app stanno nella cartella principale del repo
+
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import synthetic  # dopo il sys.path
+from cubeManager import CubeManager
+
+
+CARDS = 300  # abbastanza per avere più pagine con tutti i filtri, ma il db si crea in un attimo
+CUBE_SIZE = 120
+
+
+@pytest.fixture(scope="session")
+def synthetic_db(tmp_path_factory):
+    """Db sintetico creato una volta per tutti i test: 2 cubi sovrapposti e qualche torneo"""
+    path = str(tmp_path_factory.mktemp("db") / "synthetic.db")
+    synthetic.build_database(path, CARDS, tournaments=20, cube_size=CUBE_SIZE)
+    return path
+
+
+@pytest.fixture
+def db_path(synthetic_db, tmp_path):
+    """Copia del db sintetico per un test che lo modifica"""
+    path = str(tmp_path / "lorcana_cards.db")
+    shutil.copyfile(synthetic_db, path)
+    return path
+
+
+@pytest.fixture
+def manager(db_path):
+    manager = CubeManager(db_path)
+    assert manager.connect()
+    yield manager
+    manager.close()
@@ -0,0 +1,204 @@
+#test di CubeManager.browse / browse_count: paginazione keyset confrontata con un riferimento in Python
+#(filtri e ordinamenti rifatti a mano su tutte le carte), in avanti, all'indietro e da BROWSE_END
+
+import shutil
+import sqlite3
+
+import pytest
+
+import schema
+from cubeManager import BROWSE_END, DEFAULT_CUBE_ID, CubeManager
+
+
+FILTERS = [
+    {},
+    {"in_cube": 1},
+    {"in_cube": 0, "colors": ["Ruby"]},
+    {"colors": ["Amber", "Steel"], "within": True, "in_cube": 1},
+    {"types": ["Character", "Item"], "inkable": 0},
+    {"text": "mickey"},
+    {"text": "draw", "in_cube": 0},
+    {"types": ["Location"], "colors": ["Sapphire"], "within": True, "inkable": 1, "in_cube": 1},
+]
+SORTS = ["set", "name", "cost"]
+LIMITS = [7, 10, 1000]  # ultima pagina più corta; pagine tutte piene (300 e 120 carte); una pagina sola
+
+
+@pytest.fixture(scope="module")
+def browser(synthetic_db, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("browse") / "lorcana_cards.db")
+    shutil.copyfile(synthetic_db, path)
+    manager = CubeManager(path, cache_size=0)
+    assert manager.connect()
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(scope="module")
+def all_cards(browser):
+    conn = browser.conn
+    cube = {row[0] for row in conn.execute("SELECT card_id FROM cube_cards WHERE cube_id = ?",
+                                           (DEFAULT_CUBE_ID,))}
+    cards = []
+    for row in conn.execute("SELECT card_key, unique_id, name, type, cost, inkable, ink_mask FROM cards"):
+        card = dict(row)
+        card["in_cube"] = int(card["unique_id"] in cube)
+        cards.append(card)
+    return cards
+
+
+def reference(conn, cards, filters, sort):
+    """unique_id delle carte che passano i filtri, nell'ordine di sort"""
+    text = filters.get("text")
+    matches = None
+    if text:
+        matches = {row[0] for row in conn.execute("SELECT rowid FROM cards_fts WHERE cards_fts MATCH ?",
+                                                  (schema.fts_query(text),))}
+    selected = schema.ink_mask(filters.get("colors") or [])
+    types = {t.lower() for t in filters.get("types") or []}
+
+    def passes(card):
+        if matches is not None and card["card_key"] not in matches:
+            return False
+        if selected:
+            mask = card["ink_mask"]
+            if mask is None:
+                return False
+            if filters.get("within") and mask & ~selected:
+                return False
+            if not filters.get("within") and not mask & selected:
+                return False
+        if types and (card["type"] or "").lower() not in types:
+            return False
+        if filters.get("inkable") is not None and card["inkable"] != filters["inkable"]:
+            return False
+        if filters.get("in_cube") is not None and card["in_cube"] != filters["in_cube"]:
+            return False
+        return True
+
+    keys = {
+        "set": lambda c: c["card_key"],
+        "name": lambda c: (c["name"], c["unique_id"]),
+        "cost": lambda c: (-1 if c["cost"] is None else c["cost"], c["name"], c["unique_id"]),
+    }
+    return [card["unique_id"] for card in sorted(filter(passes, cards), key=keys[sort])]
+
+
+def ids(page):
+    return [card["unique_id"] for card in page["cards"]]
+
+
+@pytest.mark.parametrize("limit", LIMITS)
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_forward(browser, all_cards, filters, sort, limit):
+    expected = reference(browser.conn, all_cards, filters, sort)
+    assert browser.browse_count(filters) == len(expected)
+
+    pages, key = [], None
+    while True:
+        page = browser.browse(filters, sort, after_key=key, limit=limit)
+        assert page["total"] == len(expected)
+        assert (page["prev_key"] is None) == (not pages)
+        pages.append(page)
+        key = page["next_key"]
+        if key is None:
+            break
+        assert len(pages) <= len(expected)
+
+    assert [uid for page in pages for uid in ids(page)] == expected
+    # tutte piene tranne l'ultima, che ha il resto (una pagina vuota solo se non c'è niente)
+    assert all(len(page["cards"]) == limit for page in pages[:-1])
+    remainder = (len(expected) - 1) % limit + 1 if expected else 0
+    assert len(pages[-1]["cards"]) == remainder
+
+    # dalla pagina dopo, prev_key riporta esattamente alla pagina prima
+    for before, after in zip(pages, pages[1:]):
+        back = browser.browse(filters, sort, before_key=after["prev_key"], limit=limit)
+        assert ids(back) == ids(before)
+        assert back["next_key"] == before["next_key"]
+        assert back["prev_key"] == before["prev_key"]
+
+
+@pytest.mark.parametrize("limit", LIMITS)
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_backward_from_end(browser, all_cards, filters, sort, limit):
+    expected = reference(browser.conn, all_cards, filters, sort)
+
+    pages, key = [], BROWSE_END
+    while True:
+        page = browser.browse(filters, sort, before_key=key, limit=limit)
+        assert (page["next_key"] is None) == (not pages)
+        pages.append(page)
+        key = page["prev_key"]
+        if key is None:
+            break
+        assert len(pages) <= len(expected)
+
+    pages.reverse()
+    assert [uid for page in pages for uid in ids(page)] == expected
+    # dalla fine le pagine sono piene e il resto finisce nella prima
+    assert all(len(page["cards"]) == limit for page in pages[1:])
+    assert ids(pages[-1]) == expected[-limit:]
+
+
+def test_no_results(browser):
+    filters = {"text": "zzzznotacard"}
+    assert browser.browse_count(filters) == 0
+    for page in (browser.browse(filters), browser.browse(filters, before_key=BROWSE_END)):
+        assert page == {"cards": [], "total": 0, "prev_key": None, "next_key": None}
+
+
+def test_in_cube_field_follows_cube_id(browser):
+    cube_2 = {row[0] for row in browser.conn.execute("SELECT card_id FROM cube_cards WHERE cube_id = 2")}
+    page = browser.browse({}, "name", limit=1000, cube_id=2)
+    assert {card["unique_id"] for card in page["cards"] if card["in_cube"]} == cube_2
+    assert browser.browse_count({"in_cube": 1}, cube_id=2) == len(cube_2)
+
+
+def implicit_rowid_database(path):
+    """Db com'era prima di card_key: unique_id TEXT PRIMARY KEY, rowid implicito con dei buchi,
+    cards_fts su content_rowid='rowid'. Ritorna gli unique_id in ordine di rowid"""
+    conn = sqlite3.connect(path)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(cards)") if row[1] != "card_key"]
+    others = ", ".join(col for col in columns if col != "unique_id")
+    conn.executescript(f"""
+        DROP TABLE cards_fts;
+        CREATE TABLE cards_old (unique_id TEXT PRIMARY KEY, {others});
+        INSERT INTO cards_old ({', '.join(columns)}) SELECT {', '.join(columns)} FROM cards ORDER BY card_key;
+        DROP TABLE cards;
+        ALTER TABLE cards_old RENAME TO cards;
+        DELETE FROM cards WHERE rowid % 4 = 0;
+        DELETE FROM cube_cards WHERE card_id NOT IN (SELECT unique_id FROM cards);
+        CREATE VIRTUAL TABLE cards_fts USING fts5({', '.join(schema.FTS_COLUMNS)},
+            content='cards', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2');
+        INSERT INTO cards_fts(cards_fts) VALUES ('rebuild');
+    """)
+    order = [row[0] for row in conn.execute("SELECT unique_id FROM cards ORDER BY rowid")]
+    conn.close()
+    return order
+
+
+def test_card_key_migration_survives_vacuum(db_path):
+    order = implicit_rowid_database(db_path)
+    manager = CubeManager(db_path, cache_size=0)
+    assert manager.connect()
+    cube = {row[0] for row in manager.conn.execute("SELECT card_id FROM cube_cards WHERE cube_id = ?",
+                                                   (DEFAULT_CUBE_ID,))}
+    manager.close()
+
+    conn = sqlite3.connect(db_path)
+    assert "content_rowid='card_key'" in conn.execute("SELECT sql FROM sqlite_master WHERE name = 'cards_fts'").fetchone()[0]
+    conn.execute("VACUUM")
+    conn.execute("INSERT INTO cards_fts(cards_fts, rank) VALUES ('integrity-check', 1)")
+    conn.close()
+
+    manager = CubeManager(db_path, cache_size=0)
+    assert manager.connect()
+    assert ids(manager.browse({}, "set", limit=1000)) == order
+    assert {uid for uid in order if uid in cube} == set(ids(manager.browse({"in_cube": 1}, limit=1000)))
+    expected = [uid for uid, in manager.conn.execute(
+        "SELECT unique_id FROM cards WHERE LOWER(name) LIKE '%mickey%'")]
+    assert expected and sorted(card["unique_id"] for card in manager.search_cards("mickey")) == sorted(expected)
+    manager.close()
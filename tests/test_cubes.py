@@ -0,0 +1,197 @@
+#test dei cubi multipli: operazioni fra cubi in sqlite, migrazione da cards.in_cube,
+#cache legata alla versione di ogni cubo
+
+import sqlite3
+
+import pytest
+
+import ingest
+import schema
+import synthetic
+from cubeManager import DEFAULT_CUBE_ID, CubeManager
+
+
+def members(manager, cube_id):
+    return {row[0] for row in manager.conn.execute("SELECT card_id FROM cube_cards WHERE cube_id = ?",
+                                                   (cube_id,))}
+
+
+def ids(cards):
+    return {card["unique_id"] for card in cards}
+
+
+@pytest.fixture
+def three_cubes(manager):
+    """I due cubi del db sintetico più un terzo che li tocca entrambi"""
+    first, second = sorted(members(manager, DEFAULT_CUBE_ID)), sorted(members(manager, 2))
+    third = manager.create_cube("Third", first[:15] + second[:15] + first[-5:])
+    assert third is not None
+    return DEFAULT_CUBE_ID, 2, third
+
+
+def test_set_operations_match_python_sets(manager, three_cubes):
+    a, b, c = (members(manager, cube_id) for cube_id in three_cubes)
+    assert a & b and a - b and b - a  # cubi sovrapposti, altrimenti il test non dice niente
+
+    assert ids(manager.cube_union([1, 2])) == a | b
+    assert ids(manager.cube_union(list(three_cubes))) == a | b | c
+    assert ids(manager.cube_intersection([1, 2])) == a & b
+    assert ids(manager.cube_intersection(list(three_cubes))) == a & b & c
+    assert ids(manager.cube_difference(1, [2])) == a - b
+    assert ids(manager.cube_difference(2, [1])) == b - a
+    assert ids(manager.cube_difference(1, [2, three_cubes[2]])) == a - b - c
+    assert ids(manager.cube_union([1])) == ids(manager.cube_intersection([1])) == a
+    assert manager.cube_union([]) == [] and manager.cube_difference(1, [1]) == []
+
+    result = manager.cube_union([1, 2])
+    assert [card["name"] for card in result] == sorted(card["name"] for card in result)
+    assert len(result) == len(ids(result))  # nessun doppione
+
+
+def test_set_operations_follow_changes(manager, three_cubes):
+    only_second = sorted(members(manager, 2) - members(manager, 1))
+    before = manager.cube_intersection([1, 2])
+    assert manager.add_cube_many(only_second[:3])
+    assert ids(manager.cube_intersection([1, 2])) == ids(before) | set(only_second[:3])
+    assert ids(manager.cube_difference(2, [1])) == set(only_second[3:])
+
+
+def test_cube_cache_is_per_cube(manager, three_cubes):
+    first, second, third = three_cubes
+    outside = sorted(members(manager, second) - members(manager, first))[0]
+    for cube_id in three_cubes:
+        manager.get_cube_count(cube_id=cube_id)
+        manager.compute_all_stats(cube_id=cube_id)
+    hits = manager.cache_stats()["hits"]
+
+    assert manager.add_cube(outside, cube_id=first)
+    # gli altri cubi restano in cache, il cubo modificato e le letture fra cubi no
+    for cube_id in (second, third):
+        manager.get_cube_count(cube_id=cube_id)
+        manager.compute_all_stats(cube_id=cube_id)
+    assert manager.cache_stats()["hits"] == hits + 4
+    assert manager.get_cube_count(cube_id=first) == len(members(manager, first))
+    assert manager.cache_stats()["hits"] == hits + 4
+    assert outside in ids(manager.cube_intersection([first, second]))
+    assert {cube["cube_id"]: cube["cards"] for cube in manager.list_cubes()}[first] == len(members(manager, first))
+
+    # un torneo invalida le letture del suo cubo
+    before = manager.get_all_tournaments(cube_id=second)
+    assert manager.add_tournament("Test", "Amber", "2024-01-01", [outside], cube_id=second)
+    assert len(manager.get_all_tournaments(cube_id=second)) == len(before) + 1
+
+
+def test_app_cached_functions_use_cube_version(manager, three_cubes):
+    calls = []
+
+    @manager.cached
+    def figures(cube_id):
+        calls.append(cube_id)
+        return manager.get_cube_count(cube_id=cube_id)
+
+    first, second, _ = three_cubes
+    figures(first), figures(second)
+    manager.remove_cube(sorted(members(manager, first))[0], cube_id=first)
+    figures(first), figures(second)
+    assert calls == [first, second, first]
+
+
+def old_database(path):
+    """Db com'era prima dei cubi multipli: cards.in_cube con il suo indice, tornei senza cube_id"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        DROP TRIGGER cards_cubes_ad;
+        DROP TRIGGER cubes_ad;
+        DROP TABLE cube_cards;
+        DROP TABLE cubes;
+        DROP INDEX idx_tournaments_cube;
+        ALTER TABLE tournaments DROP COLUMN cube_id;
+        ALTER TABLE cards ADD COLUMN in_cube INTEGER DEFAULT 0;
+        CREATE INDEX idx_cards_in_cube ON cards(in_cube);
+        UPDATE cards SET in_cube = 1 WHERE rowid % 3 = 0;
+    """)
+    old_cube = {row[0] for row in conn.execute("SELECT unique_id FROM cards WHERE in_cube = 1")}
+    tournaments = conn.execute("SELECT COUNT(*) FROM tournaments").fetchone()[0]
+    conn.commit()
+    conn.close()
+    return old_cube, tournaments
+
+
+def test_migration_from_in_cube(db_path):
+    old_cube, tournaments = old_database(db_path)
+    for _ in range(2):  # la seconda apertura non deve cambiare niente
+        manager = CubeManager(db_path)
+        assert manager.connect()
+        conn = manager.conn
+        assert [(c["cube_id"], c["name"], c["cards"]) for c in manager.list_cubes()] == [
+            (DEFAULT_CUBE_ID, schema.DEFAULT_CUBE_NAME, len(old_cube))]
+        assert members(manager, DEFAULT_CUBE_ID) == old_cube
+        assert "in_cube" not in {row[1] for row in conn.execute("PRAGMA table_info(cards)")}
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_cards_in_cube'").fetchone()
+        assert conn.execute("SELECT COUNT(*) FROM tournaments WHERE cube_id = ?",
+                            (DEFAULT_CUBE_ID,)).fetchone()[0] == tournaments
+        assert len(manager.get_all_tournaments()) == tournaments
+        assert manager.browse_count({"in_cube": 1}) == len(old_cube)
+        manager.close()
+
+
+def test_migration_adds_cube_versions(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE cubes DROP COLUMN version")
+    conn.commit()
+    conn.close()
+    manager = CubeManager(db_path)
+    assert manager.connect()
+    assert manager.data_version([1, 2]) == manager.data_version([1, 2])
+    card = sorted(members(manager, 2) - members(manager, 1))[0]
+    before = manager.data_version([1])
+    assert manager.add_cube(card)
+    assert manager.data_version([1]) != before
+    manager.close()
+
+
+def test_ingest_bumps_every_cube(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO cube_meta (key, value) VALUES ('catalog', 7)")  # lasciata dal vecchio catalogo
+    conn.commit()
+    conn.close()
+    manager = CubeManager(db_path)
+    assert manager.connect()
+    assert not manager.conn.execute("SELECT 1 FROM cube_meta WHERE key = 'catalog'").fetchone()
+    before = manager.data_version([1, 2])
+
+    # come main.py --sync mentre l'app è aperta
+    conn = sqlite3.connect(db_path)
+    card = dict(next(synthetic.generate_cards(1)), Name="Renamed - Card")
+    assert ingest.delta_sync(conn, [card])["changed"] == [card["Unique_ID"]]
+    conn.close()
+    assert manager.data_version([1, 2]) == tuple(version + 1 for version in before)
+    manager.close()
+
+
+class CountingConnection(sqlite3.Connection):
+    commits = 0
+
+    def commit(self):
+        self.commits += 1
+        super().commit()
+
+
+def test_create_cube_is_one_transaction_on_fixed_conn(db_path, monkeypatch):
+    manager = CubeManager(db_path)
+    assert manager.connect()
+    manager.conn = sqlite3.connect(db_path, factory=CountingConnection)
+    manager.conn.row_factory = sqlite3.Row
+    cards = sorted(members(manager, DEFAULT_CUBE_ID))[:5]
+
+    cube_id = manager.create_cube("Fixed", cards)
+    assert cube_id is not None
+    assert members(manager, cube_id) == set(cards)
+    assert manager.conn.commits == 1  # creazione e riempimento insieme, un solo commit
+
+    def broken_fill(*args):
+        raise sqlite3.IntegrityError("riempimento fallito")
+    monkeypatch.setattr(manager, "_load_cube_batch", broken_fill)
+    assert manager.create_cube("Half", cards) is None
+    assert not manager.conn.execute("SELECT 1 FROM cubes WHERE name = 'Half'").fetchone()
+    manager.close()
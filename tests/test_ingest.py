@@ -0,0 +1,81 @@
+#test di ingest: iter_json_array (elementi spezzati fra i chunk e separatori) e delta_sync
+
+import io
+import json
+import sqlite3
+
+import pytest
+
+import ingest
+import schema
+from ingest import iter_json_array
+
+
+VALID = [
+    "[]",
+    " [ ] ",
+    "[1,23456,7]",
+    "[123]",
+    "[1.25,2e+5,-1.5e10]",
+    '[ {"a": [1, 2]} , "x,y", true,null ]',
+    '\ufeff[{"Name": "Elsa - Snow Queen", "Cost": 8}]',
+]
+
+INVALID = ["[1 2]", "[,,1]", "[1,,2]", "[1,]", "[,]", "[1", "1", ""]
+
+
+@pytest.mark.parametrize("text", VALID)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 64])
+def test_same_as_json_loads(text, chunk_size):
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == json.loads(text.lstrip("\ufeff"))
+
+
+@pytest.mark.parametrize("text", INVALID)
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_malformed_array(text, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+def cards(count=10, **changes):
+    result = [{"Unique_ID": f"TST-{i:03d}", "Name": f"Card {i}", "Type": "Character", "Color": "Amber",
+               "Classifications": "Storyborn, Hero", "Abilities": "Evasive, Boost 2" if i % 2 else "Rush",
+               "Date_Modified": "2024-01-01"} for i in range(count)]
+    for card in result:
+        card.update(changes.get(card["Unique_ID"], {}))
+    return result
+
+
+@pytest.mark.parametrize("journal_mode", ["delete", "wal"])
+def test_delta_sync_restores_pragmas(tmp_path, journal_mode):
+    conn = sqlite3.connect(tmp_path / "sync.db")
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute("PRAGMA synchronous = FULL")
+    result = ingest.delta_sync(conn, cards())
+    assert len(result["new"]) == 10 and result["unchanged"] == 0
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+
+    result = ingest.delta_sync(conn, cards(**{"TST-003": {"Name": "Renamed"}}))
+    assert result["new"] == [] and result["changed"] == ["TST-003"]
+    assert result["unchanged"] == 9 and result["masks"] == 0
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    conn.close()
+
+
+def test_delta_sync_new_keyword_only_recomputes_masks(tmp_path, monkeypatch):
+    conn = sqlite3.connect(tmp_path / "sync.db")
+    ingest.delta_sync(conn, cards())
+    hashes = conn.execute("SELECT unique_id, content_hash FROM sync_ledger ORDER BY unique_id").fetchall()
+
+    monkeypatch.setattr(schema, "KEYWORDS", schema.KEYWORDS + ["Boost"])
+    result = ingest.delta_sync(conn, cards())
+    assert result["new"] == result["changed"] == [] and result["unchanged"] == 10
+    assert result["masks"] == 5
+    boost = 1 << schema.KEYWORDS.index("Boost")
+    assert [uid for uid, mask in conn.execute("SELECT unique_id, keyword_mask FROM cards ORDER BY unique_id")
+            if mask & boost] == [f"TST-{i:03d}" for i in range(1, 10, 2)]
+    assert conn.execute("SELECT unique_id, content_hash FROM sync_ledger ORDER BY unique_id").fetchall() == hashes
+
+    assert ingest.delta_sync(conn, cards())["masks"] == 0
+    conn.close()
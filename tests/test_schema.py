@@ -0,0 +1,23 @@
+#test di schema: versione minima di sqlite controllata all'apertura del db
+
+import sqlite3
+
+import pytest
+
+import schema
+from cubeManager import CubeManager
+
+
+def test_old_sqlite_is_refused(db_path, monkeypatch):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", (3, 31, 1))
+    monkeypatch.setattr(sqlite3, "sqlite_version", "3.31.1")
+    with pytest.raises(sqlite3.NotSupportedError, match="3.31.1"):
+        schema.check_sqlite_version()
+    manager = CubeManager(db_path)
+    assert not manager.connect()
+    assert manager.conn is None
+
+
+def test_current_sqlite_is_supported():
+    assert sqlite3.sqlite_version_info >= schema.MIN_SQLITE_VERSION
+    schema.check_sqlite_version()
@@ -0,0 +1,47 @@
+#test delle statistiche del cubo: i metodi stats_* e la fotografia di compute_all_stats devono coincidere
+
+import sqlite3
+
+import pytest
+
+import schema
+from cubeManager import DEFAULT_CUBE_ID
+
+
+PER_CHARACTER = ("strength", "willpower", "lore")
+
+
+def card_ids(manager, where):
+    return [row[0] for row in manager.conn.execute(f"SELECT unique_id FROM cards WHERE {where} ORDER BY unique_id")]
+
+
+@pytest.mark.parametrize("name", PER_CHARACTER)
+def test_character_stats_match_snapshot(manager, name):
+    snapshot = manager.compute_all_stats(cube_id=DEFAULT_CUBE_ID)
+    stats = getattr(manager, f"stats_{name}")(cube_id=DEFAULT_CUBE_ID)
+    assert stats == getattr(snapshot, name)
+    if name != "lore":
+        assert sum(s["count"] for s in stats.values()) == snapshot.characters
+
+
+def test_cube_without_characters(manager):
+    cube_id = manager.create_cube("No characters", card_ids(manager, "LOWER(type) != 'character'")[:20])
+    snapshot = manager.compute_all_stats(cube_id=cube_id)
+    assert snapshot.total == 20 and snapshot.characters == 0
+    for name in PER_CHARACTER:
+        assert getattr(manager, f"stats_{name}")(cube_id=cube_id) == getattr(snapshot, name) == {}
+
+
+def test_inks_and_classifications_match_snapshot(db_path, manager):
+    # un Character del cubo con una classificazione che non sta in schema.CLASSIFICATIONS
+    uid = card_ids(manager, f"LOWER(type) = 'character' AND unique_id IN "
+                            f"(SELECT card_id FROM cube_cards WHERE cube_id = {DEFAULT_CUBE_ID})")[0]
+    conn = sqlite3.connect(db_path)
+    schema.write_card_links(conn, [(uid, "Amber, Steel", "Storyborn, Sidekick")])
+    conn.commit()
+    conn.close()
+
+    snapshot = manager.compute_all_stats(cube_id=DEFAULT_CUBE_ID)
+    assert snapshot.classification == manager.stats_classification(cube_id=DEFAULT_CUBE_ID)
+    assert snapshot.ink == manager.stats_ink(cube_id=DEFAULT_CUBE_ID)
+    assert snapshot.classification["Sidekick"]["count"] == 1
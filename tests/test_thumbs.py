@@ -0,0 +1,69 @@
+#test di thumbs.StaticThumbnails: URL serviti da streamlit, download in background, URL originali come ripiego
+
+import functools
+import io
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+import thumbs
+
+
+@pytest.fixture
+def image_host(tmp_path):
+    """Server http locale al posto di quello delle immagini delle carte"""
+    Image.new("RGB", (600, 840), "red").save(tmp_path / "card.png")
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def images(tmp_path):
+    return thumbs.StaticThumbnails(thumbs.ThumbnailCache(str(tmp_path / "static" / "thumbs")),
+                                   base_url_path="/lcm/")
+
+
+def test_thumbnail_served_from_app_origin(images, image_host):
+    url = f"{image_host}/card.png"
+    assert images.thumb_url(url, "Card") == url  # intanto l'originale, la miniatura si scarica
+    images.wait()
+    thumb = images.thumb_url(url, "Card")
+    assert thumb == f"/lcm/app/static/thumbs/{thumbs.ThumbnailCache.relative_path(thumbs.url_key(url))}"
+    with Image.open(io.BytesIO(images.cache.cached(thumbs.url_key(url)))) as img:
+        assert img.format == "WEBP" and img.width == thumbs.THUMB_WIDTH
+
+
+def test_failed_download_is_not_retried_at_once(images, image_host, caplog):
+    url = f"{image_host}/missing.png"
+    assert images.thumb_url(url, "Card") == url
+    images.wait()
+    assert [r.levelname for r in caplog.records if r.name == "thumbs" and url in r.getMessage()] == ["WARNING"]
+    assert images.thumb_url(url, "Card") == url
+    assert images._pool is None  # niente nuovo download prima di RETRY_AFTER
+
+
+def test_placeholder_without_image(images):
+    thumb = images.thumb_url("", "Elsa - Snow Queen")
+    assert thumb.startswith("/lcm/app/static/thumbs/placeholders/")
+    assert images.cache.placeholder("Elsa - Snow Queen") == thumb[len("/lcm/app/static/thumbs/"):]
+
+
+def test_original_urls_without_static_serving(image_host):
+    images = thumbs.StaticThumbnails(enabled=False)
+    assert images.thumb_url(f"{image_host}/card.png", "Card") == f"{image_host}/card.png"
+    assert images.thumb_url("", "Card") == ""
+
+
+def test_one_session_for_concurrent_downloads(tmp_path, image_host):
+    cache = thumbs.ThumbnailCache(str(tmp_path / "thumbs"))
+    urls = [f"{image_host}/card.png?n={n}" for n in range(16)]
+    assert cache.prefetch(urls, workers=16) == len(urls)
+    session = cache._session
+    assert session is not None and cache._http() is session
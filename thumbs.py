@@ -0,0 +1,238 @@
+#thumbs: cache locale delle immagini delle carte, servita da streamlit stesso
+#ogni immagine viene scaricata una volta sola, ridotta e salvata in WebP in static/thumbs
+#con il nome dato dall'hash dell'URL; con server.enableStaticServing (.streamlit/config.toml)
+#streamlit la serve come app/static/thumbs/..., quindi dalla stessa origine dell'app:
+#funziona da qualunque client, anche con solo la porta 8501 inoltrata o dietro https.
+#le griglie caricano le miniature e l'immagine grande solo quando si clicca sulla carta
+#
+#uso da riga di comando (scarica in anticipo le miniature del cubo o di tutte le carte):
+#   python thumbs.py [--db lorcana_cards.db] [--all]
+
+import argparse
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+# gli scaricamenti girano sui thread in background dell'app: warning col logging, non print
+log = logging.getLogger(__name__)
+
+# la cartella static/ accanto a LCM.py è quella che streamlit serve come app/static/
+THUMB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "thumbs")
+STATIC_PATH = "app/static/thumbs"
+THUMB_WIDTH = 320  # px: 8 carte per riga, abbastanza anche per schermi ad alta densità
+THUMB_QUALITY = 80
+FETCH_TIMEOUT = 10  # secondi per scaricare un'immagine
+PREFETCH_WORKERS = 8
+LOCK_STRIPES = 64  # lock per hash a strisce: quanti che siano gli URL, i lock restano questi
+RETRY_AFTER = 300  # secondi prima di riprovare un'immagine che non si è riusciti a scaricare
+
+
+def url_key(url):
+    """Nome del file in cache: hash dell'URL"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+def resize_webp(data, width=THUMB_WIDTH, quality=THUMB_QUALITY):
+    """Bytes di un'immagine qualsiasi -> miniatura WebP larga al massimo width"""
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        img.thumbnail((width, width * 2), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, "WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def placeholder_webp(name, width=THUMB_WIDTH):
+    """Carta finta con il nome, generata in locale (niente via.placeholder.com)"""
+    height = int(width * 1.395)
+    img = Image.new("RGB", (width, height), "#2b2b47")
+    draw = ImageDraw.Draw(img)
+    draw.rounded_rectangle((6, 6, width - 7, height - 7), radius=12, outline="#FF6B6B", width=3)
+    font = ImageFont.load_default()
+    # il nome va a capo sulle parole per stare nella carta
+    lines, line = [], ""
+    for word in (name or "?").split():
+        candidate = f"{line} {word}".strip()
+        if line and draw.textlength(candidate, font=font) > width - 30:
+            lines.append(line)
+            candidate = word
+        line = candidate
+    lines.append(line)
+    text = "\n".join(lines)
+    box = draw.multiline_textbbox((0, 0), text, font=font, align="center")
+    draw.multiline_text(((width - box[2]) / 2, (height - box[3]) / 2), text,
+                        font=font, fill="white", align="center")
+    out = io.BytesIO()
+    img.save(out, "WEBP", quality=THUMB_QUALITY)
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    """Miniature su disco indirizzate per hash dell'URL: directory/ab/abcd....webp"""
+
+    def __init__(self, directory=THUMB_DIR, width=THUMB_WIDTH, timeout=FETCH_TIMEOUT):
+        self.directory = directory
+        self.width = width
+        self.timeout = timeout
+        self._session = None  # requests si importa al primo download, non all'avvio dell'app
+        self._session_lock = threading.Lock()
+        # la stessa immagine si scarica una volta: un lock per gruppo di hash
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.stats = {"hits": 0, "fetched": 0, "failed": 0}
+
+    @staticmethod
+    def relative_path(key):
+        return f"{key[:2]}/{key}.webp"
+
+    @staticmethod
+    def placeholder_path(name):
+        return f"placeholders/{url_key(name)}.webp"
+
+    def path(self, relative):
+        return os.path.join(self.directory, *relative.split("/"))
+
+    def has(self, key):
+        return os.path.exists(self.path(self.relative_path(key)))
+
+    def cached(self, key):
+        """Miniatura già su disco (None se non c'è)"""
+        try:
+            with open(self.path(self.relative_path(key)), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, relative, data):
+        path = self.path(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # chi legge vede il file intero o niente
+
+    def _http(self):
+        # una sola Session anche se i primi download partono insieme da più thread
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            return self._session
+
+    def get(self, url):
+        """Miniatura di un URL: dal disco, oppure scaricata e salvata. None se non si riesce"""
+        key = url_key(url)
+        data = self.cached(key)
+        if data is not None:
+            self.stats["hits"] += 1
+            return data
+        with self._locks[int(key[:8], 16) % len(self._locks)]:
+            data = self.cached(key)  # un altro thread può averla appena scaricata
+            if data is not None:
+                self.stats["hits"] += 1
+                return data
+            try:
+                response = self._http().get(url, timeout=self.timeout)
+                response.raise_for_status()
+                data = resize_webp(response.content, self.width)
+            except Exception as e:
+                self.stats["failed"] += 1
+                log.warning("⚠️ Immagine non disponibile (%s): %s", url, e)
+                return None
+            self._write(self.relative_path(key), data)
+            self.stats["fetched"] += 1
+            return data
+
+    def placeholder(self, name):
+        """Percorso (relativo alla cartella) della carta finta con il nome, creata la prima volta"""
+        relative = self.placeholder_path(name)
+        if not os.path.exists(self.path(relative)):
+            self._write(relative, placeholder_webp(name, self.width))
+        return relative
+
+    def prefetch(self, urls, workers=PREFETCH_WORKERS):
+        """Scarica in parallelo le miniature che mancano, ritorna quante sono disponibili"""
+        urls = [url for url in set(urls) if url]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return sum(data is not None for data in pool.map(self.get, urls))
+
+
+class StaticThumbnails:
+    """URL delle miniature per le griglie, serviti da streamlit (server.enableStaticServing).
+
+    Si scaricano solo gli URL che l'app passa a thumb_url (cioè quelli delle carte nel db):
+    una miniatura che manca si prepara in background e intanto si usa l'URL originale.
+    Senza static serving (enabled=False) si usano sempre gli URL originali.
+    """
+
+    def __init__(self, cache=None, base_url_path="", enabled=True, workers=PREFETCH_WORKERS):
+        self.cache = cache or ThumbnailCache()
+        self.enabled = enabled
+        # percorso dalla radice del server: vale nella pagina e negli iframe dei componenti
+        self.prefix = "/" + "/".join(filter(None, [(base_url_path or "").strip("/"), STATIC_PATH]))
+        self.workers = workers
+        self._pool = None  # thread dei download, creati al primo che serve
+        self._pending = set()  # hash in download
+        self._failed = {}  # hash -> quando è fallito (si riprova dopo RETRY_AFTER)
+        self._lock = threading.Lock()
+
+    def thumb_url(self, url, name=""):
+        """URL della miniatura da mettere negli <img> delle griglie"""
+        if not self.enabled:
+            return url or ""
+        if not url:
+            return f"{self.prefix}/{self.cache.placeholder(name)}"
+        key = url_key(url)
+        if self.cache.has(key):
+            return f"{self.prefix}/{self.cache.relative_path(key)}"
+        self._schedule(url, key)
+        return url
+
+    def _schedule(self, url, key):
+        with self._lock:
+            if key in self._pending or time.monotonic() - self._failed.get(key, -RETRY_AFTER) < RETRY_AFTER:
+                return
+            self._pending.add(key)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbs")
+            self._pool.submit(self._fetch, url, key)
+
+    def _fetch(self, url, key):
+        data = self.cache.get(url)
+        with self._lock:
+            self._pending.discard(key)
+            if data is None:
+                self._failed[key] = time.monotonic()
+            else:
+                self._failed.pop(key, None)
+
+    def wait(self):
+        """Aspetta i download in corso (per i test e la riga di comando)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scarica in anticipo le miniature delle carte")
+    parser.add_argument("--db", default="lorcana_cards.db", help="database sqlite (default: lorcana_cards.db)")
+    parser.add_argument("--all", action="store_true", help="tutte le carte, non solo quelle dei cubi")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    where = "" if args.all else "WHERE unique_id IN (SELECT card_id FROM cube_cards)"
+    urls = [row[0] for row in conn.execute(f"SELECT Image FROM cards {where}")]
+    conn.close()
+
+    cache = ThumbnailCache()
+    print(f"🖼️ Miniature da preparare: {len(set(filter(None, urls)))}")
+    ready = cache.prefetch(urls)
+    print(f"✅ Pronte: {ready} (scaricate ora: {cache.stats['fetched']}, non disponibili: {cache.stats['failed']})")